@@ -5,11 +5,10 @@ from ethereum import slogging
 from ethereum.tester import TransactionFailed
 from pyethapp.rpc_client import JSONRPCClientReplyError
 
-from raiden.blockchain.events import (
-    ALL_EVENTS,
-    get_all_channel_manager_events,
-    get_all_registry_events,
-    get_all_netting_channel_events,
+from raiden.blockchain.abi import (
+    CONTRACT_CHANNEL_MANAGER,
+    CONTRACT_NETTING_CHANNEL,
+    CONTRACT_REGISTRY,
 )
 from raiden.token_swap import (
     MakerTokenSwapTask,
@@ -29,6 +28,7 @@ from raiden.exceptions import (
     InvalidSettleTimeout,
     InvalidState,
     InsufficientFunds,
+    UnknownTokenAddress,
 )
 from raiden.utils import (
     isaddress,
@@ -203,7 +203,7 @@ class RaidenAPI(object):
 
         # Obtain a reference to the token and approve the amount for funding
         token = self.raiden.chain.token(token_address)
-        balance = token.balance_of(self.raiden.address.encode('hex'))
+        balance = token.balance_of(self.raiden.address)
 
         if not balance >= amount:
             msg = "Not enough balance for token'{}' [{}]: have={}, need={}".format(
@@ -573,7 +573,7 @@ class RaidenAPI(object):
         netting_channel = channel.external_state.netting_channel
 
         current_block = self.raiden.chain.block_number()
-        settle_timeout = netting_channel.detail(self.raiden.address)['settle_timeout']
+        settle_timeout = netting_channel.settle_timeout()
         settle_expiration = channel.external_state.closed_block + settle_timeout
 
         if current_block <= settle_expiration:
@@ -590,21 +590,42 @@ class RaidenAPI(object):
 
         graph = self.raiden.token_to_channelgraph[token_address]
 
-        return get_all_channel_manager_events(
-            self.raiden.chain,
+        return self.raiden.chain_events.get_events(
             graph.channelmanager_address,
-            events=ALL_EVENTS,
+            CONTRACT_CHANNEL_MANAGER,
             from_block=from_block,
             to_block=to_block,
         )
 
+    def get_route_stats(self, token_address):
+        """ Return the learned reliability of our neighbors as mediators for
+        the token network of `token_address`.
+        """
+        if not isaddress(token_address):
+            raise InvalidAddress(
+                'Expected binary address format for token in get_route_stats'
+            )
+
+        graph = self.raiden.token_to_channelgraph.get(token_address)
+        if graph is None:
+            raise UnknownTokenAddress(token_address)
+
+        return graph.route_reliability.get_stats()
+
+    def get_rpc_cache_stats(self):
+        """ Return the hits and misses of the contract reads cache. """
+        return self.raiden.chain.cache.stats()
+
+    def get_events_ingestion_stats(self):
+        """ Return the size of the blockchain events queue and its lag. """
+        return self.raiden.events_ingestion.stats()
+
     def get_network_events(self, from_block, to_block):
         registry_address = self.raiden.chain.default_registry.address
 
-        return get_all_registry_events(
-            self.raiden.chain,
+        return self.raiden.chain_events.get_events(
             registry_address,
-            events=ALL_EVENTS,
+            CONTRACT_REGISTRY,
             from_block=from_block,
             to_block=to_block,
         )
@@ -614,10 +635,9 @@ class RaidenAPI(object):
             raise InvalidAddress(
                 'Expected binary address format for channel in get_channel_events'
             )
-        returned_events = get_all_netting_channel_events(
-            self.raiden.chain,
+        returned_events = self.raiden.chain_events.get_events(
             channel_address,
-            events=ALL_EVENTS,
+            CONTRACT_NETTING_CHANNEL,
             from_block=from_block,
             to_block=to_block,
         )
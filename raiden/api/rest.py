@@ -19,6 +19,7 @@ from raiden.exceptions import (
     InvalidSettleTimeout,
     NoPathError,
     SamePeerAddress,
+    UnknownTokenAddress,
 )
 from raiden.api.v1.encoding import (
     ChannelSchema,
@@ -35,6 +36,9 @@ from raiden.api.v1.resources import (
     ChannelsResourceByChannelAddress,
     TokensResource,
     PartnersResourceByTokenAddress,
+    RouteStatsResource,
+    RpcCacheStatsResource,
+    EventsIngestionStatsResource,
     NetworkEventsResource,
     RegisterTokenResource,
     TokenEventsResource,
@@ -146,10 +150,16 @@ class APIServer(object):
             PartnersResourceByTokenAddress,
             '/tokens/<hexaddress:token_address>/partners'
         )
+        self.add_resource(
+            RouteStatsResource,
+            '/tokens/<hexaddress:token_address>/routes'
+        )
+        self.add_resource(RpcCacheStatsResource, '/rpc/cache')
         self.add_resource(
             RegisterTokenResource,
             '/tokens/<hexaddress:token_address>'
         )
+        self.add_resource(EventsIngestionStatsResource, '/events/ingestion')
         self.add_resource(NetworkEventsResource, '/events/network')
         self.add_resource(
             TokenEventsResource,
@@ -374,6 +384,30 @@ class RestAPI(object):
         result = self.partner_per_token_list_schema.dump(schema_list)
         return jsonify(result.data)
 
+    def get_route_stats(self, token_address):
+        try:
+            raiden_service_result = self.raiden_api.get_route_stats(token_address)
+        except InvalidAddress as e:
+            return make_response(str(e), httplib.CONFLICT)
+        except UnknownTokenAddress as e:
+            return make_response(str(e), httplib.NOT_FOUND)
+
+        return_list = []
+        for stats in raiden_service_result:
+            stats = dict(stats)
+            stats['neighbor'] = address_encoder(stats['neighbor'])
+            if stats['target'] is not None:
+                stats['target'] = address_encoder(stats['target'])
+            return_list.append(stats)
+
+        return jsonify(return_list)
+
+    def get_rpc_cache_stats(self):
+        return jsonify(self.raiden_api.get_rpc_cache_stats())
+
+    def get_events_ingestion_stats(self):
+        return jsonify(self.raiden_api.get_events_ingestion_stats())
+
     def initiate_transfer(self, token_address, target_address, amount, identifier):
 
         if identifier is None:
@@ -92,6 +92,33 @@ class PartnersResourceByTokenAddress(BaseResource):
         return self.rest_api.get_partners_by_token(**kwargs)
 
 
+class RouteStatsResource(BaseResource):
+
+    def __init__(self, **kwargs):
+        super(RouteStatsResource, self).__init__(**kwargs)
+
+    def get(self, **kwargs):
+        return self.rest_api.get_route_stats(**kwargs)
+
+
+class RpcCacheStatsResource(BaseResource):
+
+    def __init__(self, **kwargs):
+        super(RpcCacheStatsResource, self).__init__(**kwargs)
+
+    def get(self):
+        return self.rest_api.get_rpc_cache_stats()
+
+
+class EventsIngestionStatsResource(BaseResource):
+
+    def __init__(self, **kwargs):
+        super(EventsIngestionStatsResource, self).__init__(**kwargs)
+
+    def get(self):
+        return self.rest_api.get_events_ingestion_stats()
+
+
 class NetworkEventsResource(BaseResource):
 
     get_schema = EventRequestSchema()
@@ -6,15 +6,21 @@ from raiden.settings import (
     DEFAULT_NAT_INVITATION_TIMEOUT,
     DEFAULT_NAT_KEEPALIVE_RETRIES,
     DEFAULT_NAT_KEEPALIVE_TIMEOUT,
+    DEFAULT_PROTOCOL_INBOUND_QUEUE_SIZE,
+    DEFAULT_PROTOCOL_INBOUND_WORKERS,
     DEFAULT_PROTOCOL_RETRIES_BEFORE_BACKOFF,
     DEFAULT_PROTOCOL_THROTTLE_CAPACITY,
     DEFAULT_PROTOCOL_THROTTLE_FILL_RATE,
+    DEFAULT_PROTOCOL_THROTTLE_GLOBAL_CAPACITY,
+    DEFAULT_PROTOCOL_THROTTLE_GLOBAL_FILL_RATE,
+    DEFAULT_PROTOCOL_THROTTLE_MAX_FILL_RATE,
+    DEFAULT_PROTOCOL_THROTTLE_MIN_FILL_RATE,
     DEFAULT_PROTOCOL_RETRY_INTERVAL,
     DEFAULT_REVEAL_TIMEOUT,
     DEFAULT_SETTLE_TIMEOUT,
     INITIAL_PORT,
 )
-from raiden.network.transport import UDPTransport, TokenBucket
+from raiden.network.transport import UDPTransport, CongestionControl
 from raiden.utils import pex
 
 
@@ -34,9 +40,15 @@ class App(object):  # pylint: disable=too-few-public-methods
             'retries_before_backoff': DEFAULT_PROTOCOL_RETRIES_BEFORE_BACKOFF,
             'throttle_capacity': DEFAULT_PROTOCOL_THROTTLE_CAPACITY,
             'throttle_fill_rate': DEFAULT_PROTOCOL_THROTTLE_FILL_RATE,
+            'throttle_min_fill_rate': DEFAULT_PROTOCOL_THROTTLE_MIN_FILL_RATE,
+            'throttle_max_fill_rate': DEFAULT_PROTOCOL_THROTTLE_MAX_FILL_RATE,
+            'throttle_global_capacity': DEFAULT_PROTOCOL_THROTTLE_GLOBAL_CAPACITY,
+            'throttle_global_fill_rate': DEFAULT_PROTOCOL_THROTTLE_GLOBAL_FILL_RATE,
             'nat_invitation_timeout': DEFAULT_NAT_INVITATION_TIMEOUT,
             'nat_keepalive_retries': DEFAULT_NAT_KEEPALIVE_RETRIES,
             'nat_keepalive_timeout': DEFAULT_NAT_KEEPALIVE_TIMEOUT,
+            'inbound_workers': DEFAULT_PROTOCOL_INBOUND_WORKERS,
+            'inbound_queue_size': DEFAULT_PROTOCOL_INBOUND_QUEUE_SIZE,
         },
         'rpc': True,
         'console': False,
@@ -58,9 +70,17 @@ class App(object):  # pylint: disable=too-few-public-methods
                 config['port'],
             )
 
-        transport.throttle_policy = TokenBucket(
-            config['protocol']['throttle_capacity'],
-            config['protocol']['throttle_fill_rate']
+        protocol_config = dict(self.DEFAULT_CONFIG['protocol'])
+        protocol_config.update(config['protocol'])
+        config['protocol'] = protocol_config
+
+        transport.throttle_policy = CongestionControl(
+            capacity=protocol_config['throttle_capacity'],
+            fill_rate=protocol_config['throttle_fill_rate'],
+            min_fill_rate=protocol_config['throttle_min_fill_rate'],
+            max_fill_rate=protocol_config['throttle_max_fill_rate'],
+            global_capacity=protocol_config['throttle_global_capacity'],
+            global_fill_rate=protocol_config['throttle_global_fill_rate'],
         )
         self.raiden = RaidenService(
             chain,
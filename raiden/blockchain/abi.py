@@ -25,6 +25,7 @@ __all__ = (
     'EVENT_CHANNEL_SECRET_REVEALED',
     'EVENT_CHANNEL_SETTLED',
     'EVENT_TOKEN_ADDED',
+    'EVENT_ADDRESS_REGISTERED',
 )
 
 CONTRACT_CHANNEL_MANAGER = 'channel_manager'
@@ -39,6 +40,7 @@ EVENT_CHANNEL_CLOSED = 'ChannelClosed'
 EVENT_CHANNEL_SECRET_REVEALED = 'ChannelSecretRevealed'
 EVENT_CHANNEL_SETTLED = 'ChannelSettled'
 EVENT_TOKEN_ADDED = 'TokenAdded'
+EVENT_ADDRESS_REGISTERED = 'AddressRegistered'
 
 
 def get_event(full_abi, event_name):
@@ -133,6 +135,7 @@ class ContractManager():
             ChannelSecretRevealed=CONTRACT_NETTING_CHANNEL,
             ChannelSettled=CONTRACT_NETTING_CHANNEL,
             TokenAdded=CONTRACT_REGISTRY,
+            AddressRegistered=CONTRACT_ENDPOINT_REGISTRY,
         )
 
     def instantiate(self):
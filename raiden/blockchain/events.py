@@ -1,8 +1,16 @@
 # -*- coding: utf-8 -*-
 import itertools
+import logging
+import time
 from collections import namedtuple, defaultdict
 
+import gevent
+from gevent.event import Event
+from gevent.lock import Semaphore
+from gevent.pool import Pool
+from gevent.queue import JoinableQueue
 from pyethapp.jsonrpc import address_decoder
+from pyethapp.rpc_client import JSONRPCClientReplyError
 from ethereum import slogging
 
 from raiden.blockchain.abi import (
@@ -10,9 +18,14 @@ from raiden.blockchain.abi import (
     CONTRACT_CHANNEL_MANAGER,
     CONTRACT_NETTING_CHANNEL,
     CONTRACT_REGISTRY,
+
+    EVENT_CHANNEL_NEW,
+    EVENT_CHANNEL_NEW_BALANCE,
+    EVENT_CHANNEL_CLOSED,
+    EVENT_CHANNEL_SECRET_REVEALED,
+    EVENT_CHANNEL_SETTLED,
 )
 from raiden.utils import pex
-from raiden.network.rpc.client import new_filter, Filter
 
 from raiden.transfer.mediated_transfer.state_change import (
     ContractReceiveTokenAdded,
@@ -29,7 +42,7 @@ PyethappEventListener = namedtuple(
 )
 PyethappEvent = namedtuple(
     'BlockchainEvent',
-    ('originating_contract', 'event_data'),
+    ('originating_contract', 'event_data', 'block_number'),
 )
 PyethappProxies = namedtuple(
     'PyethappProxies',
@@ -38,6 +51,36 @@ PyethappProxies = namedtuple(
 
 # Pyethapp's `new_filter` uses None to signal the absence of topics filters
 ALL_EVENTS = None
+
+# The netting channel events that are converted to state changes
+NETTING_CHANNEL_EVENTS = (
+    EVENT_CHANNEL_NEW_BALANCE,
+    EVENT_CHANNEL_CLOSED,
+    EVENT_CHANNEL_SECRET_REVEALED,
+    EVENT_CHANNEL_SETTLED,
+)
+
+# Number of blocks requested by each `eth_getLogs` call, a range with too many
+# results is split further
+LOGS_CHUNK_SIZE = 10000
+
+# Number of `eth_getLogs` calls in flight for a single query
+LOGS_CONCURRENCY = 4
+
+# Number of channels loaded concurrently on startup, the JSON-RPC requests of
+# the channels being loaded are batched
+STARTUP_POOL_SIZE = 20
+
+# Number of loaded channels between the startup progress messages
+STARTUP_PROGRESS_INTERVAL = 100
+
+# Maximum number of fetched events waiting to be processed, the fetcher blocks
+# once the queue is full
+EVENTS_QUEUE_SIZE = 1000
+
+# Seconds an event can wait in the queue before a warning is logged
+EVENTS_LAG_WARNING = 30
+
 log = slogging.get_logger(__name__)  # pylint: disable=invalid-name
 
 
@@ -54,12 +97,137 @@ def poll_event_listener(pyethapp_filter, translator):
             pyethapp_event = PyethappEvent(
                 log_event['address'],
                 decoded_event,
+                log_event.get('block_number'),
             )
             result.append(pyethapp_event)
 
     return result
 
 
+def logs_too_large(error):
+    """ True if the node refused an `eth_getLogs` because the range has too
+    many results.
+    """
+    message = str(error).lower()
+    return any(
+        reason in message
+        for reason in ('more than', 'too many', 'too large', 'limit exceeded')
+    )
+
+
+def get_logs_range(pyethapp_chain, contract_address, topics, from_block, to_block):
+    """ Return the logs of the range, splitting it in halves until the node
+    accepts the queries.
+    """
+    try:
+        return pyethapp_chain.get_logs(
+            contract_address,
+            topics,
+            from_block,
+            to_block,
+        )
+    except JSONRPCClientReplyError as e:
+        if from_block == to_block or not logs_too_large(e):
+            raise
+
+    middle = (from_block + to_block) // 2
+
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug(
+            'splitting logs query',
+            from_block=from_block,
+            to_block=to_block,
+        )
+
+    return (
+        get_logs_range(pyethapp_chain, contract_address, topics, from_block, middle) +
+        get_logs_range(pyethapp_chain, contract_address, topics, middle + 1, to_block)
+    )
+
+
+def block_range(pyethapp_chain, from_block, to_block):
+    """ Resolve the block tags of the range to block numbers. """
+    if from_block == 'earliest':
+        from_block = 0
+
+    if not isinstance(from_block, (int, long)) or not isinstance(to_block, (int, long)):
+        block_number = pyethapp_chain.block_number()
+
+        if not isinstance(from_block, (int, long)):
+            from_block = block_number
+        if not isinstance(to_block, (int, long)):
+            to_block = block_number
+
+    return from_block, to_block
+
+
+def iter_contract_logs(
+        pyethapp_chain,
+        contract_address,
+        topics,
+        from_block,
+        to_block,
+        chunk_size=LOGS_CHUNK_SIZE,
+        concurrency=LOGS_CONCURRENCY):
+    """ Generator of the raw logs of the smart contracts at `contract_address`
+    that match the filters `topics`, `from_block`, and `to_block`.
+
+    The range is queried in chunks of `chunk_size` blocks with `eth_getLogs`,
+    up to `concurrency` chunks are in flight and the logs are produced in
+    block order.
+    """
+    from_block, to_block = block_range(pyethapp_chain, from_block, to_block)
+
+    chunks = [
+        (start, min(start + chunk_size - 1, to_block))
+        for start in xrange(from_block, to_block + 1, chunk_size)
+    ]
+
+    def fetch(chunk):
+        return get_logs_range(
+            pyethapp_chain,
+            contract_address,
+            topics,
+            chunk[0],
+            chunk[1],
+        )
+
+    pool = Pool(concurrency)
+    try:
+        for log_events in pool.imap(fetch, chunks):
+            for log_event in log_events:
+                yield log_event
+    finally:
+        # the consumer may stop early
+        pool.kill()
+
+
+def iter_contract_events(
+        pyethapp_chain,
+        translator,
+        contract_address,
+        topics,
+        from_block,
+        to_block,
+        chunk_size=LOGS_CHUNK_SIZE,
+        concurrency=LOGS_CONCURRENCY):
+    """ Generator of the decoded events of the smart contract at
+    `contract_address`, see `iter_contract_logs`.
+    """
+    log_events = iter_contract_logs(
+        pyethapp_chain,
+        contract_address,
+        topics,
+        from_block,
+        to_block,
+        chunk_size,
+        concurrency,
+    )
+
+    for log_event in log_events:
+        yield translator.decode_event(log_event['topics'], log_event['data'])
+
+
 def get_contract_events(
         pyethapp_chain,
         translator,
@@ -71,31 +239,14 @@ def get_contract_events(
     `contract_address` that match the filters `topics`, `from_block`, and
     `to_block`.
     """
-    # Note: Issue #452 (https://github.com/raiden-network/raiden/issues/452)
-    # tracks a suggested TODO, which will reduce the 3 RPC calls here to only
-    # one using `eth_getLogs`. It will require changes in all testing frameworks
-    # to be implemented though.
-
-    filter_ = None
-    pyethapp_client = pyethapp_chain.client
-    try:
-        filter_id_raw = new_filter(
-            pyethapp_client,
-            contract_address,
-            topics=topics,
-            from_block=from_block,
-            to_block=to_block
-        )
-        filter_ = Filter(pyethapp_client, filter_id_raw)
-        events = filter_.getall()
-    finally:
-        if filter_ is not None:
-            filter_.uninstall()
-
-    return [
-        translator.decode_event(event['topics'], event['data'])
-        for event in events
-    ]
+    return list(iter_contract_events(
+        pyethapp_chain,
+        translator,
+        contract_address,
+        topics,
+        from_block,
+        to_block,
+    ))
 
 
 # These helpers have a better descriptive name and provide the translator for
@@ -160,25 +311,63 @@ def get_all_netting_channel_events(
     )
 
 
-def get_relevant_proxies(pyethapp_chain, node_address, registry_address):
+def get_relevant_proxies(
+        pyethapp_chain,
+        node_address,
+        registry_address,
+        on_channel=None,
+        pool_size=STARTUP_POOL_SIZE):
+    """ Return the proxies of the registry, its channel managers and the
+    netting channels of `node_address`.
+
+    The proxies are created concurrently by `pool_size` greenlets,
+    `on_channel(channel_manager, netting_channel)` is called from the pool as
+    soon as a channel proxy is ready.
+    """
     registry = pyethapp_chain.registry(registry_address)
+    pool = Pool(pool_size)
+
+    def load_manager(channel_manager_address):
+        channel_manager = pyethapp_chain.manager(channel_manager_address)
+        participating_channels = channel_manager.channels_by_participant(node_address)
+        return channel_manager, participating_channels
+
+    def load_channel(manager_and_channel):
+        channel_manager, channel_address = manager_and_channel
+
+        # FIXME: implement proper cleanup of self-killed channel after close+settle
+        try:
+            netting_channel = pyethapp_chain.netting_channel(channel_address)
+        except ValueError:
+            log.debug('Invalid netting channel: %r', channel_address)
+            return channel_manager, None
+
+        if on_channel is not None:
+            on_channel(channel_manager, netting_channel)
+
+        return channel_manager, netting_channel
+
+    managers = pool.map(load_manager, registry.manager_addresses())
 
     channel_managers = list()
     manager_channels = defaultdict(list)
-
-    for channel_manager_address in registry.manager_addresses():
-        channel_manager = pyethapp_chain.manager(channel_manager_address)
+    for channel_manager, _ in managers:
         channel_managers.append(channel_manager)
+        manager_channels[channel_manager.address] = list()
 
-        participating_channels = channel_manager.channels_by_participant(node_address)
-        netting_channels = []
-        for channel_address in participating_channels:
-            # FIXME: implement proper cleanup of self-killed channel after close+settle
-            try:
-                netting_channels.append(pyethapp_chain.netting_channel(channel_address))
-            except ValueError:
-                log.debug('Invalid netting channel: %r', channel_address)
-        manager_channels[channel_manager_address] = netting_channels
+    channels = [
+        (channel_manager, channel_address)
+        for channel_manager, participating_channels in managers
+        for channel_address in participating_channels
+    ]
+
+    loaded = pool.imap(load_channel, channels)
+    for count, (channel_manager, netting_channel) in enumerate(loaded, 1):
+        if netting_channel is not None:
+            manager_channels[channel_manager.address].append(netting_channel)
+
+        if count % STARTUP_PROGRESS_INTERVAL == 0 or count == len(channels):
+            log.info('loading channels', loaded=count, total=len(channels))
 
     proxies = PyethappProxies(
         registry,
@@ -247,11 +436,24 @@ def pyethapp_event_to_state_change(pyethapp_event):  # pylint: disable=too-many-
 
 
 class PyethappBlockchainEvents(object):
-    """ Pyethapp events polling. """
+    """ Pyethapp events polling.
+
+    The number of filters doesn't depend on the number of channels, there is
+    one filter per registry, one for the ChannelNew events of all the channel
+    managers and one for the events of all the netting channels. The last two
+    match by topic only, the events of the contracts that are not followed
+    are dropped here.
+    """
 
-    def __init__(self):
+    def __init__(self, chain):
+        self.chain = chain
         self.event_listeners = list()
 
+        self.manager_addresses = set()
+        self.netting_channel_addresses = set()
+        self.channelnew_filter = None
+        self.netting_channel_filter = None
+
     def poll_all_event_listeners(self):
         result = list()
 
@@ -264,15 +466,27 @@ class PyethappBlockchainEvents(object):
 
         return result
 
-    def poll_state_change(self):
-        for event in self.poll_all_event_listeners():
-            yield pyethapp_event_to_state_change(event)
+    def is_followed(self, pyethapp_event):
+        event_type = pyethapp_event.event_data['_event_type']
+        contract_address = pyethapp_event.originating_contract
+
+        if event_type == EVENT_CHANNEL_NEW:
+            return contract_address in self.manager_addresses
+
+        if event_type in NETTING_CHANNEL_EVENTS:
+            return contract_address in self.netting_channel_addresses
+
+        return True
 
     def uninstall_all_event_listeners(self):
         for listener in self.event_listeners:
             listener.pyethapp_filter.uninstall()
 
         self.event_listeners = list()
+        self.manager_addresses = set()
+        self.netting_channel_addresses = set()
+        self.channelnew_filter = None
+        self.netting_channel_filter = None
 
     def add_event_listener(self, event_name, pyethapp_filter, translator):
         event = PyethappEventListener(
@@ -295,24 +509,33 @@ class PyethappBlockchainEvents(object):
         )
 
     def add_channel_manager_listener(self, channel_manager_proxy):
-        channelnew = channel_manager_proxy.channelnew_filter()
-        manager_address = channel_manager_proxy.address
+        if self.channelnew_filter is None:
+            topics = [CONTRACT_MANAGER.get_event_id(EVENT_CHANNEL_NEW)]
+            self.channelnew_filter = self.chain.events_filter(topics)
+
+            self.add_event_listener(
+                'ChannelManager',
+                self.channelnew_filter,
+                CONTRACT_MANAGER.get_translator(CONTRACT_CHANNEL_MANAGER),
+            )
 
-        self.add_event_listener(
-            'ChannelManager {}'.format(pex(manager_address)),
-            channelnew,
-            CONTRACT_MANAGER.get_translator('channel_manager'),
-        )
+        self.manager_addresses.add(channel_manager_proxy.address)
 
     def add_netting_channel_listener(self, netting_channel_proxy):
-        channel_address = netting_channel_proxy.address
-        netting_channel_events = netting_channel_proxy.all_events_filter()
+        if self.netting_channel_filter is None:
+            topics = [[
+                CONTRACT_MANAGER.get_event_id(event_name)
+                for event_name in NETTING_CHANNEL_EVENTS
+            ]]
+            self.netting_channel_filter = self.chain.events_filter(topics)
+
+            self.add_event_listener(
+                'NettingChannel Event',
+                self.netting_channel_filter,
+                CONTRACT_MANAGER.get_translator(CONTRACT_NETTING_CHANNEL),
+            )
 
-        self.add_event_listener(
-            'NettingChannel Event {}'.format(pex(channel_address)),
-            netting_channel_events,
-            CONTRACT_MANAGER.get_translator('netting_channel'),
-        )
+        self.netting_channel_addresses.add(netting_channel_proxy.address)
 
     def add_proxies_listeners(self, pyethapp_proxies):
         self.add_registry_listener(pyethapp_proxies.registry)
@@ -325,3 +548,126 @@ class PyethappBlockchainEvents(object):
         )
         for channel in all_netting_channels:
             self.add_netting_channel_listener(channel)
+
+
+class BlockchainEventsIngestion(object):
+    """ Fetches the blockchain events in its own greenlet.
+
+    The alarm only requests a fetch, so the block number updates never wait
+    on the log retrieval. The fetched events are put in a bounded queue and
+    converted to state changes in order by a second greenlet. Whether an
+    event is followed is checked by the consumer, so that the events of a
+    contract followed because of a previous state change are not dropped.
+    """
+
+    def __init__(self, blockchain_events, on_statechange, queue_size=EVENTS_QUEUE_SIZE):
+        self.blockchain_events = blockchain_events
+        self.on_statechange = on_statechange
+
+        self.events = JoinableQueue(queue_size)
+        self.fetch_requested = Event()
+        self.fetch_lock = Semaphore()
+        self.stopped = False
+
+        self.latest_block = None
+        self.processed_block = None
+        self.lag = 0
+        self.max_lag = 0
+
+        self.fetcher = None
+        self.consumer = None
+
+    def start(self):
+        self.fetcher = gevent.spawn(self._run_fetcher)
+        self.consumer = gevent.spawn(self._run_consumer)
+
+    def new_block(self, block_number):
+        """ Alarm callback, requests a fetch without waiting for it. """
+        self.latest_block = block_number
+        self.fetch_requested.set()
+
+    def fetch(self):
+        """ Queue the new events of all the listeners. """
+        with self.fetch_lock:
+            fetched_at = time.time()
+
+            for pyethapp_event in self.blockchain_events.poll_all_event_listeners():
+                self.events.put((fetched_at, pyethapp_event))
+
+    def poll(self):
+        """ Fetch the new events and wait until they are processed. """
+        self.fetch()
+        self.events.join()
+
+    def _run_fetcher(self):
+        while True:
+            self.fetch_requested.wait()
+            self.fetch_requested.clear()
+
+            if self.stopped:
+                break
+
+            try:
+                self.fetch()
+            except Exception:  # pylint: disable=broad-except
+                log.exception('could not fetch the blockchain events')
+
+    def _run_consumer(self):
+        while True:
+            item = self.events.get()
+
+            try:
+                if item is StopIteration:
+                    break
+
+                self.process(*item)
+            except Exception:  # pylint: disable=broad-except
+                # the consumer must not die, the queue would fill up and stall
+                # the fetcher
+                log.exception('unexpected exception processing a blockchain event')
+            finally:
+                self.events.task_done()
+
+    def process(self, fetched_at, pyethapp_event):
+        self.lag = time.time() - fetched_at
+        self.max_lag = max(self.max_lag, self.lag)
+
+        if self.lag > EVENTS_LAG_WARNING:
+            log.warning(
+                'blockchain events are lagging behind',
+                lag=self.lag,
+                queued=self.events.qsize(),
+            )
+
+        if pyethapp_event.block_number is not None:
+            self.processed_block = pyethapp_event.block_number
+
+        if self.blockchain_events.is_followed(pyethapp_event):
+            state_change = pyethapp_event_to_state_change(pyethapp_event)
+            self.on_statechange(state_change)
+
+    def stats(self):
+        """ Return the size of the queue and how far behind the processing is. """
+        lag_blocks = None
+        if self.latest_block is not None and self.processed_block is not None:
+            lag_blocks = self.latest_block - self.processed_block
+
+        return {
+            'queued': self.events.qsize(),
+            'lag_seconds': self.lag,
+            'max_lag_seconds': self.max_lag,
+            'processed_block': self.processed_block,
+            'lag_blocks': lag_blocks,
+        }
+
+    def stop(self):
+        """ Stop fetching and wait until the queued events are processed. """
+        self.stopped = True
+        self.fetch_requested.set()
+
+        if self.fetcher is not None:
+            self.fetcher.join()
+
+        if self.consumer is not None:
+            self.events.put(StopIteration)
+            self.consumer.join()
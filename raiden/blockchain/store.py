@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""
+Local copy of the events of the raiden smart contracts.
+
+The decoded events of the tracked contracts are kept in a SQLite database
+with the range of blocks synchronized for each contract, so the event queries
+are answered locally and only the logs of the missing blocks are requested
+from the node. The range starts at the first block queried for the contract
+and is extended backwards if an older block is queried later.
+
+Only the blocks with `confirmations` blocks on top of them are stored, the
+events of the newer blocks may still be dropped by a chain reorganization so
+they are requested from the node on every query.
+"""
+import logging
+import pickle
+import sqlite3
+from collections import defaultdict
+
+import gevent
+from gevent.lock import Semaphore
+from ethereum import slogging
+
+from raiden.blockchain.abi import CONTRACT_MANAGER
+from raiden.blockchain.events import iter_contract_logs
+from raiden.utils import pex
+
+log = slogging.get_logger(__name__)  # pylint: disable=invalid-name
+
+# Value of the synced block of a contract that was never synchronized
+NEVER_SYNCED = -1
+
+# Number of blocks on top of a block before its events are stored, the newer
+# blocks may be dropped by a reorganization
+CONFIRMATION_BLOCKS = 5
+
+
+class ChainEventStore(object):
+    """ Decoded events of the tracked contracts, by contract and block.
+
+    A contract is tracked once it's queried or added with `track`, and the
+    tracked contracts are kept in sync by `sync_all`.
+    """
+
+    def __init__(self, chain, database_path, confirmations=CONFIRMATION_BLOCKS):
+        self.chain = chain
+        self.confirmations = confirmations
+        self.conn = sqlite3.connect(database_path)
+        self.conn.text_factory = str
+
+        cursor = self.conn.cursor()
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS chain_events ('
+            'identifier integer primary key autoincrement, '
+            'contract_address binary NOT NULL, block_number integer NOT NULL, '
+            'data binary'
+            ')'
+        )
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS chain_events_contract_block '
+            'ON chain_events (contract_address, block_number)'
+        )
+        cursor.execute(
+            'CREATE TABLE IF NOT EXISTS chain_sync ('
+            'contract_address binary primary key, contract_name text NOT NULL, '
+            'first_block integer, block_number integer NOT NULL'
+            ')'
+        )
+        self.conn.commit()
+
+        # a contract must not be synchronized by two greenlets at once or its
+        # events would be stored twice
+        self.sync_lock = Semaphore()
+        self.sync_greenlet = None
+
+    def track(self, contract_address, contract_name):
+        """ Keep the events of the contract at `contract_address` in sync,
+        `contract_name` is the name of its ABI.
+        """
+        self.conn.execute(
+            'INSERT OR IGNORE INTO chain_sync('
+            'contract_address, contract_name, block_number) VALUES(?,?,?)',
+            (contract_address, contract_name, NEVER_SYNCED),
+        )
+        self.conn.commit()
+
+    def synced_block(self, contract_address):
+        """ Return the last block synchronized for `contract_address`. """
+        result = self.conn.execute(
+            'SELECT block_number FROM chain_sync WHERE contract_address = ?',
+            (contract_address,),
+        ).fetchone()
+
+        if result is None:
+            return NEVER_SYNCED
+
+        return result[0]
+
+    def sync(self, to_block, contract_addresses=None, from_block=0):
+        """ Fetch the events of the tracked contracts up to `to_block`, the
+        contracts that were never synchronized start at `from_block`.
+
+        Contracts that were synchronized up to the same block are fetched with
+        a single query, once caught up all the contracts share one query per
+        new block.
+        """
+        with self.sync_lock:
+            rows = self.conn.execute(
+                'SELECT contract_address, contract_name, block_number FROM chain_sync'
+            ).fetchall()
+
+            by_start_block = defaultdict(dict)
+            for contract_address, contract_name, synced_block in rows:
+                if contract_addresses is not None and contract_address not in contract_addresses:
+                    continue
+
+                if synced_block == NEVER_SYNCED:
+                    start_block = from_block
+                else:
+                    start_block = synced_block + 1
+
+                if start_block <= to_block:
+                    by_start_block[start_block][contract_address] = contract_name
+
+            for start_block, address_to_name in by_start_block.iteritems():
+                events = self._fetch_range(address_to_name, start_block, to_block)
+
+                # the events and the synced range are written atomically
+                self._insert_events(events)
+                self.conn.executemany(
+                    'UPDATE chain_sync SET block_number = ?, '
+                    'first_block = COALESCE(first_block, ?) WHERE contract_address = ?',
+                    [(to_block, start_block, address) for address in address_to_name],
+                )
+                self.conn.commit()
+
+    def backfill(self, contract_address, from_block):
+        """ Fetch the events of a synchronized contract that are older than
+        its first synchronized block, down to `from_block`.
+        """
+        with self.sync_lock:
+            row = self.conn.execute(
+                'SELECT contract_name, first_block FROM chain_sync WHERE contract_address = ?',
+                (contract_address,),
+            ).fetchone()
+
+            if row is None or row[1] is None or row[1] <= from_block:
+                return
+
+            contract_name, first_block = row
+            events = self._fetch_range(
+                {contract_address: contract_name},
+                from_block,
+                first_block - 1,
+            )
+
+            self._insert_events(events)
+            self.conn.execute(
+                'UPDATE chain_sync SET first_block = ? WHERE contract_address = ?',
+                (from_block, contract_address),
+            )
+            self.conn.commit()
+
+    def _insert_events(self, rows):
+        self.conn.executemany(
+            'INSERT INTO chain_events('
+            'contract_address, block_number, data) VALUES(?,?,?)',
+            rows,
+        )
+
+    def _fetch_range(self, address_to_name, from_block, to_block):
+        log_events = iter_contract_logs(
+            self.chain,
+            list(address_to_name),
+            None,
+            from_block,
+            to_block,
+        )
+
+        rows = list()
+        for log_event in log_events:
+            contract_address = log_event['address']
+            translator = CONTRACT_MANAGER.get_translator(address_to_name[contract_address])
+            decoded_event = translator.decode_event(
+                log_event['topics'],
+                log_event['data'],
+            )
+
+            if decoded_event is not None:
+                rows.append((
+                    contract_address,
+                    log_event['block_number'],
+                    pickle.dumps(decoded_event, -1),
+                ))
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                'chain events fetched',
+                contracts=[pex(address) for address in address_to_name],
+                from_block=from_block,
+                to_block=to_block,
+                events=len(rows),
+            )
+
+        return rows
+
+    def sync_all(self, block_number):
+        """ AlarmTask callback, synchronizes the tracked contracts up to the
+        last confirmed block in the background.
+        """
+        if self.sync_greenlet is None or self.sync_greenlet.ready():
+            self.sync_greenlet = gevent.spawn(self.sync, block_number - self.confirmations)
+
+    def get_events(self, contract_address, contract_name, from_block=None, to_block=None):
+        """ Return the decoded events of the contract at `contract_address` in
+        the inclusive block range, the contract is brought up to date first
+        and only the blocks that are not in the store yet are fetched.
+
+        The history of a contract queried for the first time is only fetched
+        from `from_block`, the unconfirmed blocks are always fetched.
+        """
+        if from_block is None:
+            from_block = 0
+
+        block_number = self.chain.block_number()
+        if to_block is None or to_block == 'latest' or to_block > block_number:
+            to_block = block_number
+
+        confirmed_block = block_number - self.confirmations
+
+        self.track(contract_address, contract_name)
+        self.sync(confirmed_block, contract_addresses=[contract_address], from_block=from_block)
+        self.backfill(contract_address, from_block)
+
+        rows = self.conn.execute(
+            'SELECT data FROM chain_events WHERE contract_address = ? '
+            'AND block_number BETWEEN ? AND ? ORDER BY block_number, identifier',
+            (contract_address, from_block, min(to_block, confirmed_block)),
+        ).fetchall()
+
+        unconfirmed_from = max(from_block, confirmed_block + 1)
+        if unconfirmed_from <= to_block:
+            rows.extend(
+                (data,)
+                for _, _, data in self._fetch_range(
+                    {contract_address: contract_name},
+                    unconfirmed_from,
+                    to_block,
+                )
+            )
+
+        return [
+            pickle.loads(data)
+            for data, in rows
+        ]
+
+    def stop(self):
+        if self.sync_greenlet is not None:
+            self.sync_greenlet.kill()
+
+        self.conn.close()
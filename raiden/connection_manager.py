@@ -107,16 +107,17 @@ class ConnectionManager(object):
                 0,
                 self.initial_channel_target - len(self.open_channels)
             )
-            for partner in self.find_new_partners(new_partner_count):
-                self.api.open(
-                    self.token_address,
-                    partner,
-                )
-                self.api.deposit(
-                    self.token_address,
-                    partner,
-                    funding
-                )
+            # the channels are opened concurrently, so that their transactions
+            # are mined in the same blocks
+            greenlets = [
+                gevent.spawn(self.open_and_deposit, partner, funding)
+                for partner in self.find_new_partners(new_partner_count)
+            ]
+            gevent.joinall(greenlets)
+
+            # all the channels are done before an error is reported
+            for greenlet in greenlets:
+                greenlet.get()
 
     def leave_async(self):
         """ Async version of `leave()`
@@ -220,22 +221,29 @@ class ConnectionManager(object):
                 return
             if len(self.open_channels) >= self.initial_channel_target:
                 return
-            for partner in self.find_new_partners(
-                self.initial_channel_target - len(self.open_channels)
-            ):
-                try:
-                    self.api.open(
-                        self.token_address,
-                        partner
-                    )
-                    self.api.deposit(
-                        self.token_address,
-                        partner,
-                        self.initial_funding_per_partner
-                    )
+            greenlets = [
+                gevent.spawn(self.open_and_deposit, partner, self.initial_funding_per_partner)
+                for partner in self.find_new_partners(
+                    self.initial_channel_target - len(self.open_channels)
+                )
+            ]
+            gevent.joinall(greenlets)
+
+            for greenlet in greenlets:
                 # this can fail because of a race condition, where the channel partner opens first
-                except Exception as e:
-                    log.error('could not open a channel', exc_info=e)
+                if not greenlet.successful():
+                    log.error('could not open a channel', exc_info=greenlet.exception)
+
+    def open_and_deposit(self, partner_address, funding):
+        self.api.open(
+            self.token_address,
+            partner_address,
+        )
+        self.api.deposit(
+            self.token_address,
+            partner_address,
+            funding,
+        )
 
     def find_new_partners(self, number):
         """Search the token network for potential channel partners.
@@ -40,7 +40,6 @@ from raiden.utils import sha3
 log = slogging.get_logger(__name__)  # pylint: disable=invalid-name
 UNEVENTEFUL_EVENTS = (
     EventTransferReceivedSuccess,
-    EventUnlockSuccess,
     EventWithdrawFailed,
     EventWithdrawSuccess,
 
@@ -54,6 +53,10 @@ class StateMachineEventHandler(object):
     def __init__(self, raiden):
         self.raiden = raiden
 
+        # hashlock: (token, receiver, target) of the last mediated transfer
+        # sent, used to learn the reliability of the routes
+        self.hashlock_to_route = dict()
+
     def log_and_dispatch_to_all_tasks(self, state_change):
         """Log a state change, dispatch it to all state managers and log generated events"""
         state_change_id = self.raiden.transaction_log.log(state_change)
@@ -123,6 +126,8 @@ class StateMachineEventHandler(object):
             )
             self.raiden.send_async(receiver, mediated_transfer)
 
+            self.hashlock_to_route[event.hashlock] = (event.token, receiver, event.target)
+
         elif isinstance(event, SendRevealSecret):
             reveal_message = RevealSecret(event.secret)
             self.raiden.sign(reveal_message)
@@ -181,13 +186,30 @@ class StateMachineEventHandler(object):
                 result.set(False)
         elif isinstance(event, UNEVENTEFUL_EVENTS):
             pass
+
+        elif isinstance(event, EventUnlockSuccess):
+            route = self.hashlock_to_route.pop(event.hashlock, None)
+
+            if route is not None:
+                token, receiver, target = route
+                graph = self.raiden.token_to_channelgraph[token]
+                graph.route_reliability.record_success(receiver, target)
+
         elif isinstance(event, EventUnlockFailed):
             log.error(
                 'UnlockFailed!',
-                initiator=event.initiator,
-                expiration=event.expiration
+                identifier=event.identifier,
+                reason=event.reason,
             )
 
+            route = self.hashlock_to_route.pop(event.hashlock, None)
+
+            # canceled routes are accounted for when the refund is received
+            if route is not None and event.reason == 'lock expired':
+                token, receiver, target = route
+                graph = self.raiden.token_to_channelgraph[token]
+                graph.route_reliability.record_timeout(receiver, target)
+
         elif isinstance(event, ContractSendChannelClose):
             graph = self.raiden.token_to_channelgraph[event.token]
             channel = graph.address_to_channel[event.channel_address]
@@ -282,6 +304,15 @@ class StateMachineEventHandler(object):
         channel = self.raiden.find_channel_by_address(channel_address)
         channel.state_transition(state_change)
 
+        # the settled channel cannot be used for routing anymore, only the
+        # settlements of our channels are received
+        graph = self.raiden.token_to_channelgraph[channel.token_address]
+        our_address = channel.our_state.address
+        partner_address = channel.partner_state.address
+
+        if graph.has_channel(our_address, partner_address):
+            graph.remove_path(our_address, partner_address)
+
     def handle_withdraw(self, state_change):
         secret = state_change.secret
         self.raiden.register_secret(secret)
@@ -153,6 +153,16 @@ class RaidenMessageHandler(object):
             message.lock.hashlock,
         )
 
+        # the partner could not find a route with enough capacity
+        graph = self.raiden.token_to_channelgraph.get(message.token)
+        if graph is not None:
+            graph.capacity_hints.record_refund(
+                message.sender,
+                message.target,
+                message.lock.amount,
+            )
+            graph.route_reliability.record_refund(message.sender, message.target)
+
         transfer_state = LockedTransferState(
             identifier=message.identifier,
             amount=message.lock.amount,
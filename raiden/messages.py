@@ -52,6 +52,25 @@ def decode(data):
     return klass.decode(data)
 
 
+def decode_verified(data, sender):
+    """ Decodes `data` without recovering the signer, used for packets that
+    were validated by another process.
+
+    Args:
+        data (bytes): the encoded message.
+        sender (address): the address recovered from the message signature.
+    """
+    klass = CMDID_TO_CLASS[data[0]]
+    packed = messages.wrap(data)
+
+    if packed is None:
+        return
+
+    message = klass.unpack(packed)  # pylint: disable=no-member
+    message.sender = sender
+    return message
+
+
 class MessageHashable(object):
     pass
 
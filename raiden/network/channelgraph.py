@@ -3,7 +3,7 @@ import logging
 from collections import namedtuple
 from heapq import heappush, heappop
 
-import networkx
+import cachetools
 from ethereum import slogging
 
 from raiden.utils import isaddress, pex
@@ -15,13 +15,31 @@ from raiden.transfer.state import (
 from raiden.channel.netting_channel import (
     Channel,
 )
+from raiden.network.compactgraph import CompactGraph
 from raiden.network.protocol import (
     NODE_NETWORK_UNKNOWN,
     NODE_NETWORK_REACHABLE,
 )
+from raiden.network.routing import (
+    CapacityHints,
+    RouteReliability,
+    REFUND_SUCCESS_PROBABILITY,
+    k_shortest_paths,
+    probability_cost,
+)
 
 log = slogging.getLogger(__name__)  # pylint: disable=invalid-name
 
+# Number of targets for which the distance map is kept
+DISTANCE_CACHE_SIZE = 128
+
+# Nodes with more neighbors order them with a single BFS from the target,
+# otherwise a bidirectional search per neighbor is faster
+HUB_NEIGHBORS = 50
+
+# Number of candidate paths used to order the first hops
+ROUTE_CANDIDATES = 3
+
 ChannelDetails = namedtuple(
     'ChannelDetails',
     (
@@ -44,8 +62,9 @@ def make_graph(edge_list):
             the graph.
 
     Returns:
-        Graph A networkx.Graph instance were the graph nodes are nodes in the
-            network and the edges are nodes that have a channel between them.
+        CompactGraph: An undirected graph were the graph nodes are nodes in
+            the network and the edges are nodes that have a channel between
+            them.
     """
 
     for edge in edge_list:
@@ -57,12 +76,8 @@ def make_graph(edge_list):
         if not isaddress(origin) or not isaddress(destination):
             raise ValueError('All values in edge_list must be valid addresses')
 
-    graph = networkx.Graph()  # undirected graph, for bidirectional channels
-
-    for first, second in edge_list:
-        graph.add_edge(first, second)
-
-    return graph
+    # undirected graph, for bidirectional channels
+    return CompactGraph(edge_list)
 
 
 def channel_to_routestate(channel, node_address):
@@ -90,26 +105,132 @@ def channel_to_routestate(channel, node_address):
     return state
 
 
-def ordered_neighbors(nx_graph, our_address, target_address):
+class DistanceMap(object):
+    """ Hop count from the nodes of the graph to `target_address`.
+
+    The channels are bidirectional, so a single BFS from the target gives the
+    distances of all nodes. The BFS is expanded one level at a time and only
+    as far as needed by the queries, a node's distance is final once it has
+    been reached.
+    """
+
+    def __init__(self, graph, target_address):
+        self.graph = graph
+
+        # the distances are keyed by the node index
+        target_index = graph.node_to_index.get(target_address)
+        if target_index is not None:
+            self.distances = {target_index: 0}
+            self.frontier = [target_index]
+        else:
+            self.distances = dict()
+            self.frontier = list()
+
+        self.level = 0
+
+    def expand(self):
+        """ Visit the next level of the BFS. """
+        distances = self.distances
+        neighbor_indices = self.graph.neighbor_indices
+        next_frontier = list()
+        self.level += 1
+
+        for index in self.frontier:
+            for neighbor in neighbor_indices(index):
+                if neighbor not in distances:
+                    distances[neighbor] = self.level
+                    next_frontier.append(neighbor)
+
+        self.frontier = next_frontier
+
+    def get(self, node_address):
+        """ Return the distance to the target or None if there is no path. """
+        index = self.graph.node_to_index.get(node_address)
+
+        if index is None:
+            return None
+
+        return self.get_by_index(index)
+
+    def get_by_index(self, index):
+        while index not in self.distances and self.frontier:
+            self.expand()
+
+        return self.distances.get(index)
+
+    def estimate(self, index):
+        """ Admissible estimate of the distance, used as the A* heuristic. """
+        return self.get_by_index(index)
+
+    def edge_added(self, first_index, second_index):
+        """ Return True if the distances are still valid after the edge was
+        added to the graph.
+        """
+        # the target was not in the graph
+        if not self.distances:
+            return False
+
+        first = self.distances.get(first_index)
+        second = self.distances.get(second_index)
+
+        if first is None and second is None:
+            return True
+
+        # the BFS will reach the other node through the new edge
+        if first is None or second is None:
+            return (first if first is not None else second) == self.level
+
+        return abs(first - second) <= 1
+
+    def edge_removed(self, first_index, second_index):
+        """ Return True if the distances are still valid after the edge was
+        removed from the graph.
+        """
+        first = self.distances.get(first_index)
+        second = self.distances.get(second_index)
+
+        # the edge was not used by the BFS yet
+        if first is None or second is None or first == second:
+            return True
+
+        if first > second:
+            first_index, second_index = second_index, first_index
+            first, second = second, first
+
+        # the farther node keeps its distance if it has another parent
+        return any(
+            self.distances.get(neighbor) == first
+            for neighbor in self.graph.neighbor_indices(second_index)
+        )
+
+
+def ordered_neighbors(graph, our_address, target_address, distances=None):
     paths = list()
 
-    try:
-        all_neighbors = networkx.all_neighbors(nx_graph, our_address)
-    except networkx.NetworkXError:
-        # If `our_address` is not in the graph, no channels opened with the
-        # address
+    # If `our_address` is not in the graph, no channels opened with the
+    # address
+    if our_address not in graph:
         return []
 
-    for neighbor in all_neighbors:
-        try:
-            length = networkx.shortest_path_length(
-                nx_graph,
-                neighbor,
-                target_address,
-            )
+    neighbors = graph.neighbors(our_address)
+
+    if distances is None and len(neighbors) <= HUB_NEIGHBORS:
+        for neighbor in neighbors:
+            length = graph.shortest_path_length(neighbor, target_address)
+
+            if length is not None:
+                heappush(paths, (length, neighbor))
+
+        return paths
+
+    if distances is None:
+        distances = DistanceMap(graph, target_address)
+
+    for neighbor in neighbors:
+        length = distances.get(neighbor)
+
+        if length is not None:
             heappush(paths, (length, neighbor))
-        except networkx.NetworkXNoPath:
-            pass
 
     return paths
 
@@ -120,31 +241,49 @@ def get_best_routes(
         our_address,
         target_address,
         amount,
-        previous_address=None):
+        previous_address=None,
+        allow_partial=False):
 
     """ Yield a two-tuple (path, channel) that can be used to mediate the
     transfer. The result is ordered from the best to worst path.
-    """
 
-    # XXX: consider using multiple channels for a single transfer. Useful
-    # for cases were the `amount` is larger than what is available
-    # individually in any of the channels.
-    #
-    # One possible approach is to _not_ filter these channels based on the
-    # distributable amount, but to sort them based on available balance and
-    # let the task use as many as required to finish the transfer.
+    The first hops of the best candidate paths, weighted by the hop count and
+    the estimated channel capacities, come first. The remaining neighbors are
+    ordered by their distance to the target.
+
+    If `allow_partial` is set the channels that cannot carry the whole
+    `amount` are not filtered, so that it can be split across them.
+    """
 
     online_nodes = list()
     unknown_nodes = list()
 
-    neighbors_heap = ordered_neighbors(
-        channel_graph.graph,
+    best_paths = channel_graph.get_best_paths(
         our_address,
         target_address,
+        amount,
+        ROUTE_CANDIDATES,
     )
 
+    firsthop_to_cost = dict()
+    for cost, path in best_paths:
+        if len(path) > 1 and path[1] not in firsthop_to_cost:
+            firsthop_to_cost[path[1]] = cost
+
+    neighbors_heap = list()
+    for length, partner_address in ordered_neighbors(
+            channel_graph.graph,
+            our_address,
+            target_address,
+            channel_graph.distance_cache.get(target_address)):
+
+        if partner_address in firsthop_to_cost:
+            heappush(neighbors_heap, (0, firsthop_to_cost[partner_address], partner_address))
+        else:
+            heappush(neighbors_heap, (1, length, partner_address))
+
     while neighbors_heap:
-        _, partner_address = heappop(neighbors_heap)
+        _, _, partner_address = heappop(neighbors_heap)
         channel = channel_graph.partneraddress_to_channel[partner_address]
 
         # don't send the message backwards
@@ -161,7 +300,7 @@ def get_best_routes(
 
             continue
 
-        if amount > channel.distributable:
+        if amount > channel.distributable and not allow_partial:
             if log.isEnabledFor(logging.INFO):
                 log.info(
                     'channel %s - %s doesnt have enough funds [%s], ignoring',
@@ -209,6 +348,12 @@ class ChannelGraph(object):
         self.token_address = token_address
         self.channelmanager_address = channelmanager_address
 
+        # target: DistanceMap, the maps invalidated by a change of the graph
+        # are dropped
+        self.distance_cache = cachetools.LRUCache(maxsize=DISTANCE_CACHE_SIZE)
+        self.capacity_hints = CapacityHints()
+        self.route_reliability = RouteReliability()
+
         for details in channels_details:
             self.add_channel(details)
 
@@ -216,8 +361,7 @@ class ChannelGraph(object):
         if isinstance(other, ChannelGraph):
             return (
                 self.address_to_channel == other.address_to_channel and
-                # networkx.classes.graph.Graph has no __eq__
-                self.graph.__dict__ == other.graph.__dict__ and
+                self.graph == other.graph and
                 self.our_address == other.our_address and
                 self.partneraddress_to_channel == other.partneraddress_to_channel and
                 self.token_address == other.token_address and
@@ -262,7 +406,7 @@ class ChannelGraph(object):
         if not isaddress(source) or not isaddress(target):
             raise ValueError('both source and target must be valid addresses')
 
-        return networkx.all_shortest_paths(self.graph, source, target)
+        return self.graph.all_shortest_paths(source, target)
 
     def get_paths_of_length(self, source, num_hops=1):
         """ Searchs for all nodes that are `num_hops` away.
@@ -271,36 +415,116 @@ class ChannelGraph(object):
             list of paths: A list of all shortest paths that have length
             `num_hops + 1`
         """
-        # return a dictionary keyed by targets
-        # with a list of nodes in a shortest path
-        # from the source to one of the targets.
-        all_paths = networkx.shortest_path(self.graph, source)
+        return self.graph.paths_of_length(source, num_hops)
+
+    def get_distances_to(self, target_address):
+        """ Return the DistanceMap of `target_address`, it is cached until a
+        change of the graph invalidates it.
+        """
+        distances = self.distance_cache.get(target_address)
+
+        if distances is None:
+            distances = DistanceMap(self.graph, target_address)
+            self.distance_cache[target_address] = distances
+
+        return distances
+
+    def get_best_paths(self, source_address, target_address, amount, k):
+        """ Return up to `k` (cost, path) tuples from `source_address` to
+        `target_address`, ordered by the cost.
+
+        The cost of a channel is one hop plus the penalty for the estimated
+        probability of it having enough capacity for `amount`. Our channels
+        are only used if they have enough funds, their probability is the
+        learned reliability of the partner as a mediator to the target.
+        """
+        source_index = self.graph.node_to_index.get(source_address)
+        target_index = self.graph.node_to_index.get(target_address)
+
+        if source_index is None or target_index is None:
+            return list()
+
+        distances = self.get_distances_to(target_address)
+        index_to_node = self.graph.index_to_node
+        capacity_hints = self.capacity_hints
+
+        def edge_cost(from_index, to_index):
+            from_address = index_to_node[from_index]
+            to_address = index_to_node[to_index]
+
+            if from_address == self.our_address:
+                channel = self.partneraddress_to_channel.get(to_address)
+
+                if channel is None or not channel.can_transfer or amount > channel.distributable:
+                    return None
+
+                probability = self.route_reliability.success_rate(
+                    to_address,
+                    target_address,
+                )
+
+                if capacity_hints.refunded(to_address, target_address, amount):
+                    probability = min(probability, REFUND_SUCCESS_PROBABILITY)
+            else:
+                probability = capacity_hints.success_probability(
+                    from_address,
+                    to_address,
+                    amount,
+                )
+
+            if probability <= 0:
+                return None
+
+            return 1 + probability_cost(probability)
+
+        paths = k_shortest_paths(
+            self.graph,
+            source_index,
+            target_index,
+            edge_cost,
+            distances.estimate,
+            k,
+        )
 
         return [
-            path
-            for path in all_paths.values()
-            if len(path) == num_hops + 1
+            (cost, [index_to_node[index] for index in path])
+            for cost, path in paths
         ]
 
     def has_path(self, source_address, target_address):
         """ True if there is a connecting path regardless of the number of hops. """
-        try:
-            return networkx.has_path(self.graph, source_address, target_address)
-        except networkx.NetworkXError:
-            return False
+        # this also primes the cache used to route to the target
+        return self.get_distances_to(target_address).get(source_address) is not None
 
     def has_channel(self, source_address, target_address):
         """ True if there is a channel connecting both addresses. """
         return self.graph.has_edge(source_address, target_address)
 
+    def drop_distances(self, is_valid):
+        """ Drop the cached distance maps for which `is_valid(distances)` is
+        False.
+        """
+        for target_address, distances in list(self.distance_cache.items()):
+            if not is_valid(distances):
+                del self.distance_cache[target_address]
+
     def add_path(self, from_address, to_address):
         """ Add a new edge into the network. """
         self.graph.add_edge(from_address, to_address)
 
+        from_index = self.graph.node_to_index[from_address]
+        to_index = self.graph.node_to_index[to_address]
+        self.drop_distances(lambda distances: distances.edge_added(from_index, to_index))
+
     def remove_path(self, from_address, to_address):
         """ Remove an edge from the network. """
         self.graph.remove_edge(from_address, to_address)
 
+        from_index = self.graph.node_to_index[from_address]
+        to_index = self.graph.node_to_index[to_address]
+        self.drop_distances(lambda distances: distances.edge_removed(from_index, to_index))
+        self.capacity_hints.remove_channel(from_address, to_address)
+
     def channel_can_transfer(self, partner_address):
         """ True if the channel with `partner_address` is open and has spendable funds. """
         # TODO: check if the partner's network is alive
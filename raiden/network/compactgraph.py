@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Undirected graph used to represent the token networks.
+
+The node addresses are interned to integer indices and the adjacency is
+stored in CSR form: the neighbors of the node `i` are
+`targets[offsets[i]:offsets[i + 1]]`. The arrays are only rebuilt once enough
+edges were inserted or deleted, until then the changes are kept in a small
+overlay that is merged on lookups.
+"""
+from array import array
+
+# The CSR arrays are rebuilt once the number of changes in the overlay is
+# larger than this ratio of the number of edges, or the minimum below.
+COMPACTION_RATIO = 0.1
+COMPACTION_MINIMUM = 1024
+
+
+class CompactGraph(object):
+    """ Undirected graph with interned nodes and CSR adjacency arrays. """
+
+    def __init__(self, edge_list=()):
+        self.node_to_index = dict()
+        self.index_to_node = list()
+
+        self.offsets = array('l', [0])
+        self.targets = array('l')
+
+        # changes since the last compaction, both directions are stored
+        self.inserted = dict()
+        self.deleted = set()
+        self.changes = 0
+        self.edge_count = 0
+
+        # build the arrays directly instead of going through the overlay
+        adjacency = list()
+        for first, second in edge_list:
+            first_index = self.intern(first)
+            second_index = self.intern(second)
+
+            while len(adjacency) < len(self.index_to_node):
+                adjacency.append(set())
+
+            if second_index not in adjacency[first_index]:
+                adjacency[first_index].add(second_index)
+                adjacency[second_index].add(first_index)
+                self.edge_count += 1
+
+        for neighbors in adjacency:
+            self.targets.extend(neighbors)
+            self.offsets.append(len(self.targets))
+
+    def __contains__(self, node):
+        return node in self.node_to_index
+
+    def __len__(self):
+        return len(self.index_to_node)
+
+    def __eq__(self, other):
+        if isinstance(other, CompactGraph):
+            return (
+                set(self.index_to_node) == set(other.index_to_node) and
+                set(self.edges()) == set(other.edges())
+            )
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def nodes(self):
+        return list(self.index_to_node)
+
+    def edges(self):
+        """ Yield each edge once, as a sorted address pair. """
+        for index, node in enumerate(self.index_to_node):
+            for neighbor in self.neighbor_indices(index):
+                if index < neighbor:
+                    yield tuple(sorted((node, self.index_to_node[neighbor])))
+
+    def number_of_edges(self):
+        return self.edge_count
+
+    def intern(self, node):
+        """ Return the index of `node`, adding it to the graph if needed. """
+        index = self.node_to_index.get(node)
+
+        if index is None:
+            index = len(self.index_to_node)
+            self.node_to_index[node] = index
+            self.index_to_node.append(node)
+
+        return index
+
+    def neighbor_indices(self, index):
+        # nodes added after the last compaction are not in the arrays
+        if index + 1 < len(self.offsets):
+            neighbors = self.targets[self.offsets[index]:self.offsets[index + 1]]
+        else:
+            neighbors = ()
+
+        if self.deleted:
+            neighbors = [
+                neighbor
+                for neighbor in neighbors
+                if (index, neighbor) not in self.deleted
+            ]
+
+        inserted = self.inserted.get(index)
+        if inserted:
+            neighbors = list(neighbors) + inserted
+
+        return neighbors
+
+    def neighbors(self, node):
+        """ Return the list of nodes connected to `node`.
+
+        Raises:
+            KeyError: If the node is not in the graph.
+        """
+        index = self.node_to_index[node]
+        return [
+            self.index_to_node[neighbor]
+            for neighbor in self.neighbor_indices(index)
+        ]
+
+    def has_edge(self, first, second):
+        first_index = self.node_to_index.get(first)
+        second_index = self.node_to_index.get(second)
+
+        if first_index is None or second_index is None:
+            return False
+
+        return second_index in self.neighbor_indices(first_index)
+
+    def add_edge(self, first, second):
+        if self.has_edge(first, second):
+            return
+
+        first_index = self.intern(first)
+        second_index = self.intern(second)
+
+        if (first_index, second_index) in self.deleted:
+            # the edge is still in the arrays
+            self.deleted.discard((first_index, second_index))
+            self.deleted.discard((second_index, first_index))
+        else:
+            self.inserted.setdefault(first_index, list()).append(second_index)
+            self.inserted.setdefault(second_index, list()).append(first_index)
+
+        self.edge_count += 1
+        self.changes += 1
+        self.maybe_compact()
+
+    def remove_edge(self, first, second):
+        """ Remove the edge between `first` and `second`, the nodes are kept.
+
+        Raises:
+            ValueError: If the edge is not in the graph.
+        """
+        if not self.has_edge(first, second):
+            raise ValueError('The edge is not in the graph')
+
+        first_index = self.node_to_index[first]
+        second_index = self.node_to_index[second]
+
+        first_inserted = self.inserted.get(first_index, ())
+        if second_index in first_inserted:
+            first_inserted.remove(second_index)
+            self.inserted[second_index].remove(first_index)
+        else:
+            self.deleted.add((first_index, second_index))
+            self.deleted.add((second_index, first_index))
+
+        self.edge_count -= 1
+        self.changes += 1
+        self.maybe_compact()
+
+    def maybe_compact(self):
+        if self.changes > max(COMPACTION_MINIMUM, self.edge_count * COMPACTION_RATIO):
+            self.compact()
+
+    def compact(self):
+        """ Rebuild the CSR arrays merging the pending changes. """
+        offsets = array('l', [0])
+        targets = array('l')
+
+        for index in range(len(self.index_to_node)):
+            targets.extend(self.neighbor_indices(index))
+            offsets.append(len(targets))
+
+        self.offsets = offsets
+        self.targets = targets
+        self.inserted = dict()
+        self.deleted = set()
+        self.changes = 0
+
+    def all_shortest_paths(self, source, target):
+        """ Yield all the shortest paths from `source` to `target`. """
+        source_index = self.node_to_index.get(source)
+        target_index = self.node_to_index.get(target)
+
+        if source_index is None or target_index is None:
+            return
+
+        # BFS from the source keeping all the predecessors in a shortest path
+        predecessors = {source_index: list()}
+        frontier = [source_index]
+
+        while frontier and target_index not in predecessors:
+            next_level = dict()
+
+            for index in frontier:
+                for neighbor in self.neighbor_indices(index):
+                    if neighbor not in predecessors:
+                        next_level.setdefault(neighbor, list()).append(index)
+
+            predecessors.update(next_level)
+            frontier = list(next_level)
+
+        if target_index not in predecessors:
+            return
+
+        stack = [[target_index]]
+        while stack:
+            path = stack.pop()
+            head = path[-1]
+
+            if head == source_index:
+                yield [self.index_to_node[index] for index in reversed(path)]
+            else:
+                for predecessor in predecessors[head]:
+                    stack.append(path + [predecessor])
+
+    def shortest_path_length(self, source, target):
+        """ Return the number of hops from `source` to `target`, or None if
+        they are not connected.
+
+        The search is bidirectional, expanding the smaller of the two
+        frontiers one level at a time.
+        """
+        source_index = self.node_to_index.get(source)
+        target_index = self.node_to_index.get(target)
+
+        if source_index is None or target_index is None:
+            return None
+
+        if source_index == target_index:
+            return 0
+
+        forward = {source_index: 0}
+        backward = {target_index: 0}
+        forward_frontier = [source_index]
+        backward_frontier = [target_index]
+
+        while forward_frontier and backward_frontier:
+            if len(forward_frontier) <= len(backward_frontier):
+                frontier, visited, other = forward_frontier, forward, backward
+            else:
+                frontier, visited, other = backward_frontier, backward, forward
+
+            length = None
+            next_frontier = list()
+            for index in frontier:
+                for neighbor in self.neighbor_indices(index):
+                    if neighbor in other:
+                        found = visited[index] + 1 + other[neighbor]
+                        if length is None or found < length:
+                            length = found
+
+                    elif neighbor not in visited:
+                        visited[neighbor] = visited[index] + 1
+                        next_frontier.append(neighbor)
+
+            # the whole level is checked since the meeting points may be at
+            # different depths of the other search
+            if length is not None:
+                return length
+
+            if visited is forward:
+                forward_frontier = next_frontier
+            else:
+                backward_frontier = next_frontier
+
+        return None
+
+    def paths_of_length(self, source, num_hops):
+        """ Return one shortest path from `source` to each node that is
+        `num_hops` away.
+        """
+        source_index = self.node_to_index.get(source)
+
+        if source_index is None:
+            return list()
+
+        parents = {source_index: None}
+        frontier = [source_index]
+
+        for _ in range(num_hops):
+            next_frontier = list()
+
+            for index in frontier:
+                for neighbor in self.neighbor_indices(index):
+                    if neighbor not in parents:
+                        parents[neighbor] = index
+                        next_frontier.append(neighbor)
+
+            frontier = next_frontier
+
+        paths = list()
+        for index in frontier:
+            path = list()
+
+            while index is not None:
+                path.append(self.index_to_node[index])
+                index = parents[index]
+
+            path.reverse()
+            paths.append(path)
+
+        return paths
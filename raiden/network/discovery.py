@@ -1,13 +1,31 @@
 # -*- coding: utf-8 -*-
+import cPickle as pickle
+import os
 import socket
 
+import cachetools
+from ethereum import slogging
+from gevent.pool import Pool
+from pyethapp.jsonrpc import address_decoder
+
+from raiden.blockchain.abi import (
+    CONTRACT_MANAGER,
+    CONTRACT_ENDPOINT_REGISTRY,
+    EVENT_ADDRESS_REGISTERED,
+)
+from raiden.settings import CACHE_TTL
 from raiden.utils import (
     host_port_to_endpoint,
     isaddress,
     pex,
     split_endpoint,
 )
-from raiden.exceptions import InvalidAddress
+from raiden.exceptions import InvalidAddress, UnknownAddress
+
+log = slogging.get_logger(__name__)  # pylint: disable=invalid-name
+
+# Number of concurrent lookups when the bulk endpoint lookup is not supported
+PRELOAD_POOL_SIZE = 20
 
 
 class Discovery(object):
@@ -15,6 +33,7 @@ class Discovery(object):
 
     def __init__(self):
         self.nodeid_to_hostport = dict()
+        self.hostport_to_nodeid = dict()
 
     def register(self, node_address, host, port):
         if not isaddress(node_address):
@@ -28,7 +47,18 @@ class Discovery(object):
         if not isinstance(port, (int, long)):
             raise ValueError('port must be a valid number')
 
-        self.nodeid_to_hostport[node_address] = (host, port)
+        self.set_endpoint(node_address, (host, port))
+
+    def set_endpoint(self, node_address, host_port):
+        """ Update both directions of the endpoint index. """
+        old_host_port = self.nodeid_to_hostport.get(node_address)
+
+        # the endpoint may have been taken by another node in the meantime
+        if self.hostport_to_nodeid.get(old_host_port) == node_address:
+            del self.hostport_to_nodeid[old_host_port]
+
+        self.nodeid_to_hostport[node_address] = host_port
+        self.hostport_to_nodeid[host_port] = node_address
 
     def get(self, node_address):
         try:
@@ -37,23 +67,203 @@ class Discovery(object):
             raise InvalidAddress('Unknown address {}'.format(pex(node_address)))
 
     def nodeid_by_host_port(self, host_port):
-        for nodeid, value_hostport in self.nodeid_to_hostport.items():
-            if value_hostport == host_port:
-                return nodeid
-        return None
+        return self.hostport_to_nodeid.get(host_port)
+
+    def poll_registrations(self, current_block=None):  # pylint: disable=unused-argument
+        """ Alarm callback used to keep the endpoints up-to-date, the mock
+        discovery is always current.
+        """
+        pass
+
+    def preload_endpoints(self, node_addresses):  # pylint: disable=unused-argument
+        """ Warm the cache for `node_addresses`, the mock discovery has all
+        the endpoints in memory.
+        """
+        pass
 
 
 class ContractDiscovery(Discovery):
     """ Raiden node discovery.
 
     Allows registering and looking up by endpoint (host, port) for node_address.
+
+    All the endpoints are cached, the cache is preloaded from the registry's
+    AddressRegistered events and kept current by `poll_registrations`, so
+    lookups for known nodes don't need a RPC call. If `cache_path` is given the
+    endpoints are persisted and on restart only the newer events are fetched.
+    Lookups for unknown addresses are cached negatively for `unknown_ttl`
+    seconds. The reverse lookup `nodeid_by_host_port` is answered from the
+    cache as well.
     """
 
-    def __init__(self, node_address, discovery_proxy):
+    def __init__(
+            self,
+            node_address,
+            discovery_proxy,
+            cache_path=None,
+            unknown_ttl=CACHE_TTL,
+            unknown_size=1000):
+
         super(ContractDiscovery, self).__init__()
 
         self.node_address = node_address
         self.discovery_proxy = discovery_proxy
+        self.cache_path = cache_path
+        self.unknown_addresses = cachetools.TTLCache(
+            maxsize=unknown_size,
+            ttl=unknown_ttl,
+        )
+        self.translator = CONTRACT_MANAGER.get_translator(CONTRACT_ENDPOINT_REGISTRY)
+
+        # Block up to which the registry events are in the cache
+        self.synced_block = 0
+        self.cache_changed = False
+        self.load_cache()
+
+        self.registration_filter = None
+        self.install_registration_filter()
+
+    def install_registration_filter(self):
+        """ Install the AddressRegistered filter and read the registrations
+        since `synced_block`, also used to replace a filter the node dropped.
+        """
+        self.registration_filter = self.discovery_proxy.addressregistered_filter(
+            from_block=self.synced_block,
+        )
+        self.update_endpoints(self.registration_filter.getall())
+
+    def load_cache(self):
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return
+
+        try:
+            with open(self.cache_path, 'rb') as handler:
+                data = pickle.load(handler)
+        except (EOFError, IOError, pickle.UnpicklingError):
+            log.error('could not load the discovery cache', path=self.cache_path)
+            return
+
+        self.synced_block = data['block_number']
+        for node_address, host_port in data['endpoints'].iteritems():
+            self.set_endpoint(node_address, host_port)
+
+    def save_cache(self):
+        data = {
+            'block_number': self.synced_block,
+            'endpoints': self.nodeid_to_hostport,
+        }
+
+        # write to a temporary file first to not corrupt the cache if the
+        # node is stopped midway
+        temporary_path = self.cache_path + '.tmp'
+        with open(temporary_path, 'wb') as handler:
+            pickle.dump(data, handler, pickle.HIGHEST_PROTOCOL)
+        os.rename(temporary_path, self.cache_path)
+
+        self.cache_changed = False
+
+    def update_endpoints(self, log_events):
+        for log_event in log_events:
+            event = self.translator.decode_event(
+                log_event['topics'],
+                log_event['data'],
+            )
+
+            if event is None or event['_event_type'] != EVENT_ADDRESS_REGISTERED:
+                continue
+
+            node_address = address_decoder(event['eth_address'])
+
+            try:
+                host_port = split_endpoint(event['socket'])
+            except ValueError:
+                log.error(
+                    'invalid endpoint registered',
+                    node=pex(node_address),
+                    endpoint=event['socket'],
+                )
+                continue
+
+            self.set_endpoint(node_address, host_port)
+            self.unknown_addresses.pop(node_address, None)
+            self.cache_changed = True
+
+    def poll_registrations(self, current_block=None):
+        try:
+            log_events = self.registration_filter.changes()
+        except Exception:  # pylint: disable=broad-except
+            # e.g. the node was restarted, if it's still unavailable this
+            # raises and the next block tries again from the same block
+            log.exception('registration filter failed, reinstalling it')
+            self.install_registration_filter()
+        else:
+            self.update_endpoints(log_events)
+
+        if current_block is not None:
+            self.synced_block = current_block
+
+        if self.cache_changed and self.cache_path is not None:
+            self.save_cache()
+
+    def preload_endpoints(self, node_addresses):
+        """ Fetch the endpoints of the `node_addresses` that are not cached in
+        one call.
+
+        Registries deployed before `findEndpointsByAddresses` was added don't
+        support the bulk lookup, the endpoints are then fetched one by one.
+        """
+        missing = [
+            node_address
+            for node_address in node_addresses
+            if node_address not in self.nodeid_to_hostport
+        ]
+
+        if not missing:
+            return
+
+        try:
+            endpoints = self.discovery_proxy.endpoints_by_addresses(missing)
+        except Exception:  # pylint: disable=broad-except
+            log.warning('bulk endpoint lookup failed, fetching the endpoints one by one')
+            self.fetch_endpoints(missing)
+            return
+
+        # nothing to tell apart unregistered addresses from a failed lookup
+        if not endpoints:
+            return
+
+        for node_address in missing:
+            endpoint = endpoints.get(node_address)
+
+            if endpoint is None:
+                self.unknown_addresses[node_address] = True
+                continue
+
+            try:
+                host_port = split_endpoint(endpoint)
+            except ValueError:
+                log.error(
+                    'invalid endpoint registered',
+                    node=pex(node_address),
+                    endpoint=endpoint,
+                )
+                continue
+
+            self.set_endpoint(node_address, host_port)
+            self.cache_changed = True
+
+    def fetch_endpoints(self, node_addresses):
+        """ Look up the `node_addresses` concurrently with `get`. """
+        def fetch(node_address):
+            try:
+                self.get(node_address)
+            except UnknownAddress:
+                pass
+            except Exception:  # pylint: disable=broad-except
+                log.exception('could not fetch the endpoint', node=pex(node_address))
+
+        pool = Pool(PRELOAD_POOL_SIZE)
+        pool.map(fetch, node_addresses)
 
     def register(self, node_address, host, port):
         if node_address != self.node_address:
@@ -73,12 +283,28 @@ class ContractDiscovery(Discovery):
         endpoint = host_port_to_endpoint(host, port)
         self.discovery_proxy.register_endpoint(node_address, endpoint)
 
+        # don't wait for the event to use the new endpoint
+        self.set_endpoint(node_address, (host, port))
+        self.unknown_addresses.pop(node_address, None)
+        self.cache_changed = True
+
     def get(self, node_address):
-        endpoint = self.discovery_proxy.endpoint_by_address(node_address)
+        host_port = self.nodeid_to_hostport.get(node_address)
+
+        if host_port is not None:
+            return host_port
+
+        if node_address in self.unknown_addresses:
+            raise UnknownAddress('Unknown address {}'.format(pex(node_address)))
+
+        try:
+            endpoint = self.discovery_proxy.endpoint_by_address(node_address)
+        except UnknownAddress:
+            self.unknown_addresses[node_address] = True
+            raise
+
         host_port = split_endpoint(endpoint)
-        return host_port
+        self.set_endpoint(node_address, host_port)
+        self.cache_changed = True
 
-    def nodeid_by_host_port(self, host_port):
-        host, port = host_port
-        endpoint = host_port_to_endpoint(host, port)
-        return self.discovery_proxy.address_by_endpoint(endpoint)
+        return host_port
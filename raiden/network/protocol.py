@@ -5,11 +5,10 @@ from collections import (
     namedtuple,
     defaultdict,
 )
-from itertools import repeat
+from itertools import count, repeat
 
-import cachetools
 import gevent
-from gevent.queue import Queue
+from gevent.queue import PriorityQueue, Queue
 from gevent.event import (
     _AbstractLinkable,
     AsyncResult,
@@ -29,10 +28,12 @@ from raiden.exceptions import (
 from raiden.constants import (
     UDP_MAX_MESSAGE_SIZE,
 )
+from raiden.encoding import messages
 from raiden.settings import (
-    CACHE_TTL,
+    DEFAULT_PROTOCOL_INBOUND_QUEUE_SIZE,
+    DEFAULT_PROTOCOL_INBOUND_WORKERS,
 )
-from raiden.messages import decode, Ack, Ping, SignedMessage
+from raiden.messages import decode, decode_verified, Ack, Ping, SignedMessage
 from raiden.utils import isaddress, sha3, pex
 
 log = slogging.get_logger(__name__)  # pylint: disable=invalid-name
@@ -53,6 +54,25 @@ NODE_NETWORK_UNKNOWN = 'unknown'
 NODE_NETWORK_UNREACHABLE = 'unreachable'
 NODE_NETWORK_REACHABLE = 'reachable'
 
+# Priority classes for outgoing packets, lower values are sent first. Control
+# messages are sent first because the peer's queues are blocked waiting for
+# them, followed by the messages required to unlock pending locks before they
+# expire, and lastly the messages that start new transfers.
+PRIORITY_CONTROL = 0
+PRIORITY_UNLOCK = 1
+PRIORITY_TRANSFER = 2
+
+CMDID_PRIORITY = {
+    messages.ACK: PRIORITY_CONTROL,
+    messages.PING: PRIORITY_CONTROL,
+    messages.SECRETREQUEST: PRIORITY_UNLOCK,
+    messages.SECRET: PRIORITY_UNLOCK,
+    messages.REVEALSECRET: PRIORITY_UNLOCK,
+    messages.DIRECTTRANSFER: PRIORITY_TRANSFER,
+    messages.MEDIATEDTRANSFER: PRIORITY_TRANSFER,
+    messages.REFUNDTRANSFER: PRIORITY_TRANSFER,
+}
+
 # GOALS:
 # - Each netting channel must have the messages processed in-order, the
 # protocol must detect unacknowledged messages and retry them.
@@ -127,9 +147,19 @@ def retry(protocol, data, receiver_address, event_stop, timeout_backoff):
 
     for timeout in timeout_backoff:
 
+        # The timeout starts once the packet is written, the time it spent
+        # waiting in the host queue because of the throttling is not a loss.
+        sent = protocol.packet_sent_event(receiver_address, data)
+        if sent is not None:
+            gevent.wait([sent, event_quit], count=1)
+
         if event_quit.wait(timeout=timeout) is True:
             break
 
+        # Either the message or its Ack was lost, the throttle policy may use
+        # this to reduce the sending rate to the receiver.
+        protocol.throttle_loss(receiver_address)
+
         protocol.send_raw_with_result(
             data,
             receiver_address,
@@ -284,6 +314,93 @@ def single_queue_send(
                     return
 
 
+def single_host_send(
+        transport,
+        sender,
+        host_port,
+        queue,
+        event_stop):
+
+    """ Sends the packets queued for `host_port` in priority order.
+
+    Notes:
+    - This task must be the only consumer of queue.
+    - Reordering packets is safe because the channel queues are stop-and-wait,
+      at any given time there is at most one message per channel in `queue`.
+    - There is one task per destination, so a destination that is throttled
+      does not delay the packets to other destinations.
+    """
+
+    if not isinstance(queue, NotifyingPriorityQueue):
+        raise ValueError('queue must be a NotifyingPriorityQueue.')
+
+    # Reusing the event, clear must be carefully done
+    data_or_stop = event_first_of(
+        queue,
+        event_stop,
+    )
+
+    while True:
+        data_or_stop.wait()
+
+        if event_stop.is_set():
+            return
+
+        # This task being the only consumer is a requirement.
+        data = queue.get(block=False)
+
+        try:
+            transport.send(
+                sender,
+                host_port,
+                data,
+            )
+        finally:
+            queue.mark_sent(data)
+
+        if not queue:
+            data_or_stop.clear()
+
+            if event_stop.is_set():
+                return
+
+
+def single_inbound_handler(protocol, queue, event_stop):
+    """ Handles the incoming packets in `queue` in order.
+
+    Notes:
+    - This task must be the only consumer of queue.
+    - An exception while handling a packet must not stop the task, otherwise
+      the queue would fill up and all packets from its senders would be
+      dropped.
+    """
+
+    # Reusing the event, clear must be carefully done
+    data_or_stop = event_first_of(
+        queue,
+        event_stop,
+    )
+
+    while True:
+        data_or_stop.wait()
+
+        if event_stop.is_set():
+            return
+
+        data, echohash, sender = queue.get(block=False)
+
+        try:
+            protocol.handle_packet(data, echohash, sender)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('unexpected exception while handling packet')
+
+        if not queue:
+            data_or_stop.clear()
+
+            if event_stop.is_set():
+                return
+
+
 def healthcheck(
         protocol,
         receiver_address,
@@ -393,6 +510,64 @@ class NotifyingQueue(Event):
         ]
 
 
+class NotifyingPriorityQueue(NotifyingQueue):
+    """ A NotifyingQueue that returns the items with the lowest priority value
+    first, items with the same priority are returned in FIFO order.
+
+    Items that are already in the queue are not added again, this avoids
+    sending the same packet multiple times when the retries are faster than
+    the throttling.
+
+    The consumer calls `mark_sent` once an item is written, so that the
+    retries can wait for `sent_event` before starting their timeout.
+    """
+
+    def __init__(self):
+        super(NotifyingPriorityQueue, self).__init__()
+        self._queue = PriorityQueue()
+        self._items = set()
+        self._writing = set()
+        self._sent_events = dict()
+        self._counter = count()
+
+    def put(self, item, priority=PRIORITY_TRANSFER):  # pylint: disable=arguments-differ
+        """ Add new item to the queue if it's not already queued. """
+        if item in self._items:
+            return
+
+        self._items.add(item)
+        self._queue.put((priority, next(self._counter), item))
+        self.set()
+
+    def get(self, block=True, timeout=None):
+        """ Removes and returns the item with the highest priority. """
+        _, _, item = super(NotifyingPriorityQueue, self).get(block, timeout)
+        self._items.discard(item)
+        self._writing.add(item)
+        return item
+
+    def mark_sent(self, item):
+        """ Signals that `item` was written by the consumer. """
+        self._writing.discard(item)
+
+        event = self._sent_events.pop(item, None)
+        if event is not None:
+            event.set()
+
+    def sent_event(self, item):
+        """ Returns an Event set once `item` is written, None if the item is
+        neither queued nor being written.
+        """
+        if item not in self._items and item not in self._writing:
+            return None
+
+        return self._sent_events.setdefault(item, Event())
+
+    def peek(self, block=True, timeout=None):
+        _, _, item = self._queue.peek(block, timeout)
+        return item
+
+
 class RaidenProtocol(object):
     """ Encode the message into a packet and send it.
 
@@ -412,7 +587,9 @@ class RaidenProtocol(object):
             retries_before_backoff,
             nat_keepalive_retries,
             nat_keepalive_timeout,
-            nat_invitation_timeout):
+            nat_invitation_timeout,
+            inbound_workers=DEFAULT_PROTOCOL_INBOUND_WORKERS,
+            inbound_queue_size=DEFAULT_PROTOCOL_INBOUND_QUEUE_SIZE):
 
         self.transport = transport
         self.discovery = discovery
@@ -428,6 +605,7 @@ class RaidenProtocol(object):
         self.event_stop = Event()
 
         self.channel_queue = dict()  # TODO: Change keys to the channel address
+        self.hostport_to_sendqueue = dict()
         self.greenlets = list()
         self.addresses_events = dict()
         self.nodeaddresses_networkstatuses = defaultdict(lambda: NODE_NETWORK_UNKNOWN)
@@ -443,12 +621,32 @@ class RaidenProtocol(object):
         # because python integers are immutable)
         self.nodeaddresses_to_nonces = dict()
 
-        cache = cachetools.TTLCache(
-            maxsize=50,
-            ttl=CACHE_TTL,
-        )
-        cache_wrapper = cachetools.cached(cache=cache)
-        self.get_host_port = cache_wrapper(discovery.get)
+        # Bounded queues for the incoming packets, each one is consumed by its
+        # own handler task.
+        self.inbound_queue_size = inbound_queue_size
+        self.inbound_queues = [NotifyingQueue() for _ in range(inbound_workers)]
+        self.inbound_echohashes = set()
+        self.inbound_dropped = 0
+
+        for queue in self.inbound_queues:
+            self.greenlets.append(gevent.spawn(
+                single_inbound_handler,
+                self,
+                queue,
+                self.event_stop,
+            ))
+
+        # The discovery keeps the endpoints cached and current with the
+        # registry, a TTL cache here would only serve stale endpoints.
+        self.get_host_port = discovery.get
+
+    def get_inbound_stats(self):
+        """ Returns the inbound queue metrics. """
+        return {
+            'queued': sum(len(queue) for queue in self.inbound_queues),
+            'capacity': self.inbound_queue_size * len(self.inbound_queues),
+            'dropped': self.inbound_dropped,
+        }
 
     def stop_and_wait(self):
         self.event_stop.set()
@@ -539,11 +737,45 @@ class RaidenProtocol(object):
 
         return queue
 
-    def _send_ack(self, host_port, messagedata):
-        # ACK must not go into the queue, otherwise nodes will deadlock waiting
-        # for the confirmation
-        self.transport.send(
+    def get_send_queue(self, host_port):
+        """ Returns the priority queue for the packets sent to `host_port`,
+        starting its sending task if necessary.
+        """
+        if host_port in self.hostport_to_sendqueue:
+            return self.hostport_to_sendqueue[host_port]
+
+        queue = NotifyingPriorityQueue()
+        self.hostport_to_sendqueue[host_port] = queue
+
+        self.greenlets.append(gevent.spawn(
+            single_host_send,
+            self.transport,
             self.raiden,
+            host_port,
+            queue,
+            self.event_stop,
+        ))
+
+        return queue
+
+    def packet_sent_event(self, receiver_address, data):
+        """ Returns an Event set once `data` is written to `receiver_address`,
+        None if it's not waiting to be sent.
+        """
+        host_port = self.get_host_port(receiver_address)
+        return self.get_send_queue(host_port).sent_event(data)
+
+    def send_packet(self, host_port, data):
+        """ Schedules `data` to be sent to `host_port` according to the
+        message priority.
+        """
+        priority = CMDID_PRIORITY.get(data[0], PRIORITY_TRANSFER)
+        self.get_send_queue(host_port).put(data, priority)
+
+    def _send_ack(self, host_port, messagedata):
+        # ACK must not go into the channel queue, otherwise nodes will deadlock
+        # waiting for the confirmation
+        self.send_packet(
             host_port,
             messagedata,
         )
@@ -648,18 +880,46 @@ class RaidenProtocol(object):
             async_result = self.senthashes_to_states[echohash].async_result
 
         if not async_result.ready():
-            self.transport.send(
-                self.raiden,
+            self.send_packet(
                 host_port,
                 data,
             )
 
         return async_result
 
+    def throttle_ack(self, receiver_address):
+        """ Signals the throttle policy that a message to `receiver_address`
+        was acknowledged.
+        """
+        host_port = self.get_host_port(receiver_address)
+        self.transport.throttle_policy.on_ack(host_port)
+
+    def throttle_loss(self, receiver_address):
+        """ Signals the throttle policy that a message to `receiver_address`
+        was not acknowledged in time.
+        """
+        host_port = self.get_host_port(receiver_address)
+        self.transport.throttle_policy.on_loss(host_port)
+
     def set_node_network_state(self, node_address, node_state):
         self.nodeaddresses_networkstatuses[node_address] = node_state
 
-    def receive(self, data):
+    def receive(self, data, host_port=None, sender=None):
+        """ Fast path for incoming packets.
+
+        Duplicated packets are answered with the stored Ack and Acks are
+        handled inline, every other packet is queued for the handler tasks.
+        Packets from the same endpoint are always queued for the same task to
+        preserve their ordering. If the task's queue is full the packet is
+        dropped and the sender is expected to retry it.
+
+        Args:
+            data (bytes): the packet.
+            host_port (Tuple[(str, int)]): the endpoint that sent the packet.
+            sender (address): the address that signed the packet, if it was
+                already validated, otherwise the signature is verified while
+                handling it.
+        """
         if len(data) > UDP_MAX_MESSAGE_SIZE:
             log.error('receive packet larger than maximum size', length=len(data))
             return
@@ -670,8 +930,46 @@ class RaidenProtocol(object):
         if echohash in self.receivedhashes_to_acks:
             return self._send_ack(*self.receivedhashes_to_acks[echohash])
 
+        # Acks are cheap to handle, don't need a reply, and unblock our own
+        # queues, so these are never queued nor dropped.
+        if data[:1] == messages.ACK:
+            return self.handle_packet(data, echohash)
+
+        # the packet is queued, its Ack will be sent once it's handled
+        if echohash in self.inbound_echohashes:
+            return
+
+        queue = self.inbound_queues[hash(host_port) % len(self.inbound_queues)]
+
+        if len(queue) >= self.inbound_queue_size:
+            self.inbound_dropped += 1
+
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(
+                    'INBOUND QUEUE FULL, DROPPING PACKET node:%s echohash:%s',
+                    pex(self.raiden.address),
+                    pex(echohash),
+                )
+            return
+
+        self.inbound_echohashes.add(echohash)
+        queue.put((data, echohash, sender))
+
+    def handle_packet(self, data, echohash, sender=None):
+        """ Decodes and handles an incoming packet, sending the Ack if the
+        message was handled without exceptions.
+        """
+        self.inbound_echohashes.discard(echohash)
+
+        # the packet may have been queued multiple times
+        if echohash in self.receivedhashes_to_acks:
+            return self._send_ack(*self.receivedhashes_to_acks[echohash])
+
         # We ignore the sending endpoint as this can not be known w/ UDP
-        message = decode(data)
+        if sender is None:
+            message = decode(data)
+        else:
+            message = decode_verified(data, sender)
 
         if isinstance(message, Ack):
             waitack = self.senthashes_to_states.get(message.echo)
@@ -701,6 +999,7 @@ class RaidenProtocol(object):
                         pex(message.echo)
                     )
 
+                self.throttle_ack(waitack.receiver_address)
                 waitack.async_result.set(True)
 
         elif message is not None:
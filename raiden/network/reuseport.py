@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+UDP transport that verifies the incoming packets in worker processes.
+
+All the processes bind the same UDP port with SO_REUSEPORT, the kernel
+distributes the packets among the sockets by hashing the endpoints, so all the
+packets from a given peer are handled by the same process and in order. The
+workers check the size, decode the packet and recover its signer, forwarding
+only the valid packets to the main process through an unix socket. The main
+process owns the channel state and uses its own socket to send, a BPF program
+attached to the group keeps the incoming packets away from it. Without kernel
+support for the program (Linux < 4.5) it handles its share of the packets as
+the UDPTransport does.
+"""
+import ctypes
+import errno
+import multiprocessing
+import socket as pysocket
+import struct
+import time
+
+import cachetools
+import gevent
+from gevent import socket as gsocket
+from gevent.socket import wait_read
+from ethereum import slogging
+
+from raiden.constants import UDP_MAX_MESSAGE_SIZE
+from raiden.encoding import messages
+from raiden.network.transport import DummyPolicy, UDPTransport
+from raiden.utils import publickey_to_address, sha3
+
+log = slogging.get_logger(__name__)  # pylint: disable=invalid-name
+
+# sender address, ipv4 address, port
+RECORD_HEADER = struct.Struct('!20s4sH')
+NO_SENDER = b'\x00' * 20
+
+# Seconds between the checks for exited receive workers
+WORKER_CHECK_INTERVAL = 1
+
+# Socket option to attach a classic BPF program to a SO_REUSEPORT group, it's
+# not exposed by the socket module
+SO_ATTACH_REUSEPORT_CBPF = 51
+
+# Offset of the network header for the BPF loads, the packet data of the
+# reuseport programs starts at the UDP payload
+SKF_NET_OFF = -0x100000
+
+
+class SockFilter(ctypes.Structure):
+    _fields_ = [
+        ('code', ctypes.c_uint16),
+        ('jt', ctypes.c_uint8),
+        ('jf', ctypes.c_uint8),
+        ('k', ctypes.c_uint32),
+    ]
+
+
+class SockFprog(ctypes.Structure):
+    _fields_ = [
+        ('len', ctypes.c_uint16),
+        ('filter', ctypes.POINTER(SockFilter)),
+    ]
+
+
+def reuseport_socket(host, port, socket_module=pysocket):
+    sock = socket_module.socket(pysocket.AF_INET, pysocket.SOCK_DGRAM)
+    sock.setsockopt(pysocket.SOL_SOCKET, pysocket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    return sock
+
+
+def pack_record(sender, host_port, data):
+    host, port = host_port
+    header = RECORD_HEADER.pack(
+        sender or NO_SENDER,
+        pysocket.inet_aton(host),
+        port,
+    )
+    return header + data
+
+
+def unpack_record(record):
+    sender, host, port = RECORD_HEADER.unpack_from(record)
+
+    if sender == NO_SENDER:
+        sender = None
+
+    host_port = (pysocket.inet_ntoa(host), port)
+    data = record[RECORD_HEADER.size:]
+    return sender, host_port, data
+
+
+def steer_to_workers(sock, workers):
+    """ Attach a BPF program to the SO_REUSEPORT group of `sock` that picks
+    one of the `workers` sockets by the sender's address and port, `sock` must
+    be the first socket of the group and never receives a packet.
+
+    Returns False if the kernel doesn't support the program.
+    """
+    instructions = [
+        (0x20, SKF_NET_OFF + 12),  # A = source address
+        (0x07, 0),  # X = A
+        (0x28, SKF_NET_OFF + 20),  # A = source port, there are no IP options
+        (0xac, 0),  # A = A ^ X
+        (0x94, workers),  # A = A % workers
+        (0x04, 1),  # A = A + 1, skipping the first socket
+        (0x16, 0),  # return A
+    ]
+
+    program = (SockFilter * len(instructions))(*[
+        SockFilter(code, 0, 0, k & 0xffffffff)
+        for code, k in instructions
+    ])
+    fprog = SockFprog(len(instructions), program)
+
+    try:
+        sock.setsockopt(
+            pysocket.SOL_SOCKET,
+            SO_ATTACH_REUSEPORT_CBPF,
+            ctypes.string_at(ctypes.addressof(fprog), ctypes.sizeof(fprog)),
+        )
+    except pysocket.error:
+        return False
+
+    return True
+
+
+def packet_sender(data):
+    """ Returns the address that signed `data`, an empty string for unsigned
+    messages, or None if the packet is invalid.
+    """
+    # Acks are not signed
+    if data[:1] == messages.ACK:
+        return b''
+
+    result = messages.wrap_and_validate(data)
+
+    if result is None:
+        return None
+
+    _, publickey = result
+    return publickey_to_address(publickey)
+
+
+def receive_worker(sock, forward_socket, cache_size):
+    """ Validates the packets received on `sock` and forwards them to the main
+    process through `forward_socket`.
+    """
+    # Retries of a packet don't need to have the signature recovered again,
+    # its Ack must still be sent by the main process.
+    packethash_to_sender = cachetools.LRUCache(maxsize=cache_size)
+
+    while True:
+        data, host_port = sock.recvfrom(65536)
+
+        if len(data) > UDP_MAX_MESSAGE_SIZE:
+            continue
+
+        packethash = sha3(data)
+        sender = packethash_to_sender.get(packethash)
+
+        if sender is None:
+            try:
+                sender = packet_sender(data)
+            except Exception:  # pylint: disable=broad-except
+                sender = None
+
+            if sender is None:
+                continue
+
+            packethash_to_sender[packethash] = sender
+
+        forward_socket.send(pack_record(sender, host_port, data))
+
+
+class ReusePortUDPTransport(UDPTransport):
+    """ UDPTransport that uses worker processes to validate the packets. """
+
+    def __init__(
+            self,
+            host,
+            port,
+            socket=None,
+            protocol=None,
+            throttle_policy=DummyPolicy(),
+            workers=None,
+            cache_size=1024):
+
+        if socket is not None:
+            raise ValueError(
+                'ReusePortUDPTransport must bind its own sockets, the socket '
+                'argument is not supported'
+            )
+
+        if workers is None:
+            workers = max(multiprocessing.cpu_count() - 1, 1)
+
+        # the main socket is read by the DatagramServer, so it must be
+        # cooperative
+        sock = reuseport_socket(host, port, gsocket)
+        super(ReusePortUDPTransport, self).__init__(
+            host,
+            port,
+            socket=sock,
+            protocol=protocol,
+            throttle_policy=throttle_policy,
+        )
+
+        # With port 0 the main socket is bound to a random port, the workers
+        # must use the same one.
+        port = self.port
+
+        forward_read, forward_write = pysocket.socketpair(
+            pysocket.AF_UNIX,
+            pysocket.SOCK_DGRAM,
+        )
+
+        self.processes = list()
+        self.exited = set()
+        for _ in range(workers):
+            worker_sock = reuseport_socket(host, port)
+            process = multiprocessing.Process(
+                target=receive_worker,
+                args=(worker_sock, forward_write, cache_size),
+            )
+            process.daemon = True
+            process.start()
+
+            # the socket is used only by the worker
+            worker_sock.close()
+            self.processes.append(process)
+
+        # the workers joined the group after the main socket, a worker that
+        # exits shifts the order and the kernel falls back to its own hash
+        if not steer_to_workers(sock, workers):
+            log.warning(
+                'reuseport BPF not supported, the main process also validates packets'
+            )
+
+        forward_write.close()
+        forward_read.setblocking(False)
+        self.forward_socket = forward_read
+        self.forward_greenlet = gevent.spawn(self._forward_loop)
+
+    def _forward_loop(self):
+        fileno = self.forward_socket.fileno()
+        last_check = time.time()
+
+        while True:
+            try:
+                wait_read(fileno, timeout=WORKER_CHECK_INTERVAL)
+            except pysocket.timeout:
+                pass
+
+            # the socketpair doesn't signal the exit of the workers
+            if time.time() - last_check >= WORKER_CHECK_INTERVAL:
+                last_check = time.time()
+
+                if not self.check_workers():
+                    log.error('all the receive workers exited')
+                    return
+
+            while True:
+                try:
+                    record = self.forward_socket.recv(65536)
+                except pysocket.error as e:
+                    if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                        break
+                    raise
+
+                sender, host_port, data = unpack_record(record)
+                self.receive_verified(data, host_port, sender)
+
+    def check_workers(self):
+        """ Log the workers that exited, returns False once all did. """
+        for process in self.processes:
+            if process.pid not in self.exited and not process.is_alive():
+                self.exited.add(process.pid)
+                log.error(
+                    'receive worker exited',
+                    pid=process.pid,
+                    exitcode=process.exitcode,
+                )
+
+        return len(self.exited) < len(self.processes)
+
+    def receive_verified(self, data, host_port, sender):
+        self.protocol.receive(data, host_port, sender)
+
+    def stop(self):
+        self.forward_greenlet.kill()
+
+        for process in self.processes:
+            process.terminate()
+
+        for process in self.processes:
+            process.join()
+
+        self.forward_socket.close()
+        super(ReusePortUDPTransport, self).stop()
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+Route search weighted by the hop count and the estimated probability of the
+transfer going through each channel.
+
+The balances of the channels that are not ours are unknown, the estimates
+come from the on-chain deposits and from the refunds received for previous
+transfers.
+"""
+import math
+import time
+from heapq import heappush, heappop
+
+# Probability used for the channels without any capacity information
+DEFAULT_SUCCESS_PROBABILITY = 0.9
+
+# Probability that a partner that refunded a transfer can mediate the same or
+# a larger amount to the same target
+REFUND_SUCCESS_PROBABILITY = 0.1
+
+# Seconds for which a refund is remembered
+REFUND_TTL = 600
+
+# Cost of a path with probability `p` is `hops + PROBABILITY_WEIGHT * -log(p)`
+PROBABILITY_WEIGHT = 2.
+
+# Seconds for the weight of the route outcomes to halve
+RELIABILITY_HALF_LIFE = 3600.
+
+# Weight of the prior used for the routes without history, the prior assumes
+# the route works
+RELIABILITY_PRIOR = 1.
+
+
+class CapacityHints(object):
+    """ Capacity estimates for the channels of a token network. """
+
+    def __init__(self, refund_ttl=REFUND_TTL, time_function=time.time):
+        self.refund_ttl = refund_ttl
+        self.time_function = time_function
+
+        # (from, to): deposit of `from` in the channel
+        self.edge_to_capacity = dict()
+
+        # (partner, target): (smallest refunded amount, time)
+        self.refunds = dict()
+
+    def set_capacity(self, from_address, to_address, capacity):
+        self.edge_to_capacity[(from_address, to_address)] = capacity
+
+    def remove_channel(self, first_address, second_address):
+        self.edge_to_capacity.pop((first_address, second_address), None)
+        self.edge_to_capacity.pop((second_address, first_address), None)
+
+    def record_refund(self, partner_address, target_address, amount):
+        """ `partner_address` could not mediate `amount` to `target_address`. """
+        key = (partner_address, target_address)
+        previous = self.refunds.get(key)
+
+        if previous is not None and not self.refund_expired(previous):
+            amount = min(amount, previous[0])
+
+        self.refunds[key] = (amount, self.time_function())
+
+    def refund_expired(self, refund):
+        return refund[1] + self.refund_ttl < self.time_function()
+
+    def refunded(self, partner_address, target_address, amount):
+        refund = self.refunds.get((partner_address, target_address))
+
+        if refund is None:
+            return False
+
+        if self.refund_expired(refund):
+            del self.refunds[(partner_address, target_address)]
+            return False
+
+        return amount >= refund[0]
+
+    def success_probability(self, from_address, to_address, amount):
+        """ Probability of `from_address` being able to transfer `amount` to
+        `to_address`, the balance is assumed uniformly distributed in
+        [0, capacity].
+        """
+        capacity = self.edge_to_capacity.get((from_address, to_address))
+
+        if capacity is None:
+            return DEFAULT_SUCCESS_PROBABILITY
+
+        if amount > capacity:
+            return 0.
+
+        return (capacity - amount + 1.) / (capacity + 1.)
+
+
+class RouteStats(object):
+    """ Time decayed outcome counts of the transfers sent through a route. """
+    __slots__ = ('successes', 'refunds', 'timeouts', 'last_update')
+
+    def __init__(self, last_update):
+        self.successes = 0.
+        self.refunds = 0.
+        self.timeouts = 0.
+        self.last_update = last_update
+
+    def decay(self, now, half_life):
+        factor = 0.5 ** ((now - self.last_update) / half_life)
+        self.successes *= factor
+        self.refunds *= factor
+        self.timeouts *= factor
+        self.last_update = now
+
+    def success_rate(self):
+        failures = self.refunds + self.timeouts
+        return (self.successes + RELIABILITY_PRIOR) / (
+            self.successes + failures + RELIABILITY_PRIOR
+        )
+
+
+class RouteReliability(object):
+    """ Learned reliability of our neighbors as mediators.
+
+    The outcomes are kept per (neighbor, target) and aggregated per neighbor,
+    the aggregate is used for the targets without history.
+    """
+
+    def __init__(self, half_life=RELIABILITY_HALF_LIFE, time_function=time.time):
+        self.half_life = half_life
+        self.time_function = time_function
+
+        # (neighbor, target or None): RouteStats
+        self.route_to_stats = dict()
+
+    def _record(self, neighbor_address, target_address, outcome):
+        now = self.time_function()
+
+        for key in ((neighbor_address, target_address), (neighbor_address, None)):
+            stats = self.route_to_stats.get(key)
+
+            if stats is None:
+                stats = RouteStats(now)
+                self.route_to_stats[key] = stats
+            else:
+                stats.decay(now, self.half_life)
+
+            setattr(stats, outcome, getattr(stats, outcome) + 1)
+
+    def record_success(self, neighbor_address, target_address):
+        self._record(neighbor_address, target_address, 'successes')
+
+    def record_refund(self, neighbor_address, target_address):
+        self._record(neighbor_address, target_address, 'refunds')
+
+    def record_timeout(self, neighbor_address, target_address):
+        self._record(neighbor_address, target_address, 'timeouts')
+
+    def success_rate(self, neighbor_address, target_address):
+        stats = self.route_to_stats.get((neighbor_address, target_address))
+
+        if stats is None:
+            stats = self.route_to_stats.get((neighbor_address, None))
+
+        if stats is None:
+            return 1.
+
+        stats.decay(self.time_function(), self.half_life)
+        return stats.success_rate()
+
+    def get_stats(self):
+        """ Return the current stats of all the routes, `target` is None for
+        the aggregate of the neighbor.
+        """
+        now = self.time_function()
+        result = list()
+
+        for (neighbor_address, target_address), stats in self.route_to_stats.iteritems():
+            stats.decay(now, self.half_life)
+            result.append({
+                'neighbor': neighbor_address,
+                'target': target_address,
+                'successes': stats.successes,
+                'refunds': stats.refunds,
+                'timeouts': stats.timeouts,
+                'success_rate': stats.success_rate(),
+            })
+
+        return result
+
+
+def probability_cost(probability):
+    return PROBABILITY_WEIGHT * -math.log(probability)
+
+
+def astar_path(graph, source, target, edge_cost, heuristic, removed_nodes, removed_edges):
+    """ Return the cheapest path of node indices from `source` to `target` and
+    its cost, or (None, None) if there is none.
+
+    Args:
+        edge_cost: Function (from, to) returning the cost of the edge or None
+            if it cannot be used, the costs must be at least 1.
+        heuristic: Function returning the hop count to the target or None if
+            the target is not reachable, which is admissible for these costs.
+    """
+    start_estimate = heuristic(source)
+    if start_estimate is None:
+        return None, None
+
+    parents = {source: None}
+    costs = {source: 0.}
+    queue = [(start_estimate, source)]
+    done = set()
+
+    while queue:
+        _, index = heappop(queue)
+
+        if index == target:
+            path = list()
+            while index is not None:
+                path.append(index)
+                index = parents[index]
+            path.reverse()
+            return path, costs[target]
+
+        if index in done:
+            continue
+        done.add(index)
+
+        for neighbor in graph.neighbor_indices(index):
+            if neighbor in done or neighbor in removed_nodes:
+                continue
+
+            if (index, neighbor) in removed_edges:
+                continue
+
+            cost = edge_cost(index, neighbor)
+            if cost is None:
+                continue
+
+            estimate = heuristic(neighbor)
+            if estimate is None:
+                continue
+
+            neighbor_cost = costs[index] + cost
+            if neighbor_cost < costs.get(neighbor, float('inf')):
+                costs[neighbor] = neighbor_cost
+                parents[neighbor] = index
+                heappush(queue, (neighbor_cost + estimate, neighbor))
+
+    return None, None
+
+
+def k_shortest_paths(graph, source, target, edge_cost, heuristic, k):
+    """ Yen's algorithm, returns up to `k` loopless (cost, path) tuples
+    ordered by cost.
+    """
+    path, cost = astar_path(graph, source, target, edge_cost, heuristic, set(), set())
+
+    if path is None:
+        return list()
+
+    result = [(cost, path)]
+    candidates = list()
+    seen = {tuple(path)}
+
+    while len(result) < k:
+        _, previous_path = result[-1]
+
+        for position in range(len(previous_path) - 1):
+            spur = previous_path[position]
+            root = previous_path[:position + 1]
+
+            root_cost = sum(
+                edge_cost(first, second)
+                for first, second in zip(root, root[1:])
+            )
+
+            removed_edges = set()
+            for _, found_path in result:
+                if found_path[:position + 1] == root and len(found_path) > position + 1:
+                    removed_edges.add((spur, found_path[position + 1]))
+
+            spur_path, spur_cost = astar_path(
+                graph,
+                spur,
+                target,
+                edge_cost,
+                heuristic,
+                set(root[:-1]),
+                removed_edges,
+            )
+
+            if spur_path is None:
+                continue
+
+            candidate = root[:-1] + spur_path
+            if tuple(candidate) not in seen:
+                seen.add(tuple(candidate))
+                heappush(candidates, (root_cost + spur_cost, candidate))
+
+        if not candidates:
+            break
+
+        result.append(heappop(candidates))
+
+    return result
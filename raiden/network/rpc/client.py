@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
-from time import time as now
+import cPickle as pickle
+import heapq
+import json
+import sys
+from collections import defaultdict
+from os import path
 
 import rlp
 import gevent
+from gevent.event import AsyncResult
 from gevent.lock import Semaphore
 from ethereum import slogging
 from ethereum import _solidity
@@ -16,7 +22,12 @@ from pyethapp.jsonrpc import (
     data_encoder,
     default_gasprice,
 )
-from pyethapp.rpc_client import topic_encoder, JSONRPCClient, block_tag_encoder
+from pyethapp.rpc_client import (
+    topic_encoder,
+    JSONRPCClient,
+    JSONRPCClientReplyError,
+    block_tag_encoder,
+)
 import requests
 
 from raiden import messages
@@ -28,6 +39,7 @@ from raiden.settings import (
     GAS_PRICE,
 )
 from raiden.utils import (
+    decode_endpoints,
     get_contract_path,
     isaddress,
     pex,
@@ -41,14 +53,36 @@ from raiden.blockchain.abi import (
     CONTRACT_NETTING_CHANNEL,
     CONTRACT_REGISTRY,
 
+    EVENT_ADDRESS_REGISTERED,
     EVENT_CHANNEL_NEW,
     EVENT_TOKEN_ADDED,
 )
 from raiden.exceptions import SamePeerAddress
+from raiden.network.rpc.subscription import NewHeadsSubscription
 
 log = slogging.getLogger(__name__)  # pylint: disable=invalid-name
 solidity = _solidity.get_solidity()  # pylint: disable=invalid-name
 
+# Maximum number of requests in a JSON-RPC batch
+BATCH_MAX_SIZE = 100
+
+# Methods sent on their own, a slow log query or transaction submission would
+# delay the replies of the whole batch
+UNBATCHED_METHODS = ('eth_getLogs', 'eth_sendRawTransaction')
+
+# Seconds between the checks for a new block while transactions are pending
+TRANSACTION_POLL_INTERVAL = 0.5
+
+# Kinds of contract reads cached by the ContractCallCache
+CACHE_IMMUTABLE = 'immutable'
+CACHE_PER_BLOCK = 'per_block'
+
+# Number of blocks a gas estimate is reused before it's requested again
+GAS_ESTIMATE_MAX_AGE = 500
+
+# Gas of the ether transfer sent to fill the nonce of a rejected transaction
+NONCE_GAP_GAS = 21000
+
 # Coding standard for this module:
 #
 # - Be sure to reflect changes to this module in the test
@@ -64,6 +98,13 @@ class JSONRPCPollTimeoutException(Exception):
     pass
 
 
+class TransactionThrew(InvalidTransaction):
+    """ The transaction was mined but used all of its gas, it either threw or
+    ran out of gas.
+    """
+    pass
+
+
 def check_transaction_threw(client, transaction_hash):
     """Check if the transaction threw or if it executed properly"""
     encoded_transaction = data_encoder(transaction_hash.decode('hex'))
@@ -82,8 +123,9 @@ def patch_send_transaction(client, nonce_offset=0):
         client.call('eth_nonce', encode_hex(client.sender), 'pending')
     except:
         patch_necessary = True
-        client.last_nonce_update = 0
         client.current_nonce = None
+        client.nonce_resync = False
+        client.released_nonces = list()
         client.nonce_lock = Semaphore()
 
     def send_transaction(sender, to, value=0, data='', startgas=GAS_LIMIT,
@@ -93,34 +135,39 @@ def patch_send_transaction(client, nonce_offset=0):
         @see https://github.com/ethereum/pyethapp/blob/develop/pyethapp/rpc_client.py#L359
         """
         def get_nonce():
-            """Eventually syncing nonce counter.
-            This will keep a local nonce counter that is only syncing against
-            the remote every `UPDATE_INTERVAL`.
-
-            If the remote counter is lower than the current local counter,
-            it will wait for the remote to catch up.
+            """Local nonce counter.
+            The counter is only synced against the remote for the first
+            transaction and after a failed submission, the nonces are handed
+            out locally so that transactions can be sent back to back without
+            waiting for the previous ones to be registered as `pending`.
+
+            The nonce of a failed submission is handed out again if no
+            transaction was sent after it, otherwise it's filled right away
+            by `fill_nonce_gap`. The remote count is never trusted over the
+            local counter, since the transactions in flight may not be
+            `pending` yet.
             """
             with client.nonce_lock:
-                UPDATE_INTERVAL = 5.
-                query_time = now()
-                needs_update = abs(query_time - client.last_nonce_update) > UPDATE_INTERVAL
-                not_initialized = client.current_nonce is None
-                if needs_update or not_initialized:
-                    nonce = _query_nonce()
-                    # we may have hammered the server and not all tx are
-                    # registered as `pending` yet
-                    while nonce < client.current_nonce:
-                        log.debug(
-                            "nonce on server too low; retrying",
-                            server=nonce,
-                            local=client.current_nonce
-                        )
-                        nonce = _query_nonce()
-                        query_time = now()
-                    client.current_nonce = nonce
-                    client.last_nonce_update = query_time
-                else:
-                    client.current_nonce += 1
+                if client.current_nonce is None:
+                    client.current_nonce = _query_nonce()
+                    return client.current_nonce
+
+                if client.nonce_resync:
+                    client.nonce_resync = False
+                    remote_nonce = _query_nonce()
+
+                    client.released_nonces = [
+                        released
+                        for released in client.released_nonces
+                        if released >= remote_nonce
+                    ]
+                    heapq.heapify(client.released_nonces)
+                    client.current_nonce = max(remote_nonce - 1, client.current_nonce)
+
+                if client.released_nonces:
+                    return heapq.heappop(client.released_nonces)
+
+                client.current_nonce += 1
                 return client.current_nonce
 
         def _query_nonce():
@@ -133,22 +180,186 @@ def patch_send_transaction(client, nonce_offset=0):
             nonce = pending_transactions + nonce_offset
             return nonce
 
+        def submit(nonce, startgas, to, value, data):
+            tx = Transaction(nonce, gasprice, startgas, to, value, data)
+            assert hasattr(client, 'privkey') and client.privkey
+            tx.sign(client.privkey)
+
+            return client.call(
+                'eth_sendRawTransaction',
+                data_encoder(rlp.encode(tx)),
+            )
+
+        def release_nonce(nonce):
+            """ The nonce of a rejected transaction may not have been used,
+            the transactions with higher nonces would wait for it forever.
+            """
+            with client.nonce_lock:
+                client.nonce_resync = True
+
+                if nonce == client.current_nonce:
+                    log.debug('transaction rejected, reusing the nonce', nonce=nonce)
+                    client.current_nonce -= 1
+                    return
+
+            gevent.spawn(fill_nonce_gap, nonce)
+
+        def fill_nonce_gap(nonce):
+            """ Send an empty transfer to ourselves with `nonce`, it fails if
+            the rejected transaction used the nonce after all.
+            """
+            log.debug('transaction rejected, filling the nonce gap', nonce=nonce)
+
+            try:
+                submit(nonce, NONCE_GAP_GAS, sender, 0, '')
+            except Exception:  # pylint: disable=broad-except
+                # handed out again unless the remote counts it as used
+                with client.nonce_lock:
+                    heapq.heappush(client.released_nonces, nonce)
+                    client.nonce_resync = True
+
         nonce = get_nonce()
 
-        tx = Transaction(nonce, gasprice, startgas, to, value, data)
-        assert hasattr(client, 'privkey') and client.privkey
-        tx.sign(client.privkey)
-        result = client.call(
-            'eth_sendRawTransaction',
-            data_encoder(rlp.encode(tx)),
-        )
+        try:
+            result = submit(nonce, startgas, to, value, data)
+        except:
+            release_nonce(nonce)
+            raise
+
         return result[2 if result.startswith('0x') else 0:]
 
     if patch_necessary:
         client.send_transaction = send_transaction
 
 
-def patch_send_message(client, pool_maxsize=50):
+class JSONRPCBatcher(object):
+    """ Combines the JSON-RPC requests sent within the same iteration of the
+    event loop into a single batch request.
+
+    Independent calls made concurrently, e.g. with `batch_calls`, share one
+    round trip, the replies are routed to the callers by the request id.
+    """
+
+    def __init__(self, post, max_size=BATCH_MAX_SIZE):
+        self.post = post
+        self.max_size = max_size
+        self.pending = list()
+        self.flush_scheduled = False
+
+        # disabled if the node doesn't answer batch requests
+        self.supported = True
+
+    def send(self, message):
+        """ Queue the serialized request `message` and return the serialized
+        reply once the batch is answered.
+        """
+        if not self.supported or json.loads(message).get('method') in UNBATCHED_METHODS:
+            return self.post(message)
+
+        result = AsyncResult()
+        self.pending.append((message, result))
+
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            gevent.spawn(self.flush)
+
+        return result.get()
+
+    def flush(self):
+        pending = self.pending
+        self.pending = list()
+        self.flush_scheduled = False
+
+        for start in range(0, len(pending), self.max_size):
+            batch = pending[start:start + self.max_size]
+
+            try:
+                self.send_batch(batch)
+            except Exception as e:  # pylint: disable=broad-except
+                # the callers must not wait forever
+                log.exception('JSON-RPC batch failed')
+                for _, result in batch:
+                    if not result.ready():
+                        result.set_exception(e)
+
+    def send_individually(self, pending):
+        for message, result in pending:
+            try:
+                result.set(self.post(message))
+            except Exception as e:  # pylint: disable=broad-except
+                result.set_exception(e)
+
+    def send_batch(self, pending):
+        if len(pending) == 1:
+            return self.send_individually(pending)
+
+        batch = '[{}]'.format(','.join(message for message, _ in pending))
+
+        try:
+            replies = json.loads(self.post(batch))
+        except Exception as e:  # pylint: disable=broad-except
+            for _, result in pending:
+                result.set_exception(e)
+            return
+
+        id_to_reply = dict()
+        if isinstance(replies, list):
+            id_to_reply = {
+                reply.get('id'): reply
+                for reply in replies
+                if isinstance(reply, dict)
+            }
+
+        # a node without batch support answers with a single error, or with
+        # errors that don't match any request
+        pending_ids = [json.loads(message).get('id') for message, _ in pending]
+        if not any(identifier in id_to_reply for identifier in pending_ids):
+            log.warning('JSON-RPC batch requests not supported')
+            self.supported = False
+            return self.send_individually(pending)
+
+        for identifier, (_, result) in zip(pending_ids, pending):
+            reply = id_to_reply.get(identifier)
+
+            if reply is None:
+                result.set_exception(ValueError('missing reply in the JSON-RPC batch'))
+            else:
+                result.set(json.dumps(reply))
+
+
+def batch_calls(*functions):
+    """ Call `functions` concurrently so that their JSON-RPC requests are sent
+    in a single batch.
+
+    Return:
+        list: The results in the order of `functions`, the exception of the
+        first function that failed is raised instead.
+    """
+    def capture(function):
+        try:
+            return function(), None
+        except Exception:  # pylint: disable=broad-except
+            return None, sys.exc_info()
+
+    greenlets = [
+        gevent.spawn(capture, function)
+        for function in functions
+    ]
+    gevent.joinall(greenlets)
+
+    results = list()
+    for greenlet in greenlets:
+        result, exc_info = greenlet.get()
+
+        if exc_info is not None:
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+        results.append(result)
+
+    return results
+
+
+def patch_send_message(client, pool_maxsize=50, batch=True):
     """Monkey patch fix for issue #253. This makes the underlying `tinyrpc`
     transport class use a `requests.session` instead of regenerating sessions
     for each request.
@@ -159,29 +370,367 @@ def patch_send_message(client, pool_maxsize=50):
     Args:
         client (pyethapp.rpc_client.JSONRPCClient): the instance to patch
         pool_maxsize: the maximum poolsize to be used by the `requests.Session()`
+        batch: combine the concurrent requests with a `JSONRPCBatcher`
     """
     session = requests.Session()
     adapter = requests.adapters.HTTPAdapter(pool_maxsize=pool_maxsize)
     session.mount(client.transport.endpoint, adapter)
 
-    def send_message(message, expect_reply=True):
-        if not isinstance(message, str):
-            raise TypeError('str expected')
-
+    def post(message):
         r = session.post(
             client.transport.endpoint,
             data=message,
             **client.transport.request_kwargs
         )
+        return r.content
 
-        if expect_reply:
-            return r.content
+    batcher = JSONRPCBatcher(post) if batch else None
+
+    def send_message(message, expect_reply=True):
+        if not isinstance(message, str):
+            raise TypeError('str expected')
+
+        if not expect_reply:
+            post(message)
+        elif batcher is not None:
+            return batcher.send(message)
+        else:
+            return post(message)
 
     client.transport.send_message = send_message
 
 
-def new_filter(jsonrpc_client, contract_address, topics, from_block=None, to_block=None):
-    """ Custom new filter implementation to handle bad encoding from geth rpc. """
+def patch_poll(client):
+    """ Replace `poll` with a `TransactionPoller`, so that concurrent waits
+    share one polling loop.
+    """
+    client.poll = TransactionPoller(client).poll
+
+
+class PendingTransaction(object):
+    """ State of a transaction waited for by the `TransactionPoller`. """
+
+    def __init__(self):
+        self.result = AsyncResult()
+        self.checked_block = None
+        self.seen = False
+        self.waiters = 0
+
+
+class TransactionPoller(object):
+    """ Waits for the transactions to be mined.
+
+    A single greenlet tracks all the pending transactions, they are checked
+    once per new block with concurrent (and therefore batched) requests, and
+    each caller is woken up through its AsyncResult. Together with the local
+    nonces this allows many transactions to be sent back to back and mined
+    in the same blocks.
+    """
+
+    def __init__(self, jsonrpc_client, interval=TRANSACTION_POLL_INTERVAL):
+        self.client = jsonrpc_client
+        self.interval = interval
+
+        # transaction hash -> PendingTransaction
+        self.pending = dict()
+        self.loop = None
+
+    def poll(self, transaction_hash, confirmations=None, timeout=None):
+        """ Wait until `transaction_hash` is mined, same interface as
+        `JSONRPCClient.poll`.
+
+        Raises:
+            JSONRPCPollTimeoutException: If the transaction is not mined
+                within `timeout` seconds.
+            InvalidTransaction: If the transaction was dropped by the node.
+            TransactionThrew: If the transaction used all of its gas.
+        """
+        if len(transaction_hash) != 32:
+            raise ValueError('transaction_hash must be a 32 byte hash')
+
+        if transaction_hash not in self.pending:
+            self.pending[transaction_hash] = PendingTransaction()
+
+        pending = self.pending[transaction_hash]
+        pending.waiters += 1
+
+        if self.loop is None or self.loop.ready():
+            self.loop = gevent.spawn(self._run)
+
+        try:
+            block_number = pending.result.get(timeout=timeout)
+        except gevent.Timeout:
+            # other callers may still be waiting for the same transaction
+            if pending.waiters == 1 and self.pending.get(transaction_hash) is pending:
+                del self.pending[transaction_hash]
+            raise JSONRPCPollTimeoutException('timeout when polling for transaction')
+        finally:
+            pending.waiters -= 1
+
+        if confirmations:
+            while self.client.blocknumber() < block_number + confirmations:
+                gevent.sleep(self.interval)
+
+    def _run(self):
+        while self.pending:
+            try:
+                self.check_pending(self.client.blocknumber())
+            except Exception:  # pylint: disable=broad-except
+                log.exception('could not check the pending transactions')
+
+            gevent.sleep(self.interval)
+
+    def check_pending(self, block_number):
+        """ Resolve the transactions mined since their last check. """
+        to_check = [
+            transaction_hash
+            for transaction_hash, pending in self.pending.items()
+            if pending.checked_block != block_number
+        ]
+
+        transactions = batch_calls(*[
+            lambda transaction_hash=transaction_hash: self.client.call(
+                'eth_getTransactionByHash',
+                data_encoder(transaction_hash),
+            )
+            for transaction_hash in to_check
+        ])
+
+        mined = list()
+        for transaction_hash, transaction in zip(to_check, transactions):
+            pending = self.pending.get(transaction_hash)
+
+            # the callers timed out
+            if pending is None:
+                continue
+
+            pending.checked_block = block_number
+
+            if transaction is None:
+                if pending.seen:
+                    del self.pending[transaction_hash]
+                    pending.result.set_exception(
+                        InvalidTransaction('invalid transaction, check the nonce')
+                    )
+
+            elif transaction['blockNumber'] is not None:
+                mined.append((transaction_hash, transaction))
+
+            else:
+                pending.seen = True
+
+        if mined:
+            self.check_mined(mined)
+
+    def check_mined(self, mined):
+        """ Resolve the mined transactions, the ones that used all of their
+        gas are failed since their effects were reverted.
+        """
+        receipts = batch_calls(*[
+            lambda transaction_hash=transaction_hash: self.client.call(
+                'eth_getTransactionReceipt',
+                data_encoder(transaction_hash),
+            )
+            for transaction_hash, _ in mined
+        ])
+
+        gas_estimates = getattr(self.client, 'gas_estimates', None)
+
+        for (transaction_hash, transaction), receipt in zip(mined, receipts):
+            # the node may not have the receipt yet, check on the next block
+            if receipt is None:
+                continue
+
+            pending = self.pending.pop(transaction_hash, None)
+            if pending is None:
+                continue
+
+            gas_used = int(receipt['gasUsed'], 0)
+
+            if gas_estimates is not None:
+                gas_estimates.mined(transaction_hash.encode('hex'), gas_used)
+
+            if gas_used >= int(transaction['gas'], 0):
+                pending.result.set_exception(
+                    TransactionThrew('transaction used all of its gas')
+                )
+            else:
+                pending.result.set(int(transaction['blockNumber'], 0))
+
+
+class BlockFilter(object):
+    """ Filter for the blocks added to the chain. """
+
+    def __init__(self, jsonrpc_client):
+        self.client = jsonrpc_client
+        self.filter_id_raw = jsonrpc_client.call('eth_newBlockFilter')
+
+    def changes(self):
+        """ Return the hashes of the blocks added since the last call. """
+        return self.client.call('eth_getFilterChanges', self.filter_id_raw) or list()
+
+    def uninstall(self):
+        self.client.call(
+            'eth_uninstallFilter',
+            self.filter_id_raw,
+        )
+
+
+class ContractCallCache(object):
+    """ Cache of the contract reads made by the proxies.
+
+    The reads are classified by how their result can change:
+
+    - IMMUTABLE values are set when the contract is created (settle timeout,
+      token address, opened block), they are kept forever and can be saved.
+      Empty results are not kept since that's what a call to an address
+      without code returns, neither are the values of the contracts in
+      `unchecked` whose code wasn't checked yet.
+    - PER_BLOCK values can only change with a new block (balances, closed and
+      settled blocks), they are dropped by `new_block`.
+
+    Reads that are not classified are not cached.
+    """
+
+    def __init__(self):
+        self.immutable = dict()
+        self.per_block = dict()
+        self.unchecked = set()
+        self.block_number = None
+        self.hits = defaultdict(int)
+        self.misses = defaultdict(int)
+
+    def call(self, kind, key, read):
+        """ Return the cached result of `read()` for `key`. """
+        if kind == CACHE_IMMUTABLE:
+            values = self.immutable
+        else:
+            values = self.per_block
+
+        if key in values:
+            self.hits[kind] += 1
+            return values[key]
+
+        self.misses[kind] += 1
+        block_number = self.block_number
+        value = read()
+
+        if kind == CACHE_IMMUTABLE:
+            if value not in ('', None) and key[0] not in self.unchecked:
+                values[key] = value
+
+        # a per block read that finished after a new block may be stale
+        elif block_number == self.block_number:
+            values[key] = value
+
+        return value
+
+    def new_block(self, block_number):
+        """ AlarmTask callback, drops the values of the previous block. """
+        if block_number != self.block_number:
+            self.per_block.clear()
+            self.block_number = block_number
+
+    def invalidate(self, contract_address):
+        """ Drop the per block values of a contract changed by one of our
+        transactions.
+        """
+        for key in list(self.per_block):
+            if key[0] == contract_address:
+                del self.per_block[key]
+
+    def stats(self):
+        """ Return the number of hits and misses by kind of read. """
+        return {
+            kind: {
+                'hits': self.hits[kind],
+                'misses': self.misses[kind],
+            }
+            for kind in (CACHE_IMMUTABLE, CACHE_PER_BLOCK)
+        }
+
+    def load(self, filepath):
+        if path.isfile(filepath):
+            with open(filepath, 'rb') as handler:
+                self.immutable.update(pickle.load(handler))
+
+    def save(self, filepath):
+        with open(filepath, 'wb') as handler:
+            pickle.dump(self.immutable, handler, -1)
+
+
+class GasEstimateCache(object):
+    """ Gas estimates by contract function and argument shape.
+
+    The cost of the raiden transactions is stable, so an estimate is reused
+    instead of calling `eth_estimateGas` before every transaction. It's
+    dropped after `max_age` blocks, when a transaction using it is rejected
+    by the node, and when a mined transaction used all of its gas. The
+    `TransactionPoller` reports the gas used and fails the transactions that
+    ran out of gas, so the callers don't mistake them for a success.
+    """
+
+    def __init__(self, jsonrpc_client, max_age=GAS_ESTIMATE_MAX_AGE):
+        self.client = jsonrpc_client
+        self.max_age = max_age
+        self.block_number = 0
+
+        # key -> (gas, block number of the estimate)
+        self.estimates = dict()
+
+        # transaction hash -> (key, startgas, block number of the submission)
+        self.unverified = dict()
+
+    def estimate(self, key, estimate_gas):
+        """ Return the cached estimate for `key`, calling `estimate_gas()` if
+        there is none or it's too old.
+        """
+        cached = self.estimates.get(key)
+
+        if cached is not None and self.block_number - cached[1] < self.max_age:
+            return cached[0]
+
+        gas = estimate_gas()
+        self.estimates[key] = (gas, self.block_number)
+        return gas
+
+    def invalidate(self, key):
+        self.estimates.pop(key, None)
+
+    def sent(self, transaction_hash, key, startgas):
+        """ Check the gas used by `transaction_hash` once it's mined. """
+        self.unverified[transaction_hash] = (key, startgas, self.block_number)
+
+    def mined(self, transaction_hash, gas_used):
+        """ Drop the estimate used by `transaction_hash` if it ran out of gas. """
+        unverified = self.unverified.pop(transaction_hash, None)
+
+        if unverified is None:
+            return
+
+        key, startgas, _ = unverified
+        if gas_used >= startgas:
+            log.warning('transaction used all its gas', key=key, startgas=startgas)
+            self.invalidate(key)
+
+    def new_block(self, block_number):
+        """ AlarmTask callback, ages the estimates and forgets the
+        transactions that were never reported as mined.
+        """
+        self.block_number = block_number
+
+        for transaction_hash, (_, _, sent_block) in self.unverified.items():
+            if block_number - sent_block > self.max_age:
+                del self.unverified[transaction_hash]
+
+
+def filter_params(contract_address, topics, from_block=None, to_block=None):
+    """ Return the JSON-RPC filter object shared by `eth_newFilter` and
+    `eth_getLogs`.
+
+    `contract_address` may be None to match the events of all contracts or a
+    list of addresses, each topic may be a list of alternatives.
+    """
     if isinstance(from_block, int):
         from_block = hex(from_block)
     if isinstance(to_block, int):
@@ -189,37 +738,133 @@ def new_filter(jsonrpc_client, contract_address, topics, from_block=None, to_blo
     json_data = {
         'fromBlock': from_block if from_block is not None else 'latest',
         'toBlock': to_block if to_block is not None else 'latest',
-        'address': address_encoder(normalize_address(contract_address)),
     }
 
+    if isinstance(contract_address, list):
+        json_data['address'] = [
+            address_encoder(normalize_address(address))
+            for address in contract_address
+        ]
+    elif contract_address is not None:
+        json_data['address'] = address_encoder(normalize_address(contract_address))
+
     if topics is not None:
         json_data['topics'] = [
-            topic_encoder(topic)
+            [topic_encoder(alternative) for alternative in topic]
+            if isinstance(topic, list) else topic_encoder(topic)
             for topic in topics
         ]
 
+    return json_data
+
+
+def new_filter(jsonrpc_client, contract_address, topics, from_block=None, to_block=None):
+    """ Custom new filter implementation to handle bad encoding from geth rpc. """
+    json_data = filter_params(contract_address, topics, from_block, to_block)
     return jsonrpc_client.call('eth_newFilter', json_data)
 
 
+def get_logs(jsonrpc_client, contract_address, topics, from_block, to_block):
+    """ Return the decoded logs that match the filter with a single
+    `eth_getLogs` call, without installing a filter on the node.
+    """
+    json_data = filter_params(contract_address, topics, from_block, to_block)
+    return decode_log_events(jsonrpc_client.call('eth_getLogs', json_data))
+
+
+def decode_log_events(log_events):
+    # geth could return None
+    if log_events is None:
+        return []
+
+    result = list()
+    for log_event in log_events:
+        address = address_decoder(log_event['address'])
+        data = data_decoder(log_event['data'])
+        topics = [
+            decode_topic(topic)
+            for topic in log_event['topics']
+        ]
+
+        # pending logs don't have a block number
+        block_number = log_event.get('blockNumber')
+        if block_number is not None:
+            block_number = int(block_number, 16)
+
+        result.append({
+            'topics': topics,
+            'data': data,
+            'address': address,
+            'block_number': block_number,
+        })
+
+    return result
+
+
 def decode_topic(topic):
     return int(topic[2:], 16)
 
 
+def gas_estimate_key(classobject, callobj, args):
+    """ Key of the gas estimates of a transaction.
+
+    The contracts deployed by raiden share their estimates, except that the
+    cost of moving tokens depends on the token contract. Only the length of
+    the encoded arguments is used, it tells e.g. the transfer type or the
+    depth of a merkle proof, the values don't change the cost much.
+    """
+    if hasattr(classobject, 'token_address'):
+        token_address = classobject.token_address()
+    else:
+        token_address = classobject.address
+
+    shape = tuple(
+        len(arg) if isinstance(arg, str) else None
+        for arg in args
+    )
+
+    return (type(classobject).__name__, token_address, callobj.function_name, shape)
+
+
 def estimate_and_transact(classobject, callobj, *args):
     """Estimate gas using eth_estimateGas. Multiply by 2 to make sure sufficient gas is provided
     Limit maximum gas to GAS_LIMIT to avoid exceeding blockgas limit
+
+    The estimates are reused when the client has a `GasEstimateCache`.
     """
-    estimated_gas = callobj.estimate_gas(
-        *args,
-        startgas=classobject.startgas,
-        gasprice=classobject.gasprice
-    )
+    def estimate_gas():
+        return callobj.estimate_gas(
+            *args,
+            startgas=classobject.startgas,
+            gasprice=classobject.gasprice
+        )
+
+    gas_estimates = getattr(classobject.client, 'gas_estimates', None)
+
+    if gas_estimates is None:
+        estimated_gas = estimate_gas()
+    else:
+        key = gas_estimate_key(classobject, callobj, args)
+        estimated_gas = gas_estimates.estimate(key, estimate_gas)
+
     estimated_gas = min(estimated_gas * 2, GAS_LIMIT)
-    transaction_hash = callobj.transact(
-        *args,
-        startgas=estimated_gas,
-        gasprice=classobject.gasprice
-    )
+
+    try:
+        transaction_hash = callobj.transact(
+            *args,
+            startgas=estimated_gas,
+            gasprice=classobject.gasprice
+        )
+    except:
+        # the transaction is not retried since it may have been sent, the
+        # next one gets a new estimate
+        if gas_estimates is not None:
+            gas_estimates.invalidate(key)
+        raise
+
+    if gas_estimates is not None:
+        gas_estimates.sent(transaction_hash, key, estimated_gas)
+
     return transaction_hash
 
 
@@ -234,6 +879,7 @@ class BlockChainService(object):
             host,
             port,
             poll_timeout=DEFAULT_POLL_TIMEOUT,
+            ws_endpoint=None,
             **kwargs):
 
         self.address_to_token = dict()
@@ -251,11 +897,18 @@ class BlockChainService(object):
         )
         patch_send_transaction(jsonrpc_client)
         patch_send_message(jsonrpc_client)
+        patch_poll(jsonrpc_client)
+
+        # shared by the proxies through the client
+        jsonrpc_client.gas_estimates = GasEstimateCache(jsonrpc_client)
 
         self.client = jsonrpc_client
         self.private_key = privatekey_bin
         self.node_address = privatekey_to_address(privatekey_bin)
         self.poll_timeout = poll_timeout
+        self.ws_endpoint = ws_endpoint
+        self.cache = ContractCallCache()
+        self.gas_estimates = jsonrpc_client.gas_estimates
         self.default_registry = self.registry(registry_address)
 
     def set_verbosity(self, level):
@@ -308,6 +961,7 @@ class BlockChainService(object):
                 self.client,
                 token_address,
                 poll_timeout=self.poll_timeout,
+                cache=self.cache,
             )
 
         return self.address_to_token[token_address]
@@ -330,6 +984,7 @@ class BlockChainService(object):
                 self.client,
                 netting_channel_address,
                 poll_timeout=self.poll_timeout,
+                cache=self.cache,
             )
             self.address_to_nettingchannel[netting_channel_address] = channel
 
@@ -342,6 +997,7 @@ class BlockChainService(object):
                 self.client,
                 manager_address,
                 poll_timeout=self.poll_timeout,
+                cache=self.cache,
             )
 
             token_address = manager.token_address()
@@ -382,6 +1038,67 @@ class BlockChainService(object):
 
         return self.address_to_registry[registry_address]
 
+    def events_filter(self, topics, from_block=None, to_block=None):
+        """ Install a new filter for the events matching `topics` emitted by
+        any contract.
+
+        Return:
+            Filter: The filter instance.
+        """
+        filter_id_raw = new_filter(
+            self.client,
+            None,
+            topics,
+            from_block=from_block,
+            to_block=to_block,
+        )
+
+        return Filter(
+            self.client,
+            filter_id_raw,
+        )
+
+    def new_block_filter(self):
+        """ Install a filter for the new blocks.
+
+        Return:
+            BlockFilter: The filter instance, or None if the node doesn't
+            support block filters.
+        """
+        try:
+            return BlockFilter(self.client)
+        except JSONRPCClientReplyError:
+            log.warning('block filters not supported, polling the block number')
+            return None
+
+    def new_heads_subscription(self):
+        """ Subscribe to the new blocks through the websocket endpoint.
+
+        Return:
+            NewHeadsSubscription: The subscription, or None if there is no
+            websocket endpoint or the subscription failed.
+        """
+        if self.ws_endpoint is None:
+            return None
+
+        try:
+            return NewHeadsSubscription(self.ws_endpoint)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('could not subscribe to the new blocks, polling the node')
+            return None
+
+    def get_logs(self, contract_address, topics, from_block, to_block):
+        """ Return the logs of the contracts at `contract_address` matching
+        `topics` in the inclusive block range.
+        """
+        return get_logs(
+            self.client,
+            contract_address,
+            topics,
+            from_block,
+            to_block,
+        )
+
     def uninstall_filter(self, filter_id_raw):
         self.client.call('eth_uninstallFilter', filter_id_raw)
 
@@ -426,27 +1143,7 @@ class Filter(object):
 
     def _query_filter(self, function):
         filter_changes = self.client.call(function, self.filter_id_raw)
-
-        # geth could return None
-        if filter_changes is None:
-            return []
-
-        result = list()
-        for log_event in filter_changes:
-            address = address_decoder(log_event['address'])
-            data = data_decoder(log_event['data'])
-            topics = [
-                decode_topic(topic)
-                for topic in log_event['topics']
-            ]
-
-            result.append({
-                'topics': topics,
-                'data': data,
-                'address': address,
-            })
-
-        return result
+        return decode_log_events(filter_changes)
 
     def changes(self):
         return self._query_filter('eth_getFilterChanges')
@@ -527,6 +1224,36 @@ class Discovery(object):
 
         return endpoint
 
+    def endpoints_by_addresses(self, node_addresses_bin):
+        """ Returns a dictionary address: endpoint for the registered
+        addresses in `node_addresses_bin`.
+
+        Raises:
+            ValueError: If the registry didn't return one entry per address,
+                e.g. because it was deployed without findEndpointsByAddresses.
+        """
+        node_addresses_hex = [
+            node_address_bin.encode('hex')
+            for node_address_bin in node_addresses_bin
+        ]
+        data = self.proxy.findEndpointsByAddresses.call(node_addresses_hex)
+        endpoints = decode_endpoints(data)
+
+        if len(endpoints) != len(node_addresses_bin):
+            raise ValueError(
+                'findEndpointsByAddresses returned {} endpoints for {} addresses'.format(
+                    len(endpoints),
+                    len(node_addresses_bin),
+                )
+            )
+
+        result = dict()
+        for node_address_bin, endpoint in zip(node_addresses_bin, endpoints):
+            if endpoint != '':
+                result[node_address_bin] = endpoint
+
+        return result
+
     def address_by_endpoint(self, endpoint):
         address = self.proxy.findAddressByEndpoint.call(endpoint)
 
@@ -535,6 +1262,22 @@ class Discovery(object):
 
         return address.decode('hex')
 
+    def addressregistered_filter(self, from_block=None, to_block=None):
+        topics = [CONTRACT_MANAGER.get_event_id(EVENT_ADDRESS_REGISTERED)]
+
+        filter_id_raw = new_filter(
+            self.client,
+            self.address,
+            topics,
+            from_block=from_block,
+            to_block=to_block,
+        )
+
+        return Filter(
+            self.client,
+            filter_id_raw,
+        )
+
 
 class Token(object):
     def __init__(
@@ -543,7 +1286,9 @@ class Token(object):
             token_address,
             startgas=GAS_LIMIT,
             gasprice=GAS_PRICE,
-            poll_timeout=DEFAULT_POLL_TIMEOUT):
+            poll_timeout=DEFAULT_POLL_TIMEOUT,
+            cache=None):
+        # pylint: disable=too-many-arguments
 
         result = jsonrpc_client.call(
             'eth_getCode',
@@ -567,6 +1312,7 @@ class Token(object):
         self.startgas = startgas
         self.gasprice = gasprice
         self.poll_timeout = poll_timeout
+        self.cache = cache if cache is not None else ContractCallCache()
 
     def approve(self, contract_address, allowance):
         """ Aprove `contract_address` to transfer up to `deposit` amount of token. """
@@ -590,7 +1336,11 @@ class Token(object):
 
     def balance_of(self, address):
         """ Return the balance of `address`. """
-        return self.proxy.balanceOf.call(address)
+        return self.cache.call(
+            CACHE_PER_BLOCK,
+            (self.address, 'balanceOf', normalize_address(address)),
+            lambda: self.proxy.balanceOf.call(address),
+        )
 
     def transfer(self, to_address, amount):
         transaction_hash = estimate_and_transact(
@@ -606,6 +1356,8 @@ class Token(object):
             raise e
         except InvalidTransaction as e:
             raise e
+        finally:
+            self.cache.invalidate(self.address)
 
         # TODO: check Transfer event
 
@@ -712,7 +1464,8 @@ class ChannelManager(object):
             manager_address,
             startgas=GAS_LIMIT,
             gasprice=GAS_PRICE,
-            poll_timeout=DEFAULT_POLL_TIMEOUT):
+            poll_timeout=DEFAULT_POLL_TIMEOUT,
+            cache=None):
         # pylint: disable=too-many-arguments
 
         result = jsonrpc_client.call(
@@ -737,10 +1490,15 @@ class ChannelManager(object):
         self.startgas = startgas
         self.gasprice = gasprice
         self.poll_timeout = poll_timeout
+        self.cache = cache if cache is not None else ContractCallCache()
 
     def token_address(self):
         """ Return the token of this manager. """
-        return address_decoder(self.proxy.tokenAddress.call())
+        return self.cache.call(
+            CACHE_IMMUTABLE,
+            (self.address, 'tokenAddress'),
+            lambda: address_decoder(self.proxy.tokenAddress.call()),
+        )
 
     def new_netting_channel(self, peer1, peer2, settle_timeout):
         if not isaddress(peer1):
@@ -773,12 +1531,11 @@ class ChannelManager(object):
             self.client.poll(transaction_hash.decode('hex'), timeout=self.poll_timeout)
         except JSONRPCPollTimeoutException as e:
             raise e
+        except TransactionThrew:
+            raise Exception('Duplicated channel')
         except InvalidTransaction as e:
             raise e
 
-        if check_transaction_threw(self.client, transaction_hash):
-            raise Exception('Duplicated channel')
-
         netting_channel_results_encoded = self.proxy.getChannelWith.call(
             other,
             startgas=self.startgas,
@@ -858,20 +1615,10 @@ class NettingChannel(object):
             channel_address,
             startgas=GAS_LIMIT,
             gasprice=GAS_PRICE,
-            poll_timeout=DEFAULT_POLL_TIMEOUT):
+            poll_timeout=DEFAULT_POLL_TIMEOUT,
+            cache=None):
         # pylint: disable=too-many-arguments
 
-        result = jsonrpc_client.call(
-            'eth_getCode',
-            address_encoder(channel_address),
-            'latest',
-        )
-
-        if result == '0x':
-            raise ValueError('Netting channel address {} does not contain code'.format(
-                address_encoder(channel_address),
-            ))
-
         proxy = jsonrpc_client.new_abi_contract(
             CONTRACT_MANAGER.get_abi(CONTRACT_NETTING_CHANNEL),
             address_encoder(channel_address),
@@ -883,20 +1630,53 @@ class NettingChannel(object):
         self.startgas = startgas
         self.gasprice = gasprice
         self.poll_timeout = poll_timeout
-
-        # check we are a participant of the given channel
+        self.cache = cache if cache is not None else ContractCallCache()
+        self.token = None
         self.node_address = privatekey_to_address(self.client.privkey)
-        self.detail(self.node_address)
+
+        def check_code():
+            result = jsonrpc_client.call(
+                'eth_getCode',
+                address_encoder(channel_address),
+                'latest',
+            )
+
+            if result == '0x':
+                raise ValueError('Netting channel address {} does not contain code'.format(
+                    address_encoder(channel_address),
+                ))
+
+        # check the contract exists and we are a participant of the given
+        # channel, the requests are sent in a single batch so the immutable
+        # values are only cached after the check
+        self.cache.unchecked.add(channel_address)
+        try:
+            batch_calls(
+                check_code,
+                lambda: self.detail(self.node_address),
+            )
+        finally:
+            self.cache.unchecked.discard(channel_address)
 
     def token_address(self):
-        return address_decoder(self.proxy.tokenAddress.call())
+        return self.cache.call(
+            CACHE_IMMUTABLE,
+            (self.address, 'tokenAddress'),
+            lambda: address_decoder(self.proxy.tokenAddress.call()),
+        )
 
     def detail(self, our_address):
         """`our_address` is an argument used only in mock_client.py but is also
         kept here to maintain a consistent interface"""
         our_address = self.client.sender
-        data = self.proxy.addressAndBalance.call(startgas=self.startgas)
-        settle_timeout = self.proxy.settleTimeout.call(startgas=self.startgas)
+        data, settle_timeout = batch_calls(
+            lambda: self.cache.call(
+                CACHE_PER_BLOCK,
+                (self.address, 'addressAndBalance'),
+                lambda: self.proxy.addressAndBalance.call(startgas=self.startgas),
+            ),
+            self.settle_timeout,
+        )
 
         if data == '':
             raise RuntimeError('addressAndBalance call failed.')
@@ -929,15 +1709,18 @@ class NettingChannel(object):
         ))
 
     def settle_timeout(self):
-        settle_timeout = self.proxy.settleTimeout.call()
-        return settle_timeout
+        return self.cache.call(
+            CACHE_IMMUTABLE,
+            (self.address, 'settleTimeout'),
+            lambda: self.proxy.settleTimeout.call(startgas=self.startgas),
+        )
 
     def can_transfer(self):
-        if self.proxy.closed.call() != 0:
+        if self.closed() != 0:
             return False
 
         return (
-            self.proxy.opened.call() != 0 and
+            self.opened() != 0 and
             self.detail(None)['our_balance'] > 0
         )
 
@@ -945,12 +1728,15 @@ class NettingChannel(object):
         if not isinstance(amount, (int, long)):
             raise ValueError('amount needs to be an integral number.')
 
-        token = Token(
-            self.client,
-            self.token_address(),
-            poll_timeout=self.poll_timeout,
-        )
-        current_balance = token.balance_of(self.node_address)
+        if self.token is None:
+            self.token = Token(
+                self.client,
+                self.token_address(),
+                poll_timeout=self.poll_timeout,
+                cache=self.cache,
+            )
+
+        current_balance = self.token.balance_of(self.node_address)
 
         if current_balance < amount:
             raise ValueError('deposit [{}] cant be larger than the available balance [{}].'.format(
@@ -970,20 +1756,39 @@ class NettingChannel(object):
             raise e
         except InvalidTransaction as e:
             raise e
+        finally:
+            self.cache.invalidate(self.address)
+            self.cache.invalidate(self.token.address)
 
         log.info('deposit called', contract=pex(self.address), amount=amount)
 
     def opened(self):
-        return self.proxy.opened.call()
+        return self.cache.call(
+            CACHE_IMMUTABLE,
+            (self.address, 'opened'),
+            self.proxy.opened.call,
+        )
 
     def closed(self):
-        return self.proxy.closed.call()
+        return self.cache.call(
+            CACHE_PER_BLOCK,
+            (self.address, 'closed'),
+            self.proxy.closed.call,
+        )
 
     def closing_address(self):
-        return address_decoder(self.proxy.closingAddress())
+        return self.cache.call(
+            CACHE_PER_BLOCK,
+            (self.address, 'closingAddress'),
+            lambda: address_decoder(self.proxy.closingAddress()),
+        )
 
     def settled(self):
-        return self.proxy.settled.call()
+        return self.cache.call(
+            CACHE_PER_BLOCK,
+            (self.address, 'settled'),
+            self.proxy.settled.call,
+        )
 
     def close(self, their_transfer):
         if their_transfer:
@@ -1002,6 +1807,8 @@ class NettingChannel(object):
             raise e
         except InvalidTransaction as e:
             raise e
+        finally:
+            self.cache.invalidate(self.address)
         log.info(
             'close called',
             contract=pex(self.address),
@@ -1024,6 +1831,8 @@ class NettingChannel(object):
                 raise e
             except InvalidTransaction as e:
                 raise e
+            finally:
+                self.cache.invalidate(self.address)
 
             log.info(
                 'update_transfer called',
@@ -1062,6 +1871,8 @@ class NettingChannel(object):
                 raise e
             except InvalidTransaction as e:
                 raise e
+            finally:
+                self.cache.invalidate(self.address)
 
             # TODO: check if the ChannelSecretRevealed event was emitted and if
             # it wasn't raise an error
@@ -1087,6 +1898,8 @@ class NettingChannel(object):
             raise e
         except InvalidTransaction as e:
             raise e
+        finally:
+            self.cache.invalidate(self.address)
 
         # TODO: check if the ChannelSettled event was emitted and if it wasn't raise an error
         log.info('settle called', contract=pex(self.address))
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+import base64
+import hashlib
+import json
+import os
+import struct
+import urlparse
+
+from ethereum import slogging
+from gevent import socket
+from gevent import ssl
+
+from raiden.exceptions import EthNodeCommunicationError
+
+log = slogging.get_logger(__name__)  # pylint: disable=invalid-name
+
+# Websocket opcodes, RFC 6455 section 5.2
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xa
+
+# Appended to the handshake key to compute the accept key of the server
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+
+def accept_key(key):
+    """ Return the Sec-WebSocket-Accept value for the handshake `key`. """
+    return base64.b64encode(hashlib.sha1(key + WEBSOCKET_GUID).digest())
+
+
+def mask_payload(mask, payload):
+    masked = bytearray(payload)
+    for position in range(len(masked)):
+        masked[position] ^= ord(mask[position % 4])
+    return bytes(masked)
+
+
+def encode_frame(opcode, payload, mask=True):
+    """ Encode a single final frame, clients must mask the frames they send. """
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+
+    header = struct.pack('B', 0x80 | opcode)
+    if length < 126:
+        header += struct.pack('B', mask_bit | length)
+    elif length < 1 << 16:
+        header += struct.pack('>BH', mask_bit | 126, length)
+    else:
+        header += struct.pack('>BQ', mask_bit | 127, length)
+
+    if mask:
+        masking_key = os.urandom(4)
+        return header + masking_key + mask_payload(masking_key, payload)
+
+    return header + payload
+
+
+class WebSocketClient(object):
+    """ Minimal websocket client, enough to talk JSON-RPC with an ethereum
+    node. Pings are answered, extensions and subprotocols are not supported.
+    """
+
+    def __init__(self, url, timeout=10):
+        parsed = urlparse.urlparse(url)
+
+        if parsed.scheme not in ('ws', 'wss'):
+            raise ValueError('{} is not a websocket endpoint'.format(url))
+
+        host = parsed.hostname
+        port = parsed.port or (443 if parsed.scheme == 'wss' else 80)
+
+        connection = socket.create_connection((host, port), timeout=timeout)
+        if parsed.scheme == 'wss':
+            context = ssl.create_default_context()
+            connection = context.wrap_socket(connection, server_hostname=host)
+
+        self.socket = connection
+        self.buffer = b''
+        self.handshake(host, port, parsed.path or '/')
+
+        # the node only writes when there is something to deliver
+        self.socket.settimeout(None)
+
+    def handshake(self, host, port, path):
+        key = base64.b64encode(os.urandom(16))
+
+        request = (
+            'GET {path} HTTP/1.1\r\n'
+            'Host: {host}:{port}\r\n'
+            'Upgrade: websocket\r\n'
+            'Connection: Upgrade\r\n'
+            'Sec-WebSocket-Key: {key}\r\n'
+            'Sec-WebSocket-Version: 13\r\n'
+            '\r\n'
+        ).format(path=path, host=host, port=port, key=key)
+        self.socket.sendall(request)
+
+        response = self.read_until(b'\r\n\r\n')
+        lines = response.split(b'\r\n')
+
+        status = lines[0].split()
+        if len(status) < 2 or status[1] != b'101':
+            raise EthNodeCommunicationError(
+                'websocket handshake failed: {}'.format(lines[0])
+            )
+
+        headers = dict()
+        for line in lines[1:]:
+            name, _, value = line.partition(b':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get(b'sec-websocket-accept') != accept_key(key):
+            raise EthNodeCommunicationError('websocket handshake failed: invalid accept key')
+
+    def read_until(self, delimiter):
+        while delimiter not in self.buffer:
+            self.fill_buffer()
+
+        data, _, self.buffer = self.buffer.partition(delimiter)
+        return data
+
+    def read_exact(self, size):
+        while len(self.buffer) < size:
+            self.fill_buffer()
+
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def fill_buffer(self):
+        data = self.socket.recv(4096)
+
+        if not data:
+            raise EthNodeCommunicationError('websocket connection closed')
+
+        self.buffer += data
+
+    def send(self, message):
+        self.socket.sendall(encode_frame(OPCODE_TEXT, message))
+
+    def recv(self):
+        """ Return the next message, blocks until it's received. """
+        message = b''
+
+        while True:
+            first, second = struct.unpack('BB', self.read_exact(2))
+            final = first & 0x80
+            opcode = first & 0x0f
+
+            length = second & 0x7f
+            if length == 126:
+                length, = struct.unpack('>H', self.read_exact(2))
+            elif length == 127:
+                length, = struct.unpack('>Q', self.read_exact(8))
+
+            if second & 0x80:
+                masking_key = self.read_exact(4)
+                payload = mask_payload(masking_key, self.read_exact(length))
+            else:
+                payload = self.read_exact(length)
+
+            if opcode == OPCODE_PING:
+                self.socket.sendall(encode_frame(OPCODE_PONG, payload))
+                continue
+
+            if opcode == OPCODE_PONG:
+                continue
+
+            if opcode == OPCODE_CLOSE:
+                raise EthNodeCommunicationError('websocket connection closed by the node')
+
+            message += payload
+            if final:
+                return message
+
+    def close(self):
+        try:
+            self.socket.sendall(encode_frame(OPCODE_CLOSE, b''))
+        except socket.error:
+            pass
+
+        self.socket.close()
+
+
+class NewHeadsSubscription(object):
+    """ Subscription to the new blocks, the node pushes the header of every
+    block added to the chain.
+    """
+
+    def __init__(self, url):
+        self.connection = WebSocketClient(url)
+
+        request = {
+            'jsonrpc': '2.0',
+            'id': 1,
+            'method': 'eth_subscribe',
+            'params': ['newHeads'],
+        }
+        self.connection.send(json.dumps(request))
+        reply = json.loads(self.connection.recv())
+
+        if 'error' in reply:
+            self.connection.close()
+            raise EthNodeCommunicationError(
+                'could not subscribe to the new blocks: {}'.format(reply['error'])
+            )
+
+        self.subscription_id = reply['result']
+
+    def __iter__(self):
+        """ Yield the number of the new blocks as they are mined. """
+        while True:
+            message = json.loads(self.connection.recv())
+            params = message.get('params') or dict()
+
+            if params.get('subscription') != self.subscription_id:
+                log.debug('ignoring websocket message', message=message)
+                continue
+
+            yield int(params['result']['number'], 16)
+
+    def close(self):
+        self.connection.close()
@@ -3,13 +3,22 @@
 This module contains the classes responsible to implement the network
 communication.
 """
+import errno
+import socket as pysocket
+import struct
+from collections import deque
 from time import time
 
 import gevent
-from gevent.server import DatagramServer
+from gevent import socket as gsocket
+from gevent.event import Event
+from gevent.server import DatagramServer, StreamServer
+from gevent.socket import wait_read, wait_write
 from ethereum import slogging
 
-from raiden.network.protocol import RaidenProtocol
+from raiden.constants import UDP_MAX_MESSAGE_SIZE
+from raiden.encoding import messages
+from raiden.network.protocol import RaidenProtocol, timeout_exponential_backoff
 from raiden.utils import pex, sha3
 
 log = slogging.get_logger('raiden.network.transport')  # pylint: disable=invalid-name
@@ -22,9 +31,15 @@ class DummyPolicy(object):
     def __init__(self):
         pass
 
-    def consume(self, tokens):  # pylint: disable=unused-argument,no-self-use
+    def consume(self, tokens, host_port=None):  # pylint: disable=unused-argument,no-self-use
         return 0.
 
+    def on_ack(self, host_port):  # pylint: disable=unused-argument,no-self-use
+        pass
+
+    def on_loss(self, host_port):  # pylint: disable=unused-argument,no-self-use
+        pass
+
 
 class TokenBucket(object):
     """Implementation of the token bucket throttling algorithm.
@@ -38,10 +53,12 @@ class TokenBucket(object):
         self._time = time_function or time
         self.timestamp = self._time()
 
-    def consume(self, tokens):
+    def consume(self, tokens, host_port=None):  # pylint: disable=unused-argument
         """Consume tokens.
         Args:
             tokens (float): number of transport tokens to consume
+            host_port (Tuple[(str, int)]): the destination, ignored since the
+                bucket is shared among all destinations
         Returns:
             wait_time (float): waiting time for the consumer
         """
@@ -60,6 +77,106 @@ class TokenBucket(object):
             self.tokens = self.capacity
         self.timestamp = now
 
+    def on_ack(self, host_port):  # pylint: disable=unused-argument,no-self-use
+        pass
+
+    def on_loss(self, host_port):  # pylint: disable=unused-argument,no-self-use
+        pass
+
+
+class CongestionControl(object):
+    """Per destination AIMD throttling policy with a global cap.
+
+    Each destination has its own TokenBucket, the bucket's fill rate is
+    increased additively for every acknowledged message and decreased
+    multiplicatively for every lost message. A slow or lossy peer only
+    throttles the traffic sent to itself, while a fast peer may use up to
+    `max_fill_rate`. The global bucket caps the sending rate of the node.
+    """
+
+    def __init__(
+            self,
+            capacity=10.,
+            fill_rate=10.,
+            min_fill_rate=1.,
+            max_fill_rate=100.,
+            global_capacity=500.,
+            global_fill_rate=500.,
+            increase=1.,
+            decrease=0.5,
+            time_function=None):
+
+        if not 0 < decrease < 1:
+            raise ValueError('decrease must be in the open interval (0, 1)')
+
+        if not 0 < min_fill_rate <= fill_rate <= max_fill_rate:
+            raise ValueError('fill_rate must be between min_fill_rate and max_fill_rate')
+
+        self.capacity = capacity
+        self.fill_rate = fill_rate
+        self.min_fill_rate = float(min_fill_rate)
+        self.max_fill_rate = float(max_fill_rate)
+        self.increase = increase
+        self.decrease = decrease
+
+        self._time = time_function or time
+        self.global_bucket = TokenBucket(
+            global_capacity,
+            global_fill_rate,
+            self._time,
+        )
+        self.hostport_to_bucket = dict()
+
+    def _get_bucket(self, host_port):
+        bucket = self.hostport_to_bucket.get(host_port)
+
+        if bucket is None:
+            bucket = TokenBucket(
+                self.capacity,
+                self.fill_rate,
+                self._time,
+            )
+            self.hostport_to_bucket[host_port] = bucket
+
+        return bucket
+
+    def consume(self, tokens, host_port=None):
+        """Consume tokens from the global and the destination buckets.
+        Args:
+            tokens (float): number of transport tokens to consume
+            host_port (Tuple[(str, int)]): the destination of the packet
+        Returns:
+            wait_time (float): waiting time for the consumer
+        """
+        wait_time = self.global_bucket.consume(tokens)
+
+        if host_port is not None:
+            peer_wait_time = self._get_bucket(host_port).consume(tokens)
+            wait_time = max(wait_time, peer_wait_time)
+
+        return wait_time
+
+    def _set_fill_rate(self, bucket, fill_rate):
+        # account the tokens filled with the old rate before changing it
+        bucket._get_tokens()  # pylint: disable=protected-access
+        bucket.fill_rate = fill_rate
+
+    def on_ack(self, host_port):
+        """Additive increase of the fill rate for `host_port`."""
+        bucket = self._get_bucket(host_port)
+        fill_rate = min(bucket.fill_rate + self.increase, self.max_fill_rate)
+        self._set_fill_rate(bucket, fill_rate)
+
+    def on_loss(self, host_port):
+        """Multiplicative decrease of the fill rate for `host_port`."""
+        bucket = self._get_bucket(host_port)
+        fill_rate = max(bucket.fill_rate * self.decrease, self.min_fill_rate)
+        self._set_fill_rate(bucket, fill_rate)
+
+    def get_fill_rate(self, host_port):
+        """Returns the current sending rate for `host_port`."""
+        return self._get_bucket(host_port).fill_rate
+
 
 class UDPTransport(object):
     """ Node communication using the UDP protocol. """
@@ -82,8 +199,8 @@ class UDPTransport(object):
         self.port = self.server.server_port
         self.throttle_policy = throttle_policy
 
-    def receive(self, data, host_port):  # pylint: disable=unused-argument
-        self.protocol.receive(data)
+    def receive(self, data, host_port):
+        self.protocol.receive(data, host_port)
 
         # enable debugging using the DummyNetwork callbacks
         DummyTransport.track_recv(self.protocol.raiden, host_port, data)
@@ -96,7 +213,7 @@ class UDPTransport(object):
             host_port (Tuple[(str, int)]): Tuple with the host name and port number.
             bytes_ (bytes): The bytes that are going to be sent through the wire.
         """
-        gevent.sleep(self.throttle_policy.consume(1))
+        gevent.sleep(self.throttle_policy.consume(1, host_port))
         self.server.sendto(bytes_, host_port)
 
         # enable debugging using the DummyNetwork callbacks
@@ -110,6 +227,334 @@ class UDPTransport(object):
         self.server.stop()
 
 
+class BatchedUDPTransport(object):
+    """ Node communication using the UDP protocol, reading and writing the
+    packets in batches.
+
+    Instead of dispatching a greenlet for each packet, the socket is drained
+    in a loop every time it becomes readable, and the outgoing packets queued
+    since the last iteration are written in one go.
+    """
+
+    def __init__(
+            self,
+            host,
+            port,
+            socket=None,
+            protocol=None,
+            throttle_policy=DummyPolicy(),
+            batch_size=64):
+
+        if socket is None:
+            socket = pysocket.socket(pysocket.AF_INET, pysocket.SOCK_DGRAM)
+            socket.setsockopt(pysocket.SOL_SOCKET, pysocket.SO_REUSEADDR, 1)
+            socket.bind((host, port))
+
+        socket.setblocking(False)
+
+        self.protocol = protocol
+        self.socket = socket
+        self.host, self.port = socket.getsockname()
+        self.throttle_policy = throttle_policy
+        self.batch_size = batch_size
+
+        self.outgoing = deque()
+        self.event_outgoing = Event()
+
+        self.greenlets = [
+            gevent.spawn(self._receive_loop),
+            gevent.spawn(self._send_loop),
+        ]
+
+    def _read_batch(self):
+        packets = list()
+
+        while len(packets) < self.batch_size:
+            try:
+                packets.append(self.socket.recvfrom(65536))
+            except pysocket.error as e:
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    break
+
+                # e.g. ECONNREFUSED caused by a previous sendto, ignore it and
+                # keep reading
+                log.debug('error while reading from socket', error=e)
+
+        return packets
+
+    def _receive_loop(self):
+        fileno = self.socket.fileno()
+
+        while True:
+            packets = self._read_batch()
+
+            for data, host_port in packets:
+                self.receive(data, host_port)
+
+            # Only wait for the socket once it's drained, otherwise just give
+            # the other greenlets a chance to run.
+            if len(packets) < self.batch_size:
+                wait_read(fileno)
+            else:
+                gevent.sleep(0)
+
+    def _send_loop(self):
+        fileno = self.socket.fileno()
+
+        while True:
+            self.event_outgoing.wait()
+
+            while self.outgoing:
+                host_port, bytes_ = self.outgoing[0]
+
+                try:
+                    self.socket.sendto(bytes_, host_port)
+                except pysocket.error as e:
+                    if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                        wait_write(fileno)
+                        continue
+
+                    log.debug('error while writing to socket', error=e)
+
+                self.outgoing.popleft()
+
+            self.event_outgoing.clear()
+
+    def receive(self, data, host_port):
+        self.protocol.receive(data, host_port)
+
+        # enable debugging using the DummyNetwork callbacks
+        DummyTransport.track_recv(self.protocol.raiden, host_port, data)
+
+    def send(self, sender, host_port, bytes_):
+        """ Queue `bytes_` to be sent to `host_port` by the next iteration of
+        the sending loop.
+
+        Args:
+            sender (address): The address of the running node.
+            host_port (Tuple[(str, int)]): Tuple with the host name and port number.
+            bytes_ (bytes): The bytes that are going to be sent through the wire.
+        """
+        gevent.sleep(self.throttle_policy.consume(1, host_port))
+        self.outgoing.append((host_port, bytes_))
+        self.event_outgoing.set()
+
+        # enable debugging using the DummyNetwork callbacks
+        DummyTransport.network.track_send(sender, host_port, bytes_)
+
+    def register(self, proto, host, port):  # pylint: disable=unused-argument
+        assert isinstance(proto, RaidenProtocol)
+        self.protocol = proto
+
+    def stop(self):
+        gevent.killall(self.greenlets)
+        self.socket.close()
+
+
+# length prefix of the frames used by the TCPTransport
+FRAME_HEADER = struct.Struct('!I')
+
+# each frame carries a single message, which is never larger than an UDP
+# message, a larger announced size is rejected before reading the body
+TCP_MAX_FRAME_SIZE = UDP_MAX_MESSAGE_SIZE
+
+
+def recv_exactly(sock, size):
+    """ Reads `size` bytes from `sock`, returns None if the connection was
+    closed before that.
+    """
+    chunks = list()
+
+    while size:
+        chunk = sock.recv(size)
+
+        if not chunk:
+            return None
+
+        chunks.append(chunk)
+        size -= len(chunk)
+
+    return b''.join(chunks)
+
+
+class StreamConnection(object):
+    """ Persistent outgoing connection to a single peer.
+
+    The frames queued between two writes are coalesced and written with a
+    single syscall. Frames containing only Acks are delayed for `ack_delay`
+    seconds, so that these can be batched with the following frames.
+
+    Frames that cannot be written because the connection is down are lost,
+    the same way UDP packets are, the protocol retries are responsible for
+    resending them.
+    """
+
+    def __init__(
+            self,
+            host_port,
+            ack_delay=0.005,
+            max_pending=1024,
+            connect_timeout=5,
+            reconnect_timeout=0.5,
+            reconnect_max_timeout=30):
+
+        self.host_port = host_port
+        self.ack_delay = ack_delay
+        self.connect_timeout = connect_timeout
+        self.reconnect_timeout = reconnect_timeout
+        self.reconnect_max_timeout = reconnect_max_timeout
+
+        self.frames = deque(maxlen=max_pending)
+        self.only_acks = True
+        self.event_frames = Event()
+        self.greenlet = gevent.spawn(self._run)
+
+    def put(self, data):
+        self.frames.append(FRAME_HEADER.pack(len(data)) + data)
+        self.only_acks = self.only_acks and data[:1] == messages.ACK
+        self.event_frames.set()
+
+    def _connect(self):
+        backoff = timeout_exponential_backoff(
+            1,
+            self.reconnect_timeout,
+            self.reconnect_max_timeout,
+        )
+
+        while True:
+            try:
+                sock = gsocket.create_connection(
+                    self.host_port,
+                    timeout=self.connect_timeout,
+                )
+            except (pysocket.error, pysocket.timeout) as e:
+                log.debug('could not connect', host_port=self.host_port, error=e)
+                gevent.sleep(next(backoff))
+            else:
+                sock.settimeout(None)
+                sock.setsockopt(pysocket.IPPROTO_TCP, pysocket.TCP_NODELAY, 1)
+                return sock
+
+    def _write_loop(self, sock):
+        while True:
+            self.event_frames.wait()
+
+            if self.only_acks:
+                gevent.sleep(self.ack_delay)
+
+            buffer_ = b''.join(self.frames)
+            self.frames.clear()
+            self.only_acks = True
+            self.event_frames.clear()
+
+            sock.sendall(buffer_)
+
+    def _run(self):
+        while True:
+            sock = self._connect()
+
+            try:
+                self._write_loop(sock)
+            except pysocket.error as e:
+                log.debug('connection lost', host_port=self.host_port, error=e)
+            finally:
+                sock.close()
+
+    def stop(self):
+        self.greenlet.kill()
+
+
+class TCPTransport(object):
+    """ Node communication using persistent TCP connections.
+
+    Meant for peers that exchange high volumes of messages over stable
+    links, there is one outgoing connection per peer, the messages are sent
+    as length prefixed frames and the writes are coalesced.
+    """
+
+    def __init__(
+            self,
+            host,
+            port,
+            socket=None,
+            protocol=None,
+            throttle_policy=DummyPolicy(),
+            ack_delay=0.005):
+
+        if socket is not None:
+            raise ValueError('TCPTransport does not support the socket argument')
+
+        self.protocol = protocol
+        self.server = StreamServer((host, port), handle=self._handle_connection)
+        self.server.start()
+        self.host = self.server.server_host
+        self.port = self.server.server_port
+        self.throttle_policy = throttle_policy
+        self.ack_delay = ack_delay
+
+        self.hostport_to_connection = dict()
+
+    def _handle_connection(self, sock, host_port):
+        sock.setsockopt(pysocket.IPPROTO_TCP, pysocket.TCP_NODELAY, 1)
+
+        while True:
+            header = recv_exactly(sock, FRAME_HEADER.size)
+            if header is None:
+                return
+
+            size, = FRAME_HEADER.unpack(header)
+            if size > TCP_MAX_FRAME_SIZE:
+                log.error(
+                    'frame too large, closing the connection',
+                    size=size,
+                    host_port=host_port,
+                )
+                # the server closes the socket once the handler returns
+                return
+
+            data = recv_exactly(sock, size)
+            if data is None:
+                return
+
+            self.receive(data, host_port)
+
+    def receive(self, data, host_port):
+        self.protocol.receive(data, host_port)
+
+        # enable debugging using the DummyNetwork callbacks
+        DummyTransport.track_recv(self.protocol.raiden, host_port, data)
+
+    def send(self, sender, host_port, bytes_):
+        """ Send `bytes_` to `host_port`.
+
+        Args:
+            sender (address): The address of the running node.
+            host_port (Tuple[(str, int)]): Tuple with the host name and port number.
+            bytes_ (bytes): The bytes that are going to be sent through the wire.
+        """
+        gevent.sleep(self.throttle_policy.consume(1, host_port))
+
+        connection = self.hostport_to_connection.get(host_port)
+        if connection is None:
+            connection = StreamConnection(host_port, ack_delay=self.ack_delay)
+            self.hostport_to_connection[host_port] = connection
+
+        connection.put(bytes_)
+
+        # enable debugging using the DummyNetwork callbacks
+        DummyTransport.network.track_send(sender, host_port, bytes_)
+
+    def register(self, proto, host, port):  # pylint: disable=unused-argument
+        assert isinstance(proto, RaidenProtocol)
+        self.protocol = proto
+
+    def stop(self):
+        for connection in self.hostport_to_connection.values():
+            connection.stop()
+
+        self.server.stop()
+
+
 class DummyNetwork(object):
     """ Store global state for an in process network, this won't use a real
     network protocol just greenlet communication.
@@ -160,7 +605,7 @@ class DummyTransport(object):
         self.throttle_policy = throttle_policy
 
     def send(self, sender, host_port, bytes_):
-        gevent.sleep(self.throttle_policy.consume(1))
+        gevent.sleep(self.throttle_policy.consume(1, host_port))
         self.network.send(sender, host_port, bytes_)
 
     @classmethod
@@ -170,7 +615,7 @@ class DummyTransport(object):
 
     def receive(self, data, host_port=None):
         self.track_recv(self.protocol.raiden, host_port, data)
-        self.protocol.receive(data)
+        self.protocol.receive(data, host_port)
 
     def stop(self):
         pass
@@ -183,7 +628,7 @@ class UnreliableTransport(DummyTransport):
 
     def send(self, sender, host_port, bytes_):
         # even dropped packages have to go through throttle_policy
-        gevent.sleep(self.throttle_policy.consume(1))
+        gevent.sleep(self.throttle_policy.consume(1, host_port))
         drop = bool(self.network.counter % self.droprate == 0)
 
         if not drop:
@@ -5,10 +5,12 @@ from os import path
 import itertools
 import cPickle as pickle
 import random
+import time
 from collections import defaultdict
 
 import gevent
 from gevent.event import AsyncResult
+from gevent.pool import Pool
 from coincurve import PrivateKey
 from ethereum import slogging
 from ethereum.utils import encode_hex
@@ -17,10 +19,14 @@ from raiden.constants import (
     UINT64_MAX,
     NETTINGCHANNEL_SETTLE_TIMEOUT_MIN,
 )
+from raiden.blockchain.abi import CONTRACT_REGISTRY
 from raiden.blockchain.events import (
+    STARTUP_POOL_SIZE,
     get_relevant_proxies,
+    BlockchainEventsIngestion,
     PyethappBlockchainEvents,
 )
+from raiden.blockchain.store import ChainEventStore
 from raiden.event_handler import StateMachineEventHandler
 from raiden.message_handler import RaidenMessageHandler
 from raiden.tasks import (
@@ -36,6 +42,7 @@ from raiden.transfer.state import (
 from raiden.transfer.mediated_transfer import (
     initiator,
     mediator,
+    multipath,
 )
 from raiden.transfer.mediated_transfer import target as target_task
 from raiden.transfer.mediated_transfer.state import (
@@ -48,6 +55,7 @@ from raiden.transfer.state_change import (
 from raiden.transfer.mediated_transfer.state_change import (
     ActionInitInitiator,
     ActionInitMediator,
+    ActionInitMultipathInitiator,
     ActionInitTarget,
 )
 from raiden.transfer.events import (
@@ -79,6 +87,7 @@ from raiden.messages import (
 from raiden.network.protocol import (
     RaidenProtocol,
 )
+from raiden.network.rpc.client import batch_calls
 from raiden.connection_manager import ConnectionManager
 from raiden.utils import (
     isaddress,
@@ -167,6 +176,8 @@ class RaidenService(object):
             config['protocol']['nat_keepalive_retries'],
             config['protocol']['nat_keepalive_timeout'],
             config['protocol']['nat_invitation_timeout'],
+            config['protocol']['inbound_workers'],
+            config['protocol']['inbound_queue_size'],
         )
         transport.protocol = protocol
 
@@ -194,15 +205,22 @@ class RaidenService(object):
 
         message_handler = RaidenMessageHandler(self)
         state_machine_event_handler = StateMachineEventHandler(self)
-        pyethapp_blockchain_events = PyethappBlockchainEvents()
+        pyethapp_blockchain_events = PyethappBlockchainEvents(chain)
+        events_ingestion = BlockchainEventsIngestion(
+            pyethapp_blockchain_events,
+            state_machine_event_handler.on_blockchain_statechange,
+        )
         greenlet_task_dispatcher = GreenletTasksDispatcher()
 
         alarm = AlarmTask(chain)
 
         # prime the block number cache and set the callbacks
         self._blocknumber = alarm.last_block_number
-        alarm.register_callback(self.poll_blockchain_events)
+        alarm.register_callback(chain.cache.new_block)
+        alarm.register_callback(chain.gas_estimates.new_block)
+        alarm.register_callback(events_ingestion.new_block)
         alarm.register_callback(self.set_block_number)
+        alarm.register_callback(discovery.poll_registrations)
 
         self.transaction_log = StateChangeLog(
             storage_instance=StateChangeLogSQLiteBackend(
@@ -210,6 +228,21 @@ class RaidenService(object):
             )
         )
 
+        # the events of the registry are always kept, the other contracts are
+        # tracked once their events are queried. The store has its own file,
+        # so its writes don't lock the state change log.
+        if config['database_path'] == ':memory:':
+            chain_events_path = ':memory:'
+        else:
+            chain_events_path = path.join(
+                path.dirname(config['database_path']),
+                'chain_events.db',
+            )
+        chain_events = ChainEventStore(chain, chain_events_path)
+        chain_events.track(chain.default_registry.address, CONTRACT_REGISTRY)
+        alarm.register_callback(chain_events.sync_all)
+
+        events_ingestion.start()
         alarm.start()
 
         registry_event = gevent.spawn(
@@ -223,6 +256,8 @@ class RaidenService(object):
         self.message_handler = message_handler
         self.state_machine_event_handler = state_machine_event_handler
         self.pyethapp_blockchain_events = pyethapp_blockchain_events
+        self.events_ingestion = events_ingestion
+        self.chain_events = chain_events
         self.greenlet_task_dispatcher = greenlet_task_dispatcher
 
         self.on_message = message_handler.on_message
@@ -230,6 +265,7 @@ class RaidenService(object):
         self.tokens_to_connectionmanagers = dict()
 
         self.serialization_file = None
+        self.rpc_cache_file = None
         if config['database_path'] != ':memory:':
             snapshot_dir = os.path.join(
                 path.dirname(self.config['database_path']),
@@ -245,10 +281,31 @@ class RaidenService(object):
                 'data.pickle',
             )
 
+            # the immutable contract values are kept across restarts, by
+            # registry so that the values of another chain are not used
+            self.rpc_cache_file = path.join(
+                snapshot_dir,
+                'rpc_cache_{}.pickle'.format(chain.default_registry.address.encode('hex')),
+            )
+            chain.cache.load(self.rpc_cache_file)
+
+            start = time.time()
             self.register_registry(self.chain.default_registry.address)
-            self.restore_from_snapshots()
+            log.info('startup: channels loaded', elapsed=time.time() - start)
 
+            start = time.time()
+            self.restore_from_snapshots()
+            log.info('startup: snapshot restored', elapsed=time.time() - start)
+
+            # warm the discovery cache for all the partners in one call
+            start = time.time()
+            discovery.preload_endpoints([
+                partner_address
+                for graph in self.token_to_channelgraph.itervalues()
+                for partner_address in graph.partneraddress_to_channel
+            ])
             registry_event.join()
+            log.info('startup: endpoints loaded', elapsed=time.time() - start)
 
     def __repr__(self):
         return '<{} {}>'.format(self.__class__.__name__, pex(self.address))
@@ -257,8 +314,8 @@ class RaidenService(object):
         data = load_snapshot(self.serialization_file)
 
         if data:
-            for channel in data['channels']:
-                self.restore_channel(channel)
+            pool = Pool(STARTUP_POOL_SIZE)
+            pool.map(self.restore_channel, data['channels'])
 
             for restored_queue in data['queues']:
                 self.restore_queue(restored_queue)
@@ -293,12 +350,9 @@ class RaidenService(object):
     def get_block_number(self):
         return self._blocknumber
 
-    def poll_blockchain_events(self, current_block=None):
-        # pylint: disable=unused-argument
-        on_statechange = self.state_machine_event_handler.on_blockchain_statechange
-
-        for state_change in self.pyethapp_blockchain_events.poll_state_change():
-            on_statechange(state_change)
+    def poll_blockchain_events(self):
+        """ Fetch and process the new blockchain events synchronously. """
+        self.events_ingestion.poll()
 
     def find_channel_by_address(self, netting_channel_address_bin):
         for graph in self.token_to_channelgraph.itervalues():
@@ -475,16 +529,19 @@ class RaidenService(object):
             del self.token_to_hashlock_to_channels[token_address][hashlock]
 
     def get_channel_details(self, token_address, netting_channel):
-        channel_details = netting_channel.detail(self.address)
+        channel_details, opened_block = batch_calls(
+            lambda: netting_channel.detail(self.address),
+            netting_channel.opened,
+        )
         our_state = ChannelEndState(
             channel_details['our_address'],
             channel_details['our_balance'],
-            netting_channel.opened(),
+            opened_block,
         )
         partner_state = ChannelEndState(
             channel_details['partner_address'],
             channel_details['partner_balance'],
-            netting_channel.opened(),
+            opened_block,
         )
 
         def register_channel_for_hashlock(channel, hashlock):
@@ -523,12 +580,14 @@ class RaidenService(object):
 
         # restoring balances from the BC since the serialized value could be
         # falling behind.
-        channel_details = netting_channel.detail(self.address)
+        channel_details, opened_block = batch_calls(
+            lambda: netting_channel.detail(self.address),
+            netting_channel.opened,
+        )
 
         # our_address is checked by detail
         assert channel_details['partner_address'] == serialized_channel.partner_address
 
-        opened_block = netting_channel.opened()
         our_state = ChannelEndState(
             channel_details['our_address'],
             channel_details['our_balance'],
@@ -600,10 +659,24 @@ class RaidenService(object):
         self.identifier_to_statemanagers = transfer_states
 
     def register_registry(self, registry_address):
+        manager_to_token = dict()
+        manager_to_details = defaultdict(list)
+
+        def token_of(manager):
+            if manager.address not in manager_to_token:
+                manager_to_token[manager.address] = manager.token_address()
+            return manager_to_token[manager.address]
+
+        def on_channel(manager, netting_channel):
+            # restore the channel while the other proxies are loaded
+            detail = self.get_channel_details(token_of(manager), netting_channel)
+            manager_to_details[manager.address].append(detail)
+
         proxies = get_relevant_proxies(
             self.chain,
             self.address,
             registry_address,
+            on_channel=on_channel,
         )
 
         # Install the filters first to avoid missing changes, as a consequence
@@ -612,17 +685,28 @@ class RaidenService(object):
 
         block_number = self.get_block_number()
 
-        for manager in proxies.channel_managers:
-            token_address = manager.token_address()
+        def manager_graph_data(manager):
+            return batch_calls(
+                lambda: token_of(manager),
+                manager.channels_addresses,
+            )
+
+        pool = Pool(STARTUP_POOL_SIZE)
+        graphs_data = pool.map(manager_graph_data, proxies.channel_managers)
+
+        for manager, (token_address, edge_list) in zip(proxies.channel_managers, graphs_data):
             manager_address = manager.address
 
-            channels_detail = list()
-            netting_channels = proxies.channelmanager_nettingchannels[manager_address]
-            for channel in netting_channels:
-                detail = self.get_channel_details(token_address, channel)
-                channels_detail.append(detail)
+            # keep the order of the channels in the manager
+            address_to_detail = {
+                detail.channel_address: detail
+                for detail in manager_to_details[manager_address]
+            }
+            channels_detail = [
+                address_to_detail[channel.address]
+                for channel in proxies.channelmanager_nettingchannels[manager_address]
+            ]
 
-            edge_list = manager.channels_addresses()
             graph = ChannelGraph(
                 self.address,
                 manager_address,
@@ -787,16 +871,21 @@ class RaidenService(object):
         self.alarm.stop_async()
 
         wait_for.extend(self.protocol.greenlets)
+        self.events_ingestion.stop()
         self.pyethapp_blockchain_events.uninstall_all_event_listeners()
 
         self.protocol.stop_and_wait()
 
         gevent.wait(wait_for)
+        self.chain_events.stop()
 
         # save the state after all tasks are done
         if self.serialization_file:
             save_snapshot(self.serialization_file, self)
 
+        if self.rpc_cache_file:
+            self.chain.cache.save(self.rpc_cache_file)
+
     def transfer_async(self, token_address, amount, target, identifier=None):
         """ Transfer `amount` between this node and `target`.
 
@@ -904,6 +993,12 @@ class RaidenService(object):
         return self.start_mediated_transfer(token_address, amount, identifier, target)
 
     def start_mediated_transfer(self, token_address, amount, identifier, target):
+        """ Start a mediated transfer of `amount` to `target`.
+
+        If none of our channels can carry the whole amount the transfer is
+        split across several channels, the parts are either all completed or
+        all failed and the returned result covers the whole payment.
+        """
         # pylint: disable=too-many-locals
 
         async_result = AsyncResult()
@@ -918,16 +1013,28 @@ class RaidenService(object):
             None,
         )
 
+        parts = None
         if not available_routes:
-            async_result.set(False)
-            return async_result
+            partial_routes = get_best_routes(
+                graph,
+                self.protocol.nodeaddresses_networkstatuses,
+                self.address,
+                target,
+                amount,
+                None,
+                allow_partial=True,
+            )
+            parts = multipath.split_amount(partial_routes, amount)
+
+            if not parts:
+                async_result.set(False)
+                return async_result
 
         self.protocol.start_health_check(target)
 
         if identifier is None:
             identifier = create_default_identifier()
 
-        route_state = RoutesState(available_routes)
         our_address = self.address
         block_number = self.get_block_number()
 
@@ -958,15 +1065,29 @@ class RaidenService(object):
         # use the same /random/ secret.
         random_generator = RandomSecretGenerator()
 
-        init_initiator = ActionInitInitiator(
-            our_address=our_address,
-            transfer=transfer_state,
-            routes=route_state,
-            random_generator=random_generator,
-            block_number=block_number,
-        )
+        if parts:
+            init_initiator = ActionInitMultipathInitiator(
+                our_address=our_address,
+                transfer=transfer_state,
+                parts=[
+                    (part_amount, RoutesState([route]))
+                    for route, part_amount in parts
+                ],
+                random_generator=random_generator,
+                block_number=block_number,
+            )
+            state_manager = StateManager(multipath.state_transition, None)
+
+        else:
+            init_initiator = ActionInitInitiator(
+                our_address=our_address,
+                transfer=transfer_state,
+                routes=RoutesState(available_routes),
+                random_generator=random_generator,
+                block_number=block_number,
+            )
+            state_manager = StateManager(initiator.state_transition, None)
 
-        state_manager = StateManager(initiator.state_transition, None)
         self.state_machine_event_handler.log_and_dispatch(state_manager, init_initiator)
 
         # TODO: implement the network timeout raiden.config['msg_timeout'] and
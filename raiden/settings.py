@@ -12,7 +12,13 @@ GAS_PRICE = denoms.shannon * 20
 DEFAULT_PROTOCOL_RETRIES_BEFORE_BACKOFF = 5
 DEFAULT_PROTOCOL_THROTTLE_CAPACITY = 10.
 DEFAULT_PROTOCOL_THROTTLE_FILL_RATE = 10.
+DEFAULT_PROTOCOL_THROTTLE_MIN_FILL_RATE = 1.
+DEFAULT_PROTOCOL_THROTTLE_MAX_FILL_RATE = 100.
+DEFAULT_PROTOCOL_THROTTLE_GLOBAL_CAPACITY = 500.
+DEFAULT_PROTOCOL_THROTTLE_GLOBAL_FILL_RATE = 500.
 DEFAULT_PROTOCOL_RETRY_INTERVAL = 1.
+DEFAULT_PROTOCOL_INBOUND_WORKERS = 4
+DEFAULT_PROTOCOL_INBOUND_QUEUE_SIZE = 256
 
 DEFAULT_REVEAL_TIMEOUT = 30
 DEFAULT_SETTLE_TIMEOUT = DEFAULT_REVEAL_TIMEOUT * 20
@@ -54,6 +54,41 @@ contract EndpointRegistry{
         return address_to_socket[eth_address];
     }
 
+    /*
+     * @notice Finds the sockets of multiple Ethereum Addresses in one call
+     * @dev The ABI cannot encode arrays of strings, so each socket is
+     *  prefixed by its length as a two byte big-endian integer and the results
+     *  are concatenated. Unregistered addresses have a zero length socket.
+     * @param An array of 20 byte Ethereum Addresses
+     * @return The length-prefixed sockets in the same order as eth_addresses
+     */
+    function findEndpointsByAddresses(address[] eth_addresses) constant returns (bytes sockets)
+    {
+        uint i;
+        uint j;
+        uint size = 0;
+
+        for (i = 0; i < eth_addresses.length; i++) {
+            size += 2 + bytes(address_to_socket[eth_addresses[i]]).length;
+        }
+
+        sockets = new bytes(size);
+        uint position = 0;
+
+        for (i = 0; i < eth_addresses.length; i++) {
+            bytes storage socket = bytes(address_to_socket[eth_addresses[i]]);
+
+            sockets[position] = byte(uint8(socket.length / 256));
+            sockets[position + 1] = byte(uint8(socket.length % 256));
+            position += 2;
+
+            for (j = 0; j < socket.length; j++) {
+                sockets[position + j] = socket[j];
+            }
+            position += socket.length;
+        }
+    }
+
     /*
      * @notice Finds Ethreum Address if given an existing socket address
      * @dev Finds Ethreum Address if given an existing socket address
@@ -10,6 +10,25 @@ from gevent.queue import (
 )
 
 REMOVE_CALLBACK = object()
+
+# Bounds of the interval between the polls for a new block, the upper bound is
+# the fixed interval that was used before the block time was taken into account
+MIN_WAIT_TIME = 0.1
+MAX_WAIT_TIME = 0.5
+
+# Number of polls in an average block time
+POLLS_PER_BLOCK = 15
+
+# Number of block times between the polls while the node pushes the new
+# blocks, the poll only catches up if a notification was lost
+SUBSCRIPTION_POLL_BLOCKS = 4
+
+# Interval between the polls while the node pushes the new blocks and the
+# block time is unknown
+SUBSCRIPTION_POLL_TIME = 60
+
+# Number of blocks between the updates of the block time estimate
+BLOCKTIME_UPDATE_INTERVAL = 1000
 log = slogging.get_logger(__name__)  # pylint: disable=invalid-name
 
 
@@ -26,7 +45,15 @@ class Task(gevent.Greenlet):
 
 
 class AlarmTask(Task):
-    """ Task to notify when a block is mined. """
+    """ Task to notify when a block is mined.
+
+    New blocks are pushed by the node when a websocket endpoint is configured,
+    the node is then only polled every few blocks in case a notification was
+    lost. Otherwise new blocks are detected with a block filter when the node
+    supports it, or by polling the block number, with an interval adapted to
+    the average block time. The callbacks are executed by a separate greenlet
+    so that a slow callback doesn't delay the detection of the next block.
+    """
 
     def __init__(self, chain):
         super(AlarmTask, self).__init__()
@@ -35,19 +62,28 @@ class AlarmTask(Task):
         self.stop_event = AsyncResult()
         self.chain = chain
         self.last_block_number = self.chain.block_number()
+        self.last_block_time = time.time()
 
-        # TODO: Start with a larger wait_time and decrease it as the
-        # probability of a new block increases.
-        self.wait_time = 0.5
+        self.blocktime = None
+        self.blocktime_block = self.last_block_number
+        self.wait_time = MAX_WAIT_TIME
         self.last_loop = time.time()
 
+        self.block_filter = None
+        self.use_block_filter = False
+        self.subscription = None
+        self.use_subscription = False
+        self.listener = None
+        self.new_blocks = Queue()
+        self.dispatcher = None
+
     def register_callback(self, callback):
         """ Register a new callback.
 
         Note:
             This callback will be executed in the AlarmTask context and for
-            this reason it should not block, otherwise we can miss block
-            changes.
+            this reason it should not block, otherwise the other callbacks are
+            delayed.
         """
         if not callable(callback):
             raise ValueError('callback is not a callable')
@@ -61,17 +97,66 @@ class AlarmTask(Task):
         except:
             pass
 
+    def update_blocktime(self):
+        """ Adapt the polling to the average block time of the chain. """
+        self.blocktime_block = self.last_block_number
+
+        try:
+            blocktime = self.chain.estimate_blocktime()
+        except Exception:  # pylint: disable=broad-except
+            log.exception('could not estimate the block time')
+            return
+
+        if blocktime:
+            self.blocktime = blocktime
+            self.wait_time = min(
+                max(blocktime / POLLS_PER_BLOCK, MIN_WAIT_TIME),
+                MAX_WAIT_TIME,
+            )
+
+    def poll_due(self, now):
+        """ Return whether the node must be polled for a new block. """
+        if self.subscription is None:
+            return True
+
+        if self.blocktime is None:
+            quiet_time = SUBSCRIPTION_POLL_TIME
+        else:
+            quiet_time = self.blocktime * SUBSCRIPTION_POLL_BLOCKS
+
+        return now - self.last_block_time >= quiet_time
+
     def _run(self):  # pylint: disable=method-hidden
         log.debug('starting block number', block_number=self.last_block_number)
 
+        self.update_blocktime()
+        self.dispatcher = gevent.spawn(self.dispatch_new_blocks)
+
+        # the block filter would expire while the node pushes the blocks
+        self.use_subscription = self.subscribe()
+        if not self.use_subscription:
+            self.block_filter = self.chain.new_block_filter()
+            self.use_block_filter = self.block_filter is not None
+
         sleep_time = 0
         while self.stop_event.wait(sleep_time) is not True:
-            self.poll_for_new_block()
+            loop_start = time.time()
+
+            if self.poll_due(loop_start):
+                subscription = self.subscription
+                current_block = self.check_new_block()
+
+                if current_block is not None:
+                    if subscription is not None and subscription is self.subscription:
+                        log.warning('block subscription stalled, polling the block number')
+                        self.unsubscribe()
+
+                    self.new_block(current_block)
 
             # we want this task to iterate in the tick of `wait_time`, so take
             # into account how long we spent executing one tick.
             self.last_loop = time.time()
-            work_time = self.last_loop - self.last_loop
+            work_time = self.last_loop - loop_start
             if work_time > self.wait_time:
                 log.warning(
                     'alarm loop is taking longer than the wait time',
@@ -80,11 +165,90 @@ class AlarmTask(Task):
                 )
                 sleep_time = 0.001
             else:
-                sleep_time = self.wait_time - work_time
+                sleep_time = max(self.wait_time - work_time, 0.001)
 
-    def poll_for_new_block(self):
-        current_block = self.chain.block_number()
+        self.unsubscribe()
+
+        self.new_blocks.put(StopIteration)
+        self.dispatcher.join()
+
+        if self.block_filter is not None:
+            self.block_filter.uninstall()
+
+    def new_block(self, current_block):
+        self.new_blocks.put(current_block)
+
+        if current_block - self.blocktime_block >= BLOCKTIME_UPDATE_INTERVAL:
+            self.update_blocktime()
+
+    def subscribe(self):
+        """ Subscribe to the new blocks pushed by the node, return whether
+        the node supports it.
+        """
+        self.subscription = self.chain.new_heads_subscription()
+
+        if self.subscription is None:
+            return False
 
+        self.listener = gevent.spawn(self.listen_new_blocks, self.subscription)
+        return True
+
+    def unsubscribe(self):
+        if self.listener is not None:
+            self.listener.kill()
+            self.listener = None
+
+        if self.subscription is not None:
+            self.subscription.close()
+            self.subscription = None
+
+    def listen_new_blocks(self, subscription):
+        try:
+            for block_number in subscription:
+                current_block = self.set_block_number(block_number)
+
+                if current_block is not None:
+                    self.new_block(current_block)
+        except Exception:  # pylint: disable=broad-except
+            log.exception('block subscription failed, polling the block number')
+
+        # the polling loop resubscribes on the next block
+        subscription.close()
+        self.subscription = None
+        self.listener = None
+
+    def dispatch_new_blocks(self):
+        for block_number in self.new_blocks:
+            # the callbacks only need the latest block
+            while not self.new_blocks.empty():
+                next_block = self.new_blocks.get()
+
+                if next_block is StopIteration:
+                    self.new_blocks.put(StopIteration)
+                    break
+
+                block_number = next_block
+
+            self.run_callbacks(block_number)
+
+    def check_new_block(self):
+        """ Return the new block number, or None if no block was mined since
+        the last check.
+        """
+        if self.block_filter is not None:
+            try:
+                if not self.block_filter.changes():
+                    return None
+            except Exception:  # pylint: disable=broad-except
+                log.exception('block filter failed, polling the block number')
+                self.block_filter = None
+
+        return self.set_block_number(self.chain.block_number())
+
+    def set_block_number(self, current_block):
+        """ Record the block number reported by the node, return it if it's
+        a new block otherwise None.
+        """
         if current_block > self.last_block_number + 1:
             difference = current_block - self.last_block_number - 1
             log.error(
@@ -92,30 +256,57 @@ class AlarmTask(Task):
                 difference,
             )
 
-        if current_block != self.last_block_number:
-            log.debug(
-                'new block',
-                number=current_block,
-                timestamp=self.last_loop,
-            )
+        if current_block == self.last_block_number:
+            return None
+
+        log.debug(
+            'new block',
+            number=current_block,
+            timestamp=self.last_loop,
+        )
+
+        self.last_block_number = current_block
+        self.last_block_time = time.time()
+
+        if self.use_block_filter and self.block_filter is None:
+            self.install_block_filter()
+
+        if self.use_subscription and self.subscription is None:
+            self.subscribe()
+
+        return current_block
 
-            self.last_block_number = current_block
-            remove = list()
-            for callback in self.callbacks:
-                try:
-                    result = callback(current_block)
-                except:  # pylint: disable=bare-except
-                    log.exception('unexpected exception on alarm')
-                else:
-                    if result is REMOVE_CALLBACK:
-                        remove.append(callback)
+    def install_block_filter(self):
+        """ Reinstall the block filter, e.g. after the node was restarted. """
+        try:
+            self.block_filter = self.chain.new_block_filter()
+        except Exception:  # pylint: disable=broad-except
+            log.exception('could not reinstall the block filter')
+
+    def run_callbacks(self, current_block):
+        remove = list()
+        for callback in self.callbacks:
+            try:
+                result = callback(current_block)
+            except:  # pylint: disable=bare-except
+                log.exception('unexpected exception on alarm')
+            else:
+                if result is REMOVE_CALLBACK:
+                    remove.append(callback)
+
+        for callback in remove:
+            self.callbacks.remove(callback)
+
+    def poll_for_new_block(self):
+        """ Check for a new block and run the callbacks synchronously. """
+        current_block = self.check_new_block()
 
-            for callback in remove:
-                self.callbacks.remove(callback)
+        if current_block is not None:
+            self.run_callbacks(current_block)
 
     def stop_and_wait(self):
         self.stop_event.set(True)
-        gevent.wait(self)
+        gevent.wait([self])
 
     def stop_async(self):
         self.stop_event.set(True)
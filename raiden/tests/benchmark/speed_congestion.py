@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the throughput of the throttling policies on a simulated network
+with peers of mixed latency and loss rates.
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+import gevent
+from gevent.event import Event
+
+from raiden.network.transport import CongestionControl, TokenBucket
+
+# (latency in seconds, loss rate)
+PEERS = [
+    (0.001, 0.0),
+    (0.001, 0.0),
+    (0.010, 0.01),
+    (0.050, 0.05),
+    (0.100, 0.20),
+    (0.200, 0.40),
+]
+
+
+def simulated_queue(policy, host_port, latency, loss, retry_timeout, counters, event_stop):
+    """ Stop-and-wait sender similar to `single_queue_send`. """
+    while not event_stop.is_set():
+        acknowledged = False
+
+        while not acknowledged and not event_stop.is_set():
+            gevent.sleep(policy.consume(1, host_port))
+
+            # the message and the Ack may be lost
+            lost = random.random() < loss or random.random() < loss
+            if lost:
+                gevent.sleep(retry_timeout)
+                policy.on_loss(host_port)
+            else:
+                gevent.sleep(2 * latency)
+                policy.on_ack(host_port)
+                acknowledged = True
+
+        if acknowledged:
+            counters[host_port] += 1
+
+
+def run(policy, duration, queues_per_peer, retry_timeout):
+    event_stop = Event()
+    counters = dict()
+    greenlets = list()
+
+    for port, (latency, loss) in enumerate(PEERS):
+        host_port = ('127.0.0.1', port)
+        counters[host_port] = 0
+
+        for _ in range(queues_per_peer):
+            greenlets.append(gevent.spawn(
+                simulated_queue,
+                policy,
+                host_port,
+                latency,
+                loss,
+                retry_timeout,
+                counters,
+                event_stop,
+            ))
+
+    start = time.time()
+    gevent.sleep(duration)
+    event_stop.set()
+    gevent.joinall(greenlets)
+    elapsed = time.time() - start
+
+    return elapsed, counters
+
+
+def print_results(name, elapsed, counters):
+    print(name)
+    for port, (latency, loss) in enumerate(PEERS):
+        acknowledged = counters[('127.0.0.1', port)]
+        print('  latency {:>5.0f}ms loss {:>3.0f}%: {:>8.2f} msg/s'.format(
+            latency * 1000,
+            loss * 100,
+            acknowledged / elapsed,
+        ))
+
+    print('  total: {:.2f} msg/s'.format(sum(counters.values()) / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--duration', default=10, type=float)
+    parser.add_argument('--queues-per-peer', default=4, type=int)
+    parser.add_argument('--retry-timeout', default=0.5, type=float)
+    args = parser.parse_args()
+
+    policies = [
+        ('TokenBucket', TokenBucket(10., 10.)),
+        ('CongestionControl', CongestionControl()),
+    ]
+
+    for name, policy in policies:
+        elapsed, counters = run(
+            policy,
+            args.duration,
+            args.queues_per_peer,
+            args.retry_timeout,
+        )
+        print_results(name, elapsed, counters)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the memory and traversal time of the networkx graph and the
+CompactGraph for a synthetic token network.
+
+Each engine is measured in a separate process, the memory is the increase of
+the maximum resident set size while building the graph.
+"""
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import time
+
+import networkx
+
+from raiden.network.compactgraph import CompactGraph
+
+
+def make_edges(nodes, edges_per_node, seed):
+    random.seed(seed)
+    addresses = [os.urandom(20) for _ in range(nodes)]
+    edge_list = list()
+
+    # preferential attachment, similar to networkx.barabasi_albert_graph
+    repeated = list(addresses[:edges_per_node])
+    for address in addresses[edges_per_node:]:
+        targets = set()
+        while len(targets) < edges_per_node:
+            targets.add(random.choice(repeated))
+
+        for target in targets:
+            edge_list.append((address, target))
+
+        repeated.extend(targets)
+        repeated.extend([address] * edges_per_node)
+
+    return addresses, edge_list
+
+
+def bfs_networkx(graph, source):
+    return len(networkx.single_source_shortest_path_length(graph, source))
+
+
+def bfs_compact(graph, source):
+    return len(graph.paths_of_length(source, len(graph)))
+
+
+def measure(engine, nodes, edges_per_node, seed, queue):
+    addresses, edge_list = make_edges(nodes, edges_per_node, seed)
+
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.time()
+
+    if engine == 'networkx':
+        graph = networkx.Graph()
+        graph.add_edges_from(edge_list)
+        bfs = bfs_networkx
+    else:
+        graph = CompactGraph(edge_list)
+        bfs = bfs_compact
+
+    build_time = time.time() - start
+    memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+
+    del edge_list
+
+    start = time.time()
+    for address in random.sample(addresses, 10):
+        bfs(graph, address)
+    bfs_time = (time.time() - start) / 10
+
+    queue.put((build_time, memory, bfs_time))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', default=100000, type=int)
+    parser.add_argument('--edges-per-node', default=3, type=int)
+    parser.add_argument('--seed', default=0, type=int)
+    args = parser.parse_args()
+
+    print('{} nodes, {} edges per node'.format(args.nodes, args.edges_per_node))
+
+    for engine in ('networkx', 'compact'):
+        queue = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=measure,
+            args=(engine, args.nodes, args.edges_per_node, args.seed, queue),
+        )
+        process.start()
+        build_time, memory, bfs_time = queue.get()
+        process.join()
+
+        print('  {:<10} build {:>8.2f}s  memory {:>8.1f}MB  full BFS {:>8.1f}ms'.format(
+            engine,
+            build_time,
+            memory / 1024.,
+            bfs_time * 1000,
+        ))
+
+
+if __name__ == '__main__':
+    main()
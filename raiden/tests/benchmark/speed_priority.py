@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Measures how long unlock-critical messages wait to be sent while the node is
+saturated with new transfers, with and without priority scheduling.
+"""
+from __future__ import print_function
+
+import argparse
+import time
+
+import gevent
+from gevent.event import Event
+
+from raiden.encoding import messages
+from raiden.network.protocol import (
+    NotifyingPriorityQueue,
+    PRIORITY_TRANSFER,
+    PRIORITY_UNLOCK,
+    single_host_send,
+)
+from raiden.network.transport import TokenBucket
+from raiden.settings import DEFAULT_REVEAL_TIMEOUT, ESTIMATED_BLOCK_TIME
+
+
+class ThrottledTransport(object):
+    def __init__(self, fill_rate):
+        self.throttle_policy = TokenBucket(10., fill_rate)
+        self.data_to_sent_time = dict()
+
+    def send(self, sender, host_port, bytes_):  # pylint: disable=unused-argument
+        gevent.sleep(self.throttle_policy.consume(1, host_port))
+        self.data_to_sent_time[bytes_] = time.time()
+
+
+def produce(queue, prefix, priority, rate, number, data_to_queued_time):
+    for i in range(number):
+        data = '{}{}'.format(prefix, i)
+        data_to_queued_time[data] = time.time()
+        queue.put(data, priority)
+        gevent.sleep(1. / rate)
+
+
+def run(use_priority, fill_rate, transfers, secrets):
+    transport = ThrottledTransport(fill_rate)
+    queue = NotifyingPriorityQueue()
+    event_stop = Event()
+    data_to_queued_time = dict()
+
+    sender = gevent.spawn(
+        single_host_send,
+        transport,
+        None,
+        ('127.0.0.1', 40001),
+        queue,
+        event_stop,
+    )
+
+    secret_priority = PRIORITY_UNLOCK if use_priority else PRIORITY_TRANSFER
+
+    # new transfers arrive twice as fast as the throttle allows
+    producers = [
+        gevent.spawn(
+            produce,
+            queue,
+            messages.MEDIATEDTRANSFER,
+            PRIORITY_TRANSFER,
+            fill_rate * 2,
+            transfers,
+            data_to_queued_time,
+        ),
+        gevent.spawn(
+            produce,
+            queue,
+            messages.SECRET,
+            secret_priority,
+            fill_rate / 10.,
+            secrets,
+            data_to_queued_time,
+        ),
+    ]
+    gevent.joinall(producers)
+
+    while len(transport.data_to_sent_time) < transfers + secrets:
+        gevent.sleep(0.1)
+
+    event_stop.set()
+    sender.join()
+
+    delays = sorted(
+        transport.data_to_sent_time[data] - queued_time
+        for data, queued_time in data_to_queued_time.items()
+        if data.startswith(messages.SECRET)
+    )
+    return delays
+
+
+def print_results(name, delays):
+    worst = delays[-1]
+    print(name)
+    print('  secret delay median {:.3f}s max {:.3f}s'.format(
+        delays[len(delays) // 2],
+        worst,
+    ))
+    print('  worst case delay is {:.2f} blocks of the {} blocks reveal timeout'.format(
+        worst / ESTIMATED_BLOCK_TIME,
+        DEFAULT_REVEAL_TIMEOUT,
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--fill-rate', default=100., type=float)
+    parser.add_argument('--transfers', default=1000, type=int)
+    parser.add_argument('--secrets', default=20, type=int)
+    args = parser.parse_args()
+
+    for name, use_priority in (('FIFO', False), ('Priority', True)):
+        delays = run(use_priority, args.fill_rate, args.transfers, args.secrets)
+        print_results(name, delays)
+
+
+if __name__ == '__main__':
+    main()
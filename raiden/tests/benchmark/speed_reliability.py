@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Simulates an initiator sending transfers through neighbors with different
+hidden reliabilities, and compares the end-to-end latency when the neighbors
+are tried in hop count order against the order by the learned reliability.
+
+Every failed attempt costs a refund round trip, and every timeout the lock
+expiration, before the next neighbor is tried.
+"""
+from __future__ import print_function
+
+import argparse
+import random
+
+from raiden.network.routing import RouteReliability
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    position = int(round(percent / 100. * (len(values) - 1)))
+    return values[position]
+
+
+def make_neighbors(number_of_neighbors, number_of_targets):
+    """ Returns neighbor: (hops, target: (success rate, timeout rate)) """
+    neighbors = dict()
+
+    for neighbor in range(number_of_neighbors):
+        hops = random.randint(2, 4)
+        target_to_rates = dict()
+
+        for target in range(number_of_targets):
+            success_rate = random.choice([0.95, 0.8, 0.3, 0.05])
+            timeout_rate = random.random() * (1 - success_rate) * 0.2
+            target_to_rates[target] = (success_rate, timeout_rate)
+
+        neighbors[neighbor] = (hops, target_to_rates)
+
+    return neighbors
+
+
+def simulate(neighbors, transfers, number_of_targets, hop_latency, timeout, learn):
+    current_time = [0.]
+    reliability = RouteReliability(time_function=lambda: current_time[0])
+    latencies = list()
+
+    for _ in range(transfers):
+        target = random.randrange(number_of_targets)
+
+        if learn:
+            def order(neighbor):
+                hops = neighbors[neighbor][0]
+                return (-reliability.success_rate(neighbor, target), hops)
+        else:
+            def order(neighbor):
+                return neighbors[neighbor][0]
+
+        candidates = list(neighbors)
+        random.shuffle(candidates)
+        candidates.sort(key=order)
+
+        latency = 0.
+        for neighbor in candidates:
+            hops, target_to_rates = neighbors[neighbor]
+            success_rate, timeout_rate = target_to_rates[target]
+            outcome = random.random()
+
+            if outcome < success_rate:
+                # mediated transfer, secret request, reveal secret
+                latency += 3 * hops * hop_latency
+                reliability.record_success(neighbor, target)
+                break
+
+            elif outcome < success_rate + timeout_rate:
+                latency += timeout
+                reliability.record_timeout(neighbor, target)
+
+            else:
+                # the transfer goes a random part of the path and back
+                latency += 2 * random.randint(1, hops) * hop_latency
+                reliability.record_refund(neighbor, target)
+
+        latencies.append(latency)
+        current_time[0] += 1.
+
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--neighbors', default=10, type=int)
+    parser.add_argument('--targets', default=20, type=int)
+    parser.add_argument('--transfers', default=20000, type=int)
+    parser.add_argument('--hop-latency', default=0.1, type=float)
+    parser.add_argument('--timeout', default=30., type=float)
+    parser.add_argument('--seed', default=0, type=int)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    neighbors = make_neighbors(args.neighbors, args.targets)
+
+    for name, learn in (('hop count', False), ('learned reliability', True)):
+        random.seed(args.seed + 1)
+        latencies = simulate(
+            neighbors,
+            args.transfers,
+            args.targets,
+            args.hop_latency,
+            args.timeout,
+            learn,
+        )
+
+        print('{:<20} p50 {:>7.2f}s  p90 {:>7.2f}s  p99 {:>7.2f}s'.format(
+            name,
+            percentile(latencies, 50),
+            percentile(latencies, 90),
+            percentile(latencies, 99),
+        ))
+
+
+if __name__ == '__main__':
+    main()
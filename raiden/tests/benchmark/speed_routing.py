@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Compares the time to order the neighbors of a node by their distance to a
+target, using one bidirectional search per neighbor, one BFS from the target,
+and the cached distances. `ordered_neighbors` picks one of the first two by the
+number of neighbors.
+"""
+from __future__ import print_function
+
+import argparse
+import random
+import time
+from heapq import heappush
+
+import networkx
+
+from raiden.network.channelgraph import DistanceMap, HUB_NEIGHBORS, ordered_neighbors
+from raiden.network.compactgraph import CompactGraph
+
+
+def ordered_neighbors_per_neighbor(nx_graph, our_address, target_address):
+    """ The previous implementation, one BFS for each neighbor. """
+    paths = list()
+
+    for neighbor in networkx.all_neighbors(nx_graph, our_address):
+        try:
+            length = networkx.shortest_path_length(
+                nx_graph,
+                neighbor,
+                target_address,
+            )
+            heappush(paths, (length, neighbor))
+        except networkx.NetworkXNoPath:
+            pass
+
+    return paths
+
+
+def make_hub_graph(nodes, edges_per_node, hub_degree):
+    nx_graph = networkx.barabasi_albert_graph(nodes, edges_per_node)
+
+    hub = nodes
+    for neighbor in random.sample(range(nodes), hub_degree):
+        nx_graph.add_edge(hub, neighbor)
+
+    return nx_graph, hub
+
+
+def measure(function, repetitions):
+    start = time.time()
+    for _ in range(repetitions):
+        function()
+    return (time.time() - start) / repetitions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--nodes', default=10000, type=int)
+    parser.add_argument('--edges-per-node', default=2, type=int)
+    parser.add_argument('--hub-degree', default=200, type=int)
+    parser.add_argument('--repetitions', default=5, type=int)
+    parser.add_argument('--seed', default=0, type=int)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    nx_graph, hub = make_hub_graph(args.nodes, args.edges_per_node, args.hub_degree)
+    target = random.randrange(args.nodes)
+
+    graph = CompactGraph(nx_graph.edges())
+
+    expected = sorted(ordered_neighbors_per_neighbor(nx_graph, hub, target))
+    assert sorted(ordered_neighbors(graph, hub, target)) == expected
+
+    # a fully expanded map, as reused from the cache
+    distances = DistanceMap(graph, target)
+    while distances.frontier:
+        distances.expand()
+
+    def per_neighbor():
+        return [
+            graph.shortest_path_length(neighbor, target)
+            for neighbor in graph.neighbors(hub)
+        ]
+
+    results = [
+        ('networkx per neighbor', lambda: ordered_neighbors_per_neighbor(nx_graph, hub, target)),
+        ('per neighbor', per_neighbor),
+        ('single BFS', lambda: ordered_neighbors(graph, hub, target, DistanceMap(graph, target))),
+        ('cached distances', lambda: ordered_neighbors(graph, hub, target, distances)),
+        ('ordered_neighbors', lambda: ordered_neighbors(graph, hub, target)),
+    ]
+
+    print('{} nodes, node with {} neighbors, hubs have more than {}'.format(
+        args.nodes + 1,
+        args.hub_degree,
+        HUB_NEIGHBORS,
+    ))
+    for name, function in results:
+        elapsed = measure(function, args.repetitions)
+        print('  {:<20} {:>10.3f}ms'.format(name, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
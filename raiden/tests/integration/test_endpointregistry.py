@@ -61,3 +61,100 @@ def test_endpointregistry_gas(private_keys, blockchain_services):
         contract_discovery = ContractDiscovery(my_address, discovery_proxy)
         contract_discovery.register(my_address, '127.0.0.{}'.format(i + 1), 44444)
         chain.next_block()
+
+
+@pytest.mark.parametrize('number_of_nodes', [1])
+def test_endpointregistry_cache(private_keys, blockchain_services, tmpdir):
+    chain = blockchain_services.blockchain_services[0]
+    my_address = privatekey_to_address(private_keys[0])
+    cache_path = str(tmpdir.join('discovery.pickle'))
+
+    endpointregistry_address = chain.deploy_contract(
+        'EndpointRegistry',
+        get_contract_path('EndpointRegistry.sol'),
+    )
+    discovery_proxy = chain.discovery(endpointregistry_address)
+
+    contract_discovery = ContractDiscovery(
+        my_address,
+        discovery_proxy,
+        cache_path=cache_path,
+    )
+    contract_discovery.register(my_address, '127.0.0.1', 44444)
+    contract_discovery.poll_registrations(chain.block_number())
+
+    # the endpoints are loaded from the cache, no RPC calls are needed
+    restarted_discovery = ContractDiscovery(
+        my_address,
+        discovery_proxy,
+        cache_path=cache_path,
+    )
+    assert restarted_discovery.synced_block == chain.block_number()
+    assert restarted_discovery.nodeid_to_hostport[my_address] == ('127.0.0.1', 44444)
+
+    # unknown addresses are cached negatively
+    unregistered_address = make_address()
+    with pytest.raises(UnknownAddress):
+        restarted_discovery.get(unregistered_address)
+    assert unregistered_address in restarted_discovery.unknown_addresses
+
+
+class FailingFilter(object):
+    def changes(self):  # pylint: disable=no-self-use
+        raise ValueError('filter not found')
+
+
+@pytest.mark.parametrize('number_of_nodes', [1])
+def test_endpointregistry_filter_reinstall(private_keys, blockchain_services):
+    chain = blockchain_services.blockchain_services[0]
+    my_address = privatekey_to_address(private_keys[0])
+
+    endpointregistry_address = chain.deploy_contract(
+        'EndpointRegistry',
+        get_contract_path('EndpointRegistry.sol'),
+    )
+    discovery_proxy = chain.discovery(endpointregistry_address)
+
+    contract_discovery = ContractDiscovery(my_address, discovery_proxy)
+    contract_discovery.poll_registrations(chain.block_number())
+
+    # the node dropped the filter before the registration
+    contract_discovery.registration_filter = FailingFilter()
+    discovery_proxy.register_endpoint(my_address, '127.0.0.1:44444')
+    contract_discovery.poll_registrations(chain.block_number())
+
+    assert not isinstance(contract_discovery.registration_filter, FailingFilter)
+    assert contract_discovery.nodeid_to_hostport[my_address] == ('127.0.0.1', 44444)
+
+
+@pytest.mark.parametrize('number_of_nodes', [3])
+def test_endpointregistry_bulk_lookup(private_keys, blockchain_services):
+    chain = blockchain_services.blockchain_services[0]
+
+    endpointregistry_address = chain.deploy_contract(
+        'EndpointRegistry',
+        get_contract_path('EndpointRegistry.sol'),
+    )
+
+    addresses = list()
+    for i in range(len(private_keys)):
+        chain = blockchain_services.blockchain_services[i]
+        discovery_proxy = chain.discovery(endpointregistry_address)
+
+        my_address = privatekey_to_address(private_keys[i])
+        discovery_proxy.register_endpoint(my_address, '127.0.0.{}:44444'.format(i + 1))
+        addresses.append(my_address)
+
+    unregistered_address = make_address()
+    endpoints = discovery_proxy.endpoints_by_addresses(addresses + [unregistered_address])
+
+    assert endpoints == {
+        address: '127.0.0.{}:44444'.format(i + 1)
+        for i, address in enumerate(addresses)
+    }
+
+    contract_discovery = ContractDiscovery(addresses[0], discovery_proxy)
+    contract_discovery.preload_endpoints(addresses + [unregistered_address])
+
+    assert contract_discovery.nodeid_to_hostport[addresses[2]] == ('127.0.0.3', 44444)
+    assert unregistered_address in contract_discovery.unknown_addresses
@@ -163,6 +163,11 @@ def test_settlement(raiden_network, settle_timeout, reveal_timeout):
     address0 = alice_app.raiden.address
     address1 = bob_app.raiden.address
 
+    # the settled channel is removed from the routing graph
+    assert not alice_graph.has_channel(address0, address1)
+    assert not bob_graph.has_channel(address1, address0)
+    assert not alice_graph.has_path(address0, address1)
+
     alice_netted_balance = alice_balance + alice_deposit - alice_to_bob_amount
     bob_netted_balance = bob_balance + bob_deposit + alice_to_bob_amount
 
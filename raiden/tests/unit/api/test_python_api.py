@@ -82,7 +82,7 @@ def test_second_manager_address_if_token_registered(raiden_chain, token_addresse
 
     # Recreate the race condition by making sure the non-registering app won't
     # register at all by watching for the TokenAdded blockchain event.
-    app1.raiden.alarm.remove_callback(app1.raiden.poll_blockchain_events)
+    app1.raiden.alarm.remove_callback(app1.raiden.events_ingestion.new_block)
 
     manager_0token = api0.register_token(token_addresses[0])
     # The second node does not register but just confirms token is registered.
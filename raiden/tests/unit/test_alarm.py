@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+import gevent
+from gevent.queue import Queue
+
+from raiden.tasks import (
+    AlarmTask,
+    BLOCKTIME_UPDATE_INTERVAL,
+    MAX_WAIT_TIME,
+    MIN_WAIT_TIME,
+)
+
+
+class Chain(object):
+    def __init__(self, blocktime=None):
+        self.number = 1
+        self.blocktime = blocktime
+        self.block_number_calls = 0
+        self.blocktime_calls = 0
+
+    def block_number(self):
+        self.block_number_calls += 1
+        return self.number
+
+    def estimate_blocktime(self):
+        self.blocktime_calls += 1
+        return self.blocktime
+
+    def new_block_filter(self):  # pylint: disable=no-self-use
+        return None
+
+    def new_heads_subscription(self):  # pylint: disable=no-self-use
+        return None
+
+
+class FailingFilter(object):
+    def changes(self):  # pylint: disable=no-self-use
+        raise ValueError('filter not found')
+
+    def uninstall(self):
+        pass
+
+
+class FilterChain(Chain):
+    def __init__(self):
+        super(FilterChain, self).__init__()
+        self.filters = list()
+
+    def new_block_filter(self):
+        block_filter = FailingFilter()
+        self.filters.append(block_filter)
+        return block_filter
+
+
+class Subscription(object):
+    def __init__(self):
+        self.blocks = Queue()
+        self.closed = False
+
+    def __iter__(self):
+        for block_number in self.blocks:
+            if isinstance(block_number, Exception):
+                raise block_number
+
+            yield block_number
+
+    def close(self):
+        self.closed = True
+
+
+class PushChain(Chain):
+    def __init__(self):
+        super(PushChain, self).__init__()
+        self.subscriptions = list()
+
+    def new_heads_subscription(self):
+        subscription = Subscription()
+        self.subscriptions.append(subscription)
+        return subscription
+
+
+def test_alarm_schedule():
+    alarm = AlarmTask(Chain(blocktime=15))
+    alarm.update_blocktime()
+
+    # never slower than the fixed interval
+    assert alarm.wait_time == MAX_WAIT_TIME
+
+    alarm = AlarmTask(Chain(blocktime=1))
+    alarm.update_blocktime()
+    assert alarm.wait_time == MIN_WAIT_TIME
+
+    # unknown block time
+    alarm = AlarmTask(Chain(blocktime=None))
+    alarm.update_blocktime()
+    assert alarm.wait_time == MAX_WAIT_TIME
+
+
+def test_alarm_slow_callback():
+    chain = Chain()
+    alarm = AlarmTask(chain)
+    alarm.wait_time = 0.01
+
+    notified = list()
+
+    def slow_callback(block_number):
+        notified.append(block_number)
+        gevent.sleep(0.2)
+
+    alarm.register_callback(slow_callback)
+    alarm.start()
+
+    chain.number = 2
+    gevent.sleep(0.05)
+    assert notified == [2]
+
+    # detected while the callback of the previous block is running
+    chain.number = 3
+    gevent.sleep(0.05)
+    assert alarm.last_block_number == 3
+
+    chain.number = 4
+    gevent.sleep(0.3)
+    assert notified == [2, 4]
+
+    alarm.stop_and_wait()
+
+
+def test_alarm_blocktime_update_with_skipped_blocks():
+    chain = Chain()
+    alarm = AlarmTask(chain)
+    alarm.wait_time = 0.01
+    alarm.start()
+    gevent.sleep(0.02)
+    assert chain.blocktime_calls == 1
+
+    # the block that is a multiple of the interval is never seen
+    chain.number = BLOCKTIME_UPDATE_INTERVAL + 5
+    gevent.sleep(0.05)
+    alarm.stop_and_wait()
+
+    assert chain.blocktime_calls == 2
+
+
+def test_alarm_reinstalls_failed_filter():
+    chain = FilterChain()
+    alarm = AlarmTask(chain)
+    alarm.wait_time = 0.01
+    alarm.start()
+
+    chain.number = 2
+    gevent.sleep(0.05)
+    alarm.stop_and_wait()
+
+    assert alarm.last_block_number == 2
+    assert len(chain.filters) >= 2
+
+
+def test_alarm_subscription():
+    chain = PushChain()
+    alarm = AlarmTask(chain)
+    alarm.wait_time = 0.01
+
+    notified = list()
+    alarm.register_callback(notified.append)
+    alarm.start()
+    gevent.sleep(0.05)
+
+    subscription, = chain.subscriptions
+    subscription.blocks.put(2)
+    subscription.blocks.put(3)
+    gevent.sleep(0.05)
+
+    assert notified[-1] == 3
+    assert alarm.last_block_number == 3
+
+    # the node is not polled while it pushes the blocks
+    assert chain.block_number_calls == 1
+
+    alarm.stop_and_wait()
+    assert subscription.closed
+
+
+def test_alarm_subscription_failure():
+    chain = PushChain()
+    alarm = AlarmTask(chain)
+    alarm.wait_time = 0.01
+    alarm.start()
+    gevent.sleep(0.05)
+
+    first, = chain.subscriptions
+    first.blocks.put(ValueError('connection closed'))
+    gevent.sleep(0.05)
+    assert first.closed
+
+    # polled until the next block, which subscribes again
+    chain.number = 2
+    gevent.sleep(0.05)
+    assert alarm.last_block_number == 2
+    assert len(chain.subscriptions) == 2
+
+    calls = chain.block_number_calls
+    gevent.sleep(0.05)
+    assert chain.block_number_calls == calls
+
+    alarm.stop_and_wait()
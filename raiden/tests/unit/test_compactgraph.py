@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from raiden.network import compactgraph
+from raiden.network.compactgraph import CompactGraph
+from raiden.utils import make_address
+
+
+def test_compactgraph_edges():
+    a, b, c, d = [make_address() for _ in range(4)]
+    graph = CompactGraph([(a, b), (b, c), (b, a)])
+
+    assert len(graph) == 3
+    assert graph.number_of_edges() == 2
+    assert graph.has_edge(a, b)
+    assert graph.has_edge(b, a)
+    assert not graph.has_edge(a, c)
+    assert not graph.has_edge(a, d)
+    assert sorted(graph.neighbors(b)) == sorted([a, c])
+
+    graph.add_edge(c, d)
+    graph.remove_edge(a, b)
+
+    assert d in graph
+    assert graph.has_edge(d, c)
+    assert not graph.has_edge(a, b)
+    assert a in graph, 'the nodes must be kept'
+    assert graph.number_of_edges() == 2
+
+    with pytest.raises(ValueError):
+        graph.remove_edge(a, b)
+
+    # re-adding a deleted edge and compacting must not change the graph
+    graph.add_edge(b, a)
+    edges = set(graph.edges())
+    graph.compact()
+    assert set(graph.edges()) == edges
+    assert graph == CompactGraph([(a, b), (b, c), (c, d)])
+
+
+def test_compactgraph_compaction(monkeypatch):
+    monkeypatch.setattr(compactgraph, 'COMPACTION_MINIMUM', 2)
+
+    addresses = [make_address() for _ in range(10)]
+    graph = CompactGraph()
+
+    for first, second in zip(addresses, addresses[1:]):
+        graph.add_edge(first, second)
+
+    assert not graph.inserted, 'the overlay must have been merged'
+    assert graph.paths_of_length(addresses[0], 9) == [addresses]
+
+
+def test_compactgraph_paths():
+    a, b, c, d, e = [make_address() for _ in range(5)]
+    # two shortest paths from a to d, and a longer one through e
+    graph = CompactGraph([(a, b), (a, c), (b, d), (c, d), (a, e), (e, b)])
+
+    shortest_paths = sorted(graph.all_shortest_paths(a, d))
+    assert shortest_paths == sorted([[a, b, d], [a, c, d]])
+
+    assert list(graph.all_shortest_paths(a, a)) == [[a]]
+    assert list(graph.all_shortest_paths(a, make_address())) == []
+
+    assert graph.shortest_path_length(a, d) == 2
+    assert graph.shortest_path_length(e, c) == 2
+    assert graph.shortest_path_length(a, a) == 0
+    assert graph.shortest_path_length(a, make_address()) is None
+
+    isolated = make_address()
+    graph.add_edge(isolated, make_address())
+    assert graph.shortest_path_length(a, isolated) is None
+
+    paths = graph.paths_of_length(a, 2)
+    assert paths in ([[a, b, d]], [[a, c, d]])
+    assert sorted(graph.paths_of_length(a, 1)) == sorted([[a, b], [a, c], [a, e]])
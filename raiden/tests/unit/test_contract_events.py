@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+import pytest
+from pyethapp.rpc_client import JSONRPCClientReplyError
+
+from raiden.blockchain.abi import CONTRACT_MANAGER, CONTRACT_REGISTRY
+from raiden.blockchain.events import block_range, iter_contract_events
+from raiden.blockchain.store import ChainEventStore
+from raiden.utils import make_address
+
+
+class LogsChain(object):
+    """ Serves one log per block for each contract and refuses ranges larger
+    than `max_blocks`.
+    """
+
+    def __init__(self, block_number, max_blocks):
+        self._block_number = block_number
+        self.max_blocks = max_blocks
+        self.queries = list()
+
+    def block_number(self):
+        return self._block_number
+
+    def get_logs(self, contract_address, topics, from_block, to_block):
+        # pylint: disable=unused-argument
+        self.queries.append((from_block, to_block))
+
+        if to_block - from_block + 1 > self.max_blocks:
+            raise JSONRPCClientReplyError('query returned more than 3 results')
+
+        if not isinstance(contract_address, list):
+            contract_address = [contract_address]
+
+        return [
+            {
+                'address': address,
+                'data': '',
+                'topics': [block],
+                'block_number': block,
+            }
+            for block in range(from_block, to_block + 1)
+            for address in contract_address
+        ]
+
+
+def test_block_range():
+    chain = LogsChain(block_number=24, max_blocks=3)
+
+    assert block_range(chain, 'earliest', 'latest') == (0, 24)
+    assert block_range(chain, 10L, 2 ** 64) == (10, 2 ** 64)
+
+
+class Translator(object):
+    def decode_event(self, topics, data):  # pylint: disable=no-self-use,unused-argument
+        return topics[0]
+
+
+def test_iter_contract_events_chunks():
+    address = make_address()
+    chain = LogsChain(block_number=24, max_blocks=3)
+
+    events = iter_contract_events(
+        chain,
+        Translator(),
+        address,
+        None,
+        from_block=0,
+        to_block='latest',
+        chunk_size=10,
+        concurrency=2,
+    )
+
+    assert list(events) == list(range(25))
+    assert (0, 9) in chain.queries
+    assert (20, 24) in chain.queries
+    assert all(
+        to_block - from_block < 10
+        for from_block, to_block in chain.queries
+    )
+
+
+def test_iter_contract_events_errors():
+    address = make_address()
+    chain = LogsChain(block_number=5, max_blocks=0)
+
+    events = iter_contract_events(chain, Translator(), address, None, 0, 5)
+
+    with pytest.raises(JSONRPCClientReplyError):
+        list(events)
+
+
+def test_chain_event_store_sync(monkeypatch):
+    monkeypatch.setattr(CONTRACT_MANAGER, 'get_translator', lambda name: Translator())
+
+    first_address = make_address()
+    second_address = make_address()
+    chain = LogsChain(block_number=10, max_blocks=100)
+    store = ChainEventStore(chain, ':memory:', confirmations=0)
+
+    assert store.get_events(first_address, CONTRACT_REGISTRY, 3, 5) == [3, 4, 5]
+    assert store.synced_block(first_address) == 10
+
+    # the history before the first query is only fetched when it's queried
+    assert chain.queries == [(3, 10)]
+    assert store.get_events(first_address, CONTRACT_REGISTRY, 1, 3) == [1, 2, 3]
+    assert chain.queries[-1] == (1, 2)
+
+    # only the new blocks are fetched
+    chain.queries = list()
+    chain._block_number = 12  # pylint: disable=protected-access
+    assert store.get_events(first_address, CONTRACT_REGISTRY, 9) == [9, 10, 11, 12]
+    assert chain.queries == [(11, 12)]
+
+    # the ranges are limited to the current block
+    assert store.get_events(first_address, CONTRACT_REGISTRY, 12, 100) == [12]
+
+    # the contracts synced up to the same block share the queries
+    store.track(second_address, CONTRACT_REGISTRY)
+    store.sync(12)
+    chain.queries = list()
+    chain._block_number = 15  # pylint: disable=protected-access
+    store.sync(15)
+    assert chain.queries == [(13, 15)]
+    assert store.get_events(second_address, CONTRACT_REGISTRY) == list(range(16))
+    assert store.get_events(first_address, CONTRACT_REGISTRY, 13) == [13, 14, 15]
+
+
+def test_chain_event_store_skips_unconfirmed_blocks(monkeypatch):
+    monkeypatch.setattr(CONTRACT_MANAGER, 'get_translator', lambda name: Translator())
+
+    address = make_address()
+    chain = LogsChain(block_number=10, max_blocks=100)
+    store = ChainEventStore(chain, ':memory:', confirmations=3)
+
+    assert store.get_events(address, CONTRACT_REGISTRY) == list(range(11))
+    assert store.synced_block(address) == 7
+    assert chain.queries == [(0, 7), (8, 10)]
+
+    # the blocks that may be reorganized are fetched again
+    assert store.get_events(address, CONTRACT_REGISTRY, 5) == list(range(5, 11))
+    assert chain.queries[-1] == (8, 10)
+
+    store.sync_all(10)
+    store.sync_greenlet.join()
+    assert store.synced_block(address) == 7
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import gevent
+
+from raiden.blockchain.events import BlockchainEventsIngestion, PyethappEvent
+from raiden.transfer.mediated_transfer.state_change import ContractReceiveSettled
+from raiden.utils import make_address
+
+
+def settled(contract_address, block_number):
+    return PyethappEvent(
+        contract_address,
+        {'_event_type': 'ChannelSettled', 'block_number': block_number},
+        block_number,
+    )
+
+
+class BlockchainEvents(object):
+    def __init__(self):
+        self.followed = set()
+        self.pending = list()
+
+    def poll_all_event_listeners(self):
+        result, self.pending = self.pending, list()
+        return result
+
+    def is_followed(self, pyethapp_event):
+        return pyethapp_event.originating_contract in self.followed
+
+
+def test_ingestion_follows_contracts_while_processing():
+    first_channel = make_address()
+    second_channel = make_address()
+
+    blockchain_events = BlockchainEvents()
+    blockchain_events.followed.add(first_channel)
+
+    state_changes = list()
+
+    def on_statechange(state_change):
+        state_changes.append(state_change)
+        # e.g. a ChannelNew event starts following the channel
+        blockchain_events.followed.add(second_channel)
+
+    ingestion = BlockchainEventsIngestion(blockchain_events, on_statechange)
+    ingestion.start()
+
+    blockchain_events.pending = [
+        settled(make_address(), 1),
+        settled(first_channel, 2),
+        settled(second_channel, 3),
+    ]
+    ingestion.poll()
+
+    assert all(isinstance(state_change, ContractReceiveSettled) for state_change in state_changes)
+    assert [state_change.channel_address for state_change in state_changes] == [
+        first_channel,
+        second_channel,
+    ]
+
+    ingestion.new_block(5)
+    stats = ingestion.stats()
+    assert stats['queued'] == 0
+    assert stats['processed_block'] == 3
+    assert stats['lag_blocks'] == 2
+
+    ingestion.stop()
+
+
+def test_ingestion_new_block_does_not_wait():
+    channel = make_address()
+    blockchain_events = BlockchainEvents()
+    blockchain_events.followed.add(channel)
+
+    processed = list()
+
+    def slow_statechange(state_change):
+        gevent.sleep(0.1)
+        processed.append(state_change)
+
+    ingestion = BlockchainEventsIngestion(blockchain_events, slow_statechange)
+    ingestion.start()
+
+    blockchain_events.pending = [settled(channel, 1), settled(channel, 2)]
+    ingestion.new_block(2)
+    assert not processed
+
+    gevent.sleep(0.05)
+    assert ingestion.stats()['queued'] == 1
+
+    # the queued events are processed before stopping
+    ingestion.stop()
+    assert len(processed) == 2
+
+
+def test_ingestion_survives_bad_events():
+    channel = make_address()
+    blockchain_events = BlockchainEvents()
+    blockchain_events.followed.add(channel)
+
+    processed = list()
+    ingestion = BlockchainEventsIngestion(blockchain_events, processed.append)
+    ingestion.start()
+
+    # not convertible to a state change, and without a block_number argument
+    unknown = PyethappEvent(channel, {}, 7)
+    blockchain_events.pending = [unknown, settled(channel, 8)]
+    ingestion.poll()
+
+    blockchain_events.pending = [settled(channel, 9)]
+    ingestion.poll()
+
+    assert [state_change.block_number for state_change in processed] == [8, 9]
+    assert ingestion.stats()['processed_block'] == 9
+
+    ingestion.stop()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from raiden.network.rpc.client import (
+    GasEstimateCache,
+    estimate_and_transact,
+)
+from raiden.utils import make_address
+
+
+class Function(object):
+    """ Contract function whose cost depends on the length of its argument. """
+
+    def __init__(self, function_name):
+        self.function_name = function_name
+        self.estimates = 0
+        self.transactions = list()
+        self.fail = False
+
+    def estimate_gas(self, data, startgas, gasprice):  # pylint: disable=unused-argument
+        self.estimates += 1
+        return 1000 + len(data)
+
+    def transact(self, data, startgas, gasprice):  # pylint: disable=unused-argument
+        if self.fail:
+            raise ValueError('intrinsic gas too low')
+
+        self.transactions.append(startgas)
+        return '{:064x}'.format(len(self.transactions))
+
+
+class Client(object):
+    """ Holds the `GasEstimateCache` shared by the proxies. """
+    gas_estimates = None
+
+
+class Proxy(object):
+    def __init__(self, client, token_address):
+        self.client = client
+        self.address = make_address()
+        self._token_address = token_address
+        self.startgas = 3141592
+        self.gasprice = 1
+
+    def token_address(self):
+        return self._token_address
+
+
+def test_gas_estimates_are_reused():
+    client = Client()
+    client.gas_estimates = GasEstimateCache(client, max_age=10)
+    close = Function('close')
+
+    token_address = make_address()
+    first = Proxy(client, token_address)
+    second = Proxy(client, token_address)
+
+    estimate_and_transact(first, close, '')
+    estimate_and_transact(second, close, '')
+    assert close.estimates == 1
+    assert close.transactions == [2000, 2000]
+
+    # the cost depends on the token
+    estimate_and_transact(Proxy(client, make_address()), close, '')
+    assert close.estimates == 2
+
+    # a different argument shape has its own estimate
+    estimate_and_transact(first, close, 'x' * 200)
+    assert close.estimates == 3
+    assert close.transactions[-1] == 2400
+
+    # aged out
+    client.gas_estimates.new_block(10)
+    estimate_and_transact(first, close, '')
+    assert close.estimates == 4
+
+    # refreshed after a rejected transaction
+    close.fail = True
+    with pytest.raises(ValueError):
+        estimate_and_transact(first, close, '')
+
+    close.fail = False
+    estimate_and_transact(first, close, '')
+    assert close.estimates == 5
+
+
+def test_gas_estimate_dropped_when_out_of_gas():
+    client = Client()
+    client.gas_estimates = GasEstimateCache(client)
+    withdraw = Function('withdraw')
+    proxy = Proxy(client, make_address())
+
+    transaction_hash = estimate_and_transact(proxy, withdraw, '')
+    client.gas_estimates.new_block(1)
+    assert client.gas_estimates.unverified
+
+    # reported by the TransactionPoller
+    client.gas_estimates.mined(transaction_hash, 2000)
+    assert not client.gas_estimates.unverified
+
+    estimate_and_transact(proxy, withdraw, '')
+    assert withdraw.estimates == 2
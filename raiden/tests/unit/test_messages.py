@@ -4,6 +4,7 @@ import pytest
 
 from raiden.messages import (
     decode,
+    decode_verified,
     Ack,
     Ping,
 )
@@ -137,3 +138,12 @@ def test_refund_transfer_out_of_bounds_values(args):
 def test_direct_transfer_out_of_bounds_values(args):
     with pytest.raises(ValueError):
         make_direct_transfer(**args)
+
+
+def test_decode_verified():
+    ping = Ping(nonce=0)
+    ping.sign(PRIVKEY, ADDRESS)
+    decoded_ping = decode_verified(ping.encode(), ADDRESS)
+    assert isinstance(decoded_ping, Ping)
+    assert decoded_ping.sender == ADDRESS
+    assert decoded_ping.hash == ping.hash
@@ -25,3 +25,21 @@ def test_mock_registry_api_compliance():
     contract_discovery_instance.register(address, '127.0.0.1', 88888)
     assert contract_discovery_instance.nodeid_by_host_port(('127.0.0.1', 88888)) == address
     assert contract_discovery_instance.get(address) == ('127.0.0.1', 88888)
+
+    # the old endpoint is not attributed to the node anymore
+    assert contract_discovery_instance.nodeid_by_host_port(('127.0.0.1', 44444)) is None
+
+
+def test_mock_registry_reused_endpoint():
+    first_address = make_address()
+    second_address = make_address()
+    discovery = Discovery()
+
+    discovery.register(first_address, '127.0.0.1', 44444)
+    discovery.register(second_address, '127.0.0.1', 44444)
+    assert discovery.nodeid_by_host_port(('127.0.0.1', 44444)) == second_address
+
+    # moving the first node must not remove the endpoint of the second
+    discovery.register(first_address, '127.0.0.1', 55555)
+    assert discovery.nodeid_by_host_port(('127.0.0.1', 44444)) == second_address
+    assert discovery.nodeid_by_host_port(('127.0.0.1', 55555)) == first_address
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from raiden.encoding import messages
+from raiden.network.discovery import Discovery
+from raiden.network.protocol import (
+    NotifyingPriorityQueue,
+    PRIORITY_CONTROL,
+    PRIORITY_TRANSFER,
+    PRIORITY_UNLOCK,
+    RaidenProtocol,
+)
+
+
+def test_priority_queue_order():
+    queue = NotifyingPriorityQueue()
+
+    queue.put('transfer1', PRIORITY_TRANSFER)
+    queue.put('secret', PRIORITY_UNLOCK)
+    queue.put('transfer2', PRIORITY_TRANSFER)
+    queue.put('ack', PRIORITY_CONTROL)
+
+    assert queue.is_set()
+    assert len(queue) == 4
+    assert queue.peek(block=False) == 'ack'
+
+    assert [queue.get(block=False) for _ in range(4)] == [
+        'ack',
+        'secret',
+        'transfer1',
+        'transfer2',
+    ]
+    assert not queue.is_set()
+
+
+def test_priority_queue_ignores_queued_duplicates():
+    queue = NotifyingPriorityQueue()
+
+    queue.put('transfer', PRIORITY_TRANSFER)
+    queue.put('transfer', PRIORITY_TRANSFER)
+    assert len(queue) == 1
+
+    assert queue.get(block=False) == 'transfer'
+
+    # once sent the same data may be queued again for a retry
+    queue.put('transfer', PRIORITY_TRANSFER)
+    assert len(queue) == 1
+
+
+def test_priority_queue_sent_event():
+    queue = NotifyingPriorityQueue()
+    assert queue.sent_event('transfer') is None
+
+    queue.put('transfer', PRIORITY_TRANSFER)
+    sent = queue.sent_event('transfer')
+    assert not sent.is_set()
+
+    # dequeued but not written yet, e.g. throttled by the transport
+    queue.get(block=False)
+    assert queue.sent_event('transfer') is sent
+    assert not sent.is_set()
+
+    queue.mark_sent('transfer')
+    assert sent.is_set()
+    assert queue.sent_event('transfer') is None
+
+
+class DummyRaiden(object):
+    address = 'a' * 20
+
+
+class NullTransport(object):
+    def send(self, sender, host_port, bytes_):
+        pass
+
+    def stop(self):
+        pass
+
+
+def test_inbound_queue_load_shedding():
+    protocol = RaidenProtocol(
+        NullTransport(),
+        Discovery(),
+        DummyRaiden(),
+        retry_interval=1,
+        retries_before_backoff=1,
+        nat_keepalive_retries=1,
+        nat_keepalive_timeout=1,
+        nat_invitation_timeout=1,
+        inbound_workers=1,
+        inbound_queue_size=1,
+    )
+    host_port = ('127.0.0.1', 40001)
+
+    # the handler task doesn't run until this greenlet yields
+    for number in range(3):
+        protocol.receive(messages.SECRET + str(number), host_port)
+
+    assert protocol.get_inbound_stats() == {
+        'queued': 1,
+        'capacity': 1,
+        'dropped': 2,
+    }
+
+    # a retry of a queued packet is not counted as a drop
+    protocol.receive(messages.SECRET + '0', host_port)
+    assert protocol.get_inbound_stats()['dropped'] == 2
+
+    protocol.stop_and_wait()
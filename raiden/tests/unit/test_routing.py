@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+import random
+
+from raiden.network import channelgraph
+from raiden.network.channelgraph import DistanceMap, ordered_neighbors
+from raiden.network.compactgraph import CompactGraph
+from raiden.network.routing import (
+    CapacityHints,
+    DEFAULT_SUCCESS_PROBABILITY,
+    RouteReliability,
+    k_shortest_paths,
+)
+from raiden.utils import make_address
+
+
+def hops_heuristic(graph, target):
+    """ Exact hop count to `target`, computed with a BFS. """
+    distances = {target: 0}
+    frontier = [target]
+
+    while frontier:
+        next_frontier = list()
+        for index in frontier:
+            for neighbor in graph.neighbor_indices(index):
+                if neighbor not in distances:
+                    distances[neighbor] = distances[index] + 1
+                    next_frontier.append(neighbor)
+        frontier = next_frontier
+
+    return distances.get
+
+
+def test_capacity_hints():
+    current_time = [0]
+    hints = CapacityHints(refund_ttl=10, time_function=lambda: current_time[0])
+    a, b, target = make_address(), make_address(), make_address()
+
+    assert hints.success_probability(a, b, 10) == DEFAULT_SUCCESS_PROBABILITY
+
+    hints.set_capacity(a, b, 99)
+    assert hints.success_probability(a, b, 100) == 0
+    assert hints.success_probability(a, b, 0) == 1
+    assert hints.success_probability(a, b, 50) == 0.5
+    assert hints.success_probability(b, a, 100) == DEFAULT_SUCCESS_PROBABILITY
+
+    hints.record_refund(b, target, 10)
+    assert hints.refunded(b, target, 10)
+    assert hints.refunded(b, target, 20)
+    assert not hints.refunded(b, target, 5)
+
+    current_time[0] = 11
+    assert not hints.refunded(b, target, 10)
+
+
+def test_route_reliability():
+    current_time = [0]
+    reliability = RouteReliability(half_life=10, time_function=lambda: current_time[0])
+    neighbor, target, other_target = make_address(), make_address(), make_address()
+
+    assert reliability.success_rate(neighbor, target) == 1
+
+    reliability.record_refund(neighbor, target)
+    reliability.record_timeout(neighbor, target)
+    assert reliability.success_rate(neighbor, target) == 1 / 3.
+
+    # the aggregate is used for targets without history
+    reliability.record_success(neighbor, other_target)
+    assert reliability.success_rate(neighbor, other_target) == 1
+    assert reliability.success_rate(neighbor, make_address()) == 2 / 4.
+
+    # the failures are forgotten over time
+    current_time[0] = 20
+    assert reliability.success_rate(neighbor, target) == 1 / 1.5
+
+    stats = reliability.get_stats()
+    assert len(stats) == 3
+    assert {entry['target'] for entry in stats} == {target, other_target, None}
+
+
+def test_k_shortest_paths():
+    # 0 - 1 - 2 - 5
+    #  \- 3 - 4 -/
+    graph = CompactGraph([(0, 1), (1, 2), (2, 5), (0, 3), (3, 4), (4, 5), (1, 4)])
+    source = graph.node_to_index[0]
+    target = graph.node_to_index[5]
+    heuristic = hops_heuristic(graph, target)
+
+    def path_nodes(paths):
+        return [
+            [graph.index_to_node[index] for index in path]
+            for _, path in paths
+        ]
+
+    def hops(from_index, to_index):  # pylint: disable=unused-argument
+        return 1
+
+    paths = k_shortest_paths(graph, source, target, hops, heuristic, 10)
+    costs = [cost for cost, _ in paths]
+
+    assert costs == sorted(costs)
+    assert len(paths) == 4
+    assert costs[0] == 3
+    assert sorted(path_nodes(paths)[:3]) == [[0, 1, 2, 5], [0, 1, 4, 5], [0, 3, 4, 5]]
+    assert path_nodes(paths)[3] == [0, 3, 4, 1, 2, 5]
+
+    # the channel 4 - 5 doesn't have enough capacity
+    def without_edge(from_index, to_index):
+        nodes = (graph.index_to_node[from_index], graph.index_to_node[to_index])
+        if nodes == (4, 5):
+            return None
+        return 1
+
+    paths = k_shortest_paths(graph, source, target, without_edge, heuristic, 10)
+    assert sorted(path_nodes(paths)) == [[0, 1, 2, 5], [0, 3, 4, 1, 2, 5]]
+
+
+def test_distance_map_updates():
+    rng = random.Random(0)
+    nodes = range(30)
+    graph = CompactGraph(
+        (rng.choice(nodes), rng.choice(nodes))
+        for _ in range(40)
+    )
+    # nodes without edges
+    for node in nodes:
+        graph.intern(node)
+
+    maps = {target: DistanceMap(graph, target) for target in nodes}
+    kept = 0
+
+    for _ in range(300):
+        # leave the maps partially expanded
+        for distances in maps.values():
+            distances.get(rng.choice(nodes))
+
+        first, second = rng.sample(nodes, 2)
+        first_index = graph.node_to_index[first]
+        second_index = graph.node_to_index[second]
+
+        if graph.has_edge(first, second):
+            graph.remove_edge(first, second)
+            is_valid = lambda distances: distances.edge_removed(first_index, second_index)
+        else:
+            graph.add_edge(first, second)
+            is_valid = lambda distances: distances.edge_added(first_index, second_index)
+
+        for target, distances in maps.items():
+            if not is_valid(distances):
+                maps[target] = DistanceMap(graph, target)
+                continue
+
+            kept += 1
+            expected = hops_heuristic(graph, graph.node_to_index[target])
+            for node in nodes:
+                assert distances.get(node) == expected(graph.node_to_index[node])
+
+    assert kept > 0
+
+
+def test_ordered_neighbors_search(monkeypatch):
+    rng = random.Random(0)
+    nodes = range(100)
+    graph = CompactGraph(
+        (rng.choice(nodes), rng.choice(nodes))
+        for _ in range(200)
+    )
+    hub = max(graph.nodes(), key=lambda node: len(graph.neighbors(node)))
+
+    for target in nodes:
+        per_neighbor = ordered_neighbors(graph, hub, target)
+
+        monkeypatch.setattr(channelgraph, 'HUB_NEIGHBORS', 0)
+        single_bfs = ordered_neighbors(graph, hub, target)
+        monkeypatch.undo()
+
+        assert sorted(per_neighbor) == sorted(single_bfs)
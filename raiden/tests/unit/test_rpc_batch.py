@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+import json
+
+import gevent
+import pytest
+
+from raiden.network.rpc.client import JSONRPCBatcher, batch_calls
+
+
+def request(identifier, method='eth_call'):
+    return json.dumps({
+        'jsonrpc': '2.0',
+        'id': identifier,
+        'method': method,
+        'params': [identifier],
+    })
+
+
+class Node(object):
+    """ Answers each request with its parameter, the batch replies are
+    reversed since the order is not guaranteed.
+    """
+
+    def __init__(self, supports_batch=True, error_list=False):
+        self.supports_batch = supports_batch
+        self.error_list = error_list
+        self.posts = list()
+
+    def reply(self, data):
+        return {'jsonrpc': '2.0', 'id': data['id'], 'result': data['params'][0]}
+
+    def post(self, message):
+        self.posts.append(message)
+        data = json.loads(message)
+
+        if isinstance(data, list):
+            if not self.supports_batch:
+                error = {'jsonrpc': '2.0', 'id': None, 'error': 'no batch'}
+
+                if self.error_list:
+                    return json.dumps([error for _ in data])
+                return json.dumps(error)
+
+            return json.dumps([self.reply(item) for item in reversed(data)])
+
+        return json.dumps(self.reply(data))
+
+
+def test_batcher_combines_concurrent_requests():
+    node = Node()
+    batcher = JSONRPCBatcher(node.post)
+
+    replies = batch_calls(*[
+        lambda identifier=identifier: json.loads(batcher.send(request(identifier)))
+        for identifier in range(5)
+    ])
+
+    assert [reply['result'] for reply in replies] == list(range(5))
+    assert len(node.posts) == 1
+
+    # sequential requests are sent alone
+    reply = json.loads(batcher.send(request(7)))
+    assert reply['result'] == 7
+    assert json.loads(node.posts[-1]) == json.loads(request(7))
+
+
+@pytest.mark.parametrize('error_list', [False, True])
+def test_batcher_without_batch_support(error_list):
+    node = Node(supports_batch=False, error_list=error_list)
+    batcher = JSONRPCBatcher(node.post)
+
+    greenlets = [
+        gevent.spawn(batcher.send, request(identifier))
+        for identifier in range(3)
+    ]
+    gevent.joinall(greenlets)
+
+    assert [json.loads(greenlet.get())['result'] for greenlet in greenlets] == [0, 1, 2]
+    assert not batcher.supported
+
+
+def test_batcher_sends_slow_methods_alone():
+    node = Node()
+    batcher = JSONRPCBatcher(node.post)
+
+    batch_calls(
+        lambda: batcher.send(request(1)),
+        lambda: batcher.send(request(2, method='eth_getLogs')),
+        lambda: batcher.send(request(3)),
+    )
+
+    assert json.loads(node.posts[0]) == json.loads(request(2, method='eth_getLogs'))
+    assert len(json.loads(node.posts[1])) == 2
+
+
+def test_batcher_failure_wakes_the_callers(monkeypatch):
+    batcher = JSONRPCBatcher(Node().post)
+
+    def fail(pending):  # pylint: disable=unused-argument
+        raise KeyError()
+
+    monkeypatch.setattr(batcher, 'send_batch', fail)
+
+    with pytest.raises(KeyError):
+        batch_calls(
+            lambda: batcher.send(request(1)),
+            lambda: batcher.send(request(2)),
+        )
+
+
+def test_batch_calls_raises_first_error():
+    def fail():
+        raise ValueError()
+
+    assert batch_calls(lambda: 1, lambda: 2) == [1, 2]
+
+    with pytest.raises(ValueError):
+        batch_calls(lambda: 1, fail)
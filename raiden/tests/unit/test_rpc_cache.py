@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from raiden.network.rpc.client import (
+    CACHE_IMMUTABLE,
+    CACHE_PER_BLOCK,
+    ContractCallCache,
+)
+from raiden.utils import make_address
+
+
+class Reads(object):
+    def __init__(self):
+        self.count = 0
+
+    def read(self):
+        self.count += 1
+        return self.count
+
+
+def test_contract_call_cache(tmpdir):
+    address = make_address()
+    reads = Reads()
+    cache = ContractCallCache()
+    cache.new_block(1)
+
+    assert cache.call(CACHE_IMMUTABLE, (address, 'settleTimeout'), reads.read) == 1
+    assert cache.call(CACHE_IMMUTABLE, (address, 'settleTimeout'), reads.read) == 1
+    assert cache.call(CACHE_PER_BLOCK, (address, 'closed'), reads.read) == 2
+    assert cache.call(CACHE_PER_BLOCK, (address, 'closed'), reads.read) == 2
+
+    # only the per block values are dropped
+    cache.new_block(2)
+    assert cache.call(CACHE_IMMUTABLE, (address, 'settleTimeout'), reads.read) == 1
+    assert cache.call(CACHE_PER_BLOCK, (address, 'closed'), reads.read) == 3
+
+    cache.invalidate(address)
+    assert cache.call(CACHE_PER_BLOCK, (address, 'closed'), reads.read) == 4
+
+    assert cache.stats() == {
+        CACHE_IMMUTABLE: {'hits': 2, 'misses': 1},
+        CACHE_PER_BLOCK: {'hits': 1, 'misses': 3},
+    }
+
+    filepath = str(tmpdir.join('rpc_cache.pickle'))
+    cache.save(filepath)
+
+    restored = ContractCallCache()
+    restored.load(filepath)
+    assert restored.call(CACHE_IMMUTABLE, (address, 'settleTimeout'), reads.read) == 1
+    assert restored.call(CACHE_PER_BLOCK, (address, 'closed'), reads.read) == 5
+
+
+def test_contract_call_cache_drops_stale_reads():
+    address = make_address()
+    cache = ContractCallCache()
+    cache.new_block(1)
+
+    def read_across_blocks():
+        # the node answers after a new block was mined
+        cache.new_block(2)
+        return 'block 1 value'
+
+    key = (address, 'closed')
+    assert cache.call(CACHE_PER_BLOCK, key, read_across_blocks) == 'block 1 value'
+    assert cache.call(CACHE_PER_BLOCK, key, lambda: 'block 2 value') == 'block 2 value'
+
+
+def test_contract_call_cache_skips_failed_immutable_reads():
+    address = make_address()
+    reads = Reads()
+    cache = ContractCallCache()
+
+    # the address has no code yet
+    key = (address, 'settleTimeout')
+    assert cache.call(CACHE_IMMUTABLE, key, lambda: '') == ''
+    assert cache.call(CACHE_IMMUTABLE, key, reads.read) == 1
+
+    unchecked = make_address()
+    cache.unchecked.add(unchecked)
+    assert cache.call(CACHE_IMMUTABLE, (unchecked, 'settleTimeout'), reads.read) == 2
+    assert cache.call(CACHE_IMMUTABLE, (unchecked, 'settleTimeout'), reads.read) == 3
+
+    cache.unchecked.discard(unchecked)
+    assert cache.call(CACHE_IMMUTABLE, (unchecked, 'settleTimeout'), reads.read) == 4
+    assert cache.call(CACHE_IMMUTABLE, (unchecked, 'settleTimeout'), reads.read) == 4
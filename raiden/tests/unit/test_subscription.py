@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import json
+import struct
+
+import pytest
+from gevent.event import Event
+from gevent.server import StreamServer
+
+from raiden.exceptions import EthNodeCommunicationError
+from raiden.network.rpc.subscription import (
+    NewHeadsSubscription,
+    OPCODE_CLOSE,
+    OPCODE_PING,
+    OPCODE_PONG,
+    OPCODE_TEXT,
+    accept_key,
+    encode_frame,
+    mask_payload,
+)
+
+
+def read_frame(stream):
+    """ Read a frame sent by the client, which must be masked. """
+    first, second = struct.unpack('BB', stream.read(2))
+    assert second & 0x80
+
+    length = second & 0x7f
+    if length == 126:
+        length, = struct.unpack('>H', stream.read(2))
+
+    masking_key = stream.read(4)
+    return first & 0x0f, mask_payload(masking_key, stream.read(length))
+
+
+def node_handler(notifications, received, done):
+    """ Fake node that accepts one subscription and pushes `notifications`. """
+
+    def handle(connection, address):  # pylint: disable=unused-argument
+        stream = connection.makefile('rb')
+
+        headers = dict()
+        line = stream.readline()
+        while line.strip():
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+            line = stream.readline()
+
+        connection.sendall(
+            'HTTP/1.1 101 Switching Protocols\r\n'
+            'Upgrade: websocket\r\n'
+            'Connection: Upgrade\r\n'
+            'Sec-WebSocket-Accept: {}\r\n'
+            '\r\n'.format(accept_key(headers['sec-websocket-key']))
+        )
+
+        opcode, payload = read_frame(stream)
+        assert opcode == OPCODE_TEXT
+        request = json.loads(payload)
+        reply = {'jsonrpc': '2.0', 'id': request['id'], 'result': '0xcd0c'}
+        connection.sendall(encode_frame(OPCODE_TEXT, json.dumps(reply), mask=False))
+
+        connection.sendall(encode_frame(OPCODE_PING, 'ping', mask=False))
+        received.append(read_frame(stream))
+
+        for notification in notifications:
+            connection.sendall(encode_frame(OPCODE_TEXT, notification, mask=False))
+
+        connection.sendall(encode_frame(OPCODE_CLOSE, '', mask=False))
+        received.append(read_frame(stream))
+        done.set()
+
+    return handle
+
+
+def notification(subscription_id, block_number):
+    message = {
+        'jsonrpc': '2.0',
+        'method': 'eth_subscription',
+        'params': {
+            'subscription': subscription_id,
+            'result': {'number': hex(block_number), 'extraData': '0x' + '00' * 200},
+        },
+    }
+    return json.dumps(message)
+
+
+def test_new_heads_subscription():
+    notifications = [
+        notification('0xcd0c', 10),
+        notification('0xffff', 99),
+        notification('0xcd0c', 11),
+    ]
+    received = list()
+    done = Event()
+
+    server = StreamServer(('127.0.0.1', 0), node_handler(notifications, received, done))
+    server.start()
+
+    subscription = NewHeadsSubscription('ws://127.0.0.1:{}'.format(server.server_port))
+    assert subscription.subscription_id == '0xcd0c'
+
+    blocks = list()
+    with pytest.raises(EthNodeCommunicationError):
+        for block_number in subscription:
+            blocks.append(block_number)
+
+    subscription.close()
+    assert done.wait(timeout=1)
+    server.stop()
+
+    # the notifications of other subscriptions are ignored
+    assert blocks == [10, 11]
+    assert received == [(OPCODE_PONG, 'ping'), (OPCODE_CLOSE, '')]
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+import gevent
+import pytest
+from ethereum.exceptions import InvalidTransaction
+
+from raiden.network.rpc.client import (
+    GasEstimateCache,
+    JSONRPCPollTimeoutException,
+    TransactionPoller,
+    TransactionThrew,
+    patch_send_transaction,
+)
+
+# Gas sent with the transactions of the `Node`
+STARTGAS = 100000
+
+
+class Node(object):
+    """ Mines the transactions in `to_mine` on the next block. """
+
+    def __init__(self):
+        self.number = 1
+        self.transactions = dict()
+        self.to_mine = list()
+        self.gas_used = dict()
+        self.calls = list()
+
+    def mine(self):
+        self.number += 1
+
+        for transaction_hash in self.to_mine:
+            self.transactions[transaction_hash] = self.number
+        self.to_mine = list()
+
+    def blocknumber(self):
+        return self.number
+
+    def call(self, method, transaction_hash):
+        self.calls.append((self.number, method))
+        transaction_hash = transaction_hash[2:].decode('hex')
+
+        if transaction_hash not in self.transactions:
+            return None
+
+        block_number = self.transactions[transaction_hash]
+
+        if method == 'eth_getTransactionReceipt':
+            if block_number is None:
+                return None
+
+            return {
+                'blockNumber': hex(block_number),
+                'gasUsed': hex(self.gas_used.get(transaction_hash, STARTGAS // 2)),
+            }
+
+        return {
+            'blockNumber': hex(block_number) if block_number else None,
+            'gas': hex(STARTGAS),
+        }
+
+    def submit(self, transaction_hash):
+        self.transactions[transaction_hash] = None
+        self.to_mine.append(transaction_hash)
+
+
+def transaction_hash(identifier):
+    return chr(identifier) * 32
+
+
+def test_poller_waits_concurrently():
+    node = Node()
+    poller = TransactionPoller(node, interval=0.01)
+
+    hashes = [transaction_hash(identifier) for identifier in range(5)]
+    for hash_ in hashes:
+        node.submit(hash_)
+
+    waits = [gevent.spawn(poller.poll, hash_, timeout=1) for hash_ in hashes]
+    gevent.sleep(0.05)
+    assert not any(wait.ready() for wait in waits)
+
+    node.mine()
+    gevent.joinall(waits, raise_error=True)
+
+    # pending transactions are only checked once per block
+    lookups = [call for call in node.calls if call[1] == 'eth_getTransactionByHash']
+    assert len(lookups) == 10
+    assert not poller.pending
+
+
+def test_poller_errors():
+    node = Node()
+    poller = TransactionPoller(node, interval=0.01)
+
+    node.submit(transaction_hash(1))
+    with pytest.raises(JSONRPCPollTimeoutException):
+        poller.poll(transaction_hash(1), timeout=0.05)
+    assert not poller.pending
+
+    # the transaction was dropped by the node
+    dropped = gevent.spawn(poller.poll, transaction_hash(1), timeout=1)
+    gevent.sleep(0.05)
+    del node.transactions[transaction_hash(1)]
+    node.number += 1
+
+    with pytest.raises(InvalidTransaction):
+        dropped.get()
+
+
+def test_poller_fails_out_of_gas_transactions():
+    node = Node()
+    node.gas_estimates = GasEstimateCache(node)
+    node.gas_estimates.estimates['close'] = (STARTGAS // 2, 0)
+    node.gas_estimates.sent(transaction_hash(1).encode('hex'), 'close', STARTGAS)
+    poller = TransactionPoller(node, interval=0.01)
+
+    node.submit(transaction_hash(1))
+    node.gas_used[transaction_hash(1)] = STARTGAS
+    node.mine()
+
+    with pytest.raises(TransactionThrew):
+        poller.poll(transaction_hash(1), timeout=1)
+
+    assert 'close' not in node.gas_estimates.estimates
+    assert not node.gas_estimates.unverified
+
+
+def test_poller_timeout_keeps_other_waiters():
+    node = Node()
+    poller = TransactionPoller(node, interval=0.01)
+    node.submit(transaction_hash(1))
+
+    patient = gevent.spawn(poller.poll, transaction_hash(1), timeout=1)
+    with pytest.raises(JSONRPCPollTimeoutException):
+        poller.poll(transaction_hash(1), timeout=0.05)
+
+    node.mine()
+    patient.get()
+
+
+class NonceClient(object):
+    """ Node without `eth_nonce` whose pending count lags behind the sent
+    transactions.
+    """
+
+    sender = 'a' * 20
+    privkey = 'k' * 32
+
+    def __init__(self):
+        self.remote_nonce = 0
+        self.reject = False
+        self.reject_delay = 0
+
+    def call(self, method, *args):  # pylint: disable=unused-argument
+        if method == 'eth_nonce':
+            raise ValueError('method not found')
+
+        if method == 'eth_getTransactionCount':
+            return hex(self.remote_nonce)
+
+        if self.reject:
+            self.reject = False
+            gevent.sleep(self.reject_delay)
+            raise ValueError('rejected')
+
+        return '0x' + '00' * 32
+
+
+def patch_transaction(monkeypatch):
+    """ Return the nonce and recipient of the transactions sent. """
+    sent = list()
+
+    class Transaction(object):
+        def __init__(self, nonce, gasprice, startgas, to, *args):
+            # pylint: disable=unused-argument
+            sent.append((nonce, to))
+
+        def sign(self, privkey):
+            pass
+
+    monkeypatch.setattr('raiden.network.rpc.client.Transaction', Transaction)
+    monkeypatch.setattr('raiden.network.rpc.client.rlp.encode', lambda tx: 'tx')
+
+    return sent
+
+
+def test_nonce_released_after_rejection(monkeypatch):
+    client = NonceClient()
+    sent = patch_transaction(monkeypatch)
+    patch_send_transaction(client)
+
+    client.send_transaction(client.sender, 'b' * 20)
+    client.send_transaction(client.sender, 'b' * 20)
+
+    client.reject = True
+    with pytest.raises(ValueError):
+        client.send_transaction(client.sender, 'b' * 20)
+
+    # the remote count doesn't include the transactions in flight yet
+    client.send_transaction(client.sender, 'b' * 20)
+    client.send_transaction(client.sender, 'b' * 20)
+
+    assert [nonce for nonce, _ in sent] == [0, 1, 2, 2, 3]
+
+
+def test_nonce_gap_filled_after_rejection(monkeypatch):
+    client = NonceClient()
+    sent = patch_transaction(monkeypatch)
+    patch_send_transaction(client)
+
+    client.send_transaction(client.sender, 'b' * 20)
+
+    # the transaction with nonce 2 is sent before nonce 1 is rejected
+    client.reject = True
+    client.reject_delay = 0.01
+    rejected = gevent.spawn(client.send_transaction, client.sender, 'b' * 20)
+    gevent.sleep(0)
+    client.send_transaction(client.sender, 'b' * 20)
+
+    with pytest.raises(ValueError):
+        rejected.get()
+    gevent.sleep(0)
+
+    assert sent == [
+        (0, 'b' * 20),
+        (1, 'b' * 20),
+        (2, 'b' * 20),
+        (1, client.sender),
+    ]
+    assert not client.released_nonces
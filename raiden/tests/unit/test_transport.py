@@ -1,5 +1,34 @@
 # -*- coding: utf-8 -*-
-from raiden.network.transport import TokenBucket
+import socket
+
+import gevent
+import gevent.socket
+
+from raiden.messages import Ping
+from raiden.network.reuseport import ReusePortUDPTransport
+from raiden.network.transport import (
+    BatchedUDPTransport,
+    CongestionControl,
+    FRAME_HEADER,
+    TCPTransport,
+    TCP_MAX_FRAME_SIZE,
+    TokenBucket,
+)
+from raiden.utils import make_privkey_address
+
+
+class RecordingProtocol(object):
+    """ Records the packets handed over by a transport. """
+    raiden = None
+
+    def __init__(self):
+        self.packets = list()
+
+    def receive(self, data, host_port=None, sender=None):
+        self.packets.append((data, host_port, sender))
+
+    def received_data(self):
+        return [data for data, _, _ in self.packets]
 
 
 def test_token_bucket():
@@ -21,3 +50,167 @@ def test_token_bucket():
 
     for num in range(1, 9):
         assert num * token_refill == bucket.consume(1)
+
+
+def test_congestion_control_per_peer():
+    time = lambda: 1
+
+    policy = CongestionControl(
+        capacity=1,
+        fill_rate=2,
+        min_fill_rate=1,
+        max_fill_rate=4,
+        global_capacity=100,
+        global_fill_rate=100,
+        time_function=time,
+    )
+
+    slow_peer = ('127.0.0.1', 1)
+    fast_peer = ('127.0.0.1', 2)
+
+    assert policy.consume(1, slow_peer) == 0
+    assert policy.consume(1, fast_peer) == 0
+
+    # the slow peer's debt must not throttle the fast peer
+    assert policy.consume(1, slow_peer) == 1. / 2
+    assert policy.consume(1, slow_peer) == 2. / 2
+
+    for _ in range(10):
+        policy.on_ack(fast_peer)
+        policy.on_loss(slow_peer)
+
+    assert policy.get_fill_rate(fast_peer) == 4
+    assert policy.get_fill_rate(slow_peer) == 1
+
+    assert policy.consume(1, fast_peer) == 1. / 4
+    assert policy.consume(1, slow_peer) == 3. / 1
+
+
+def test_congestion_control_global_cap():
+    time = lambda: 1
+
+    policy = CongestionControl(
+        capacity=10,
+        fill_rate=10,
+        global_capacity=2,
+        global_fill_rate=2,
+        time_function=time,
+    )
+
+    assert policy.consume(1, ('127.0.0.1', 1)) == 0
+    assert policy.consume(1, ('127.0.0.1', 2)) == 0
+    assert policy.consume(1, ('127.0.0.1', 3)) == 1. / 2
+
+
+def test_batched_udp_transport():
+    protocol = RecordingProtocol()
+    receiver = BatchedUDPTransport('127.0.0.1', 0, protocol=protocol)
+    sender = BatchedUDPTransport('127.0.0.1', 0, protocol=RecordingProtocol())
+
+    sent = ['packet{}'.format(number) for number in range(10)]
+    for data in sent:
+        sender.send(None, (receiver.host, receiver.port), data)
+
+    with gevent.Timeout(5):
+        while len(protocol.packets) < len(sent):
+            gevent.sleep(0.01)
+
+    assert protocol.received_data() == sent
+    assert all(
+        host_port == (sender.host, sender.port)
+        for _, host_port, _ in protocol.packets
+    )
+
+    sender.stop()
+    receiver.stop()
+
+
+def test_reuseport_transport_forwards_validated_packets():
+    privkey, address = make_privkey_address()
+    ping = Ping(nonce=0)
+    ping.sign(privkey, address)
+
+    protocol = RecordingProtocol()
+    transport = ReusePortUDPTransport('127.0.0.1', 0, protocol=protocol, workers=2)
+
+    # use multiple source ports, the kernel distributes the packets by endpoint
+    senders = [socket.socket(socket.AF_INET, socket.SOCK_DGRAM) for _ in range(10)]
+    for sock in senders:
+        sock.sendto(ping.encode(), (transport.host, transport.port))
+        sock.sendto('invalid', (transport.host, transport.port))
+
+    def pings():
+        return [
+            sender
+            for data, _, sender in protocol.packets
+            if data == ping.encode()
+        ]
+
+    with gevent.Timeout(10):
+        while len(pings()) < len(senders):
+            gevent.sleep(0.01)
+
+    # invalid packets are dropped by the workers
+    assert all(data == ping.encode() for data in protocol.received_data())
+
+    # the main process doesn't receive packets, all of them were validated
+    assert all(sender == address for sender in pings())
+
+    transport.stop()
+
+
+def test_reuseport_transport_detects_exited_workers(monkeypatch):
+    monkeypatch.setattr('raiden.network.reuseport.WORKER_CHECK_INTERVAL', 0.01)
+    transport = ReusePortUDPTransport('127.0.0.1', 0, workers=1)
+
+    for process in transport.processes:
+        process.terminate()
+        process.join()
+
+    with gevent.Timeout(5):
+        transport.forward_greenlet.join()
+
+    assert not transport.check_workers()
+    assert len(transport.exited) == 1
+
+    transport.stop()
+
+
+def test_tcp_transport_reconnects():
+    # reserve a port and close it, so the first connection attempts fail
+    probe = TCPTransport('127.0.0.1', 0, protocol=RecordingProtocol())
+    host_port = (probe.host, probe.port)
+    probe.stop()
+
+    sender = TCPTransport('127.0.0.1', 0, protocol=RecordingProtocol())
+    sent = ['packet{}'.format(number) for number in range(10)]
+    for data in sent:
+        sender.send(None, host_port, data)
+
+    protocol = RecordingProtocol()
+    receiver = TCPTransport(host_port[0], host_port[1], protocol=protocol)
+
+    with gevent.Timeout(10):
+        while len(protocol.packets) < len(sent):
+            gevent.sleep(0.01)
+
+    assert protocol.received_data() == sent
+
+    sender.stop()
+    receiver.stop()
+
+
+def test_tcp_transport_rejects_large_frames():
+    protocol = RecordingProtocol()
+    receiver = TCPTransport('127.0.0.1', 0, protocol=protocol)
+
+    sock = gevent.socket.create_connection((receiver.host, receiver.port))
+    sock.sendall(FRAME_HEADER.pack(TCP_MAX_FRAME_SIZE + 1))
+
+    # the connection is closed without reading the body
+    with gevent.Timeout(5):
+        assert sock.recv(1) == ''
+    assert not protocol.packets
+
+    sock.close()
+    receiver.stop()
@@ -0,0 +1,159 @@
+# -*- coding: utf8 -*-
+# pylint: disable=invalid-name,too-few-public-methods
+import os
+
+from raiden.transfer.architecture import StateManager
+from raiden.transfer.state import RoutesState
+from raiden.transfer.mediated_transfer import multipath
+from raiden.transfer.mediated_transfer.state import MultipathInitiatorState
+from raiden.transfer.mediated_transfer.state_change import (
+    ActionInitMultipathInitiator,
+    ReceiveSecretRequest,
+    ReceiveSecretReveal,
+    ReceiveTransferRefund,
+)
+from raiden.transfer.events import (
+    EventTransferSentFailed,
+    EventTransferSentSuccess,
+)
+from raiden.transfer.mediated_transfer.events import (
+    EventUnlockFailed,
+    SendMediatedTransfer,
+    SendRevealSecret,
+)
+from . import factories
+
+
+class RandomGenerator(object):
+    def __next__(self):  # pylint: disable=no-self-use
+        return os.urandom(32)
+
+    next = __next__
+
+
+def make_multipath_manager(routes, amount, target, identifier=1):
+    payment = factories.make_transfer(
+        amount,
+        initiator=factories.ADDR,
+        target=target,
+        identifier=identifier,
+        secret=None,
+        hashlock=None,
+        expiration=None,
+    )
+
+    init_state_change = ActionInitMultipathInitiator(
+        factories.ADDR,
+        payment,
+        [
+            (part_amount, RoutesState([route]))
+            for route, part_amount in multipath.split_amount(routes, amount)
+        ],
+        RandomGenerator(),
+        1,
+    )
+
+    state_manager = StateManager(multipath.state_transition, None)
+    events = state_manager.dispatch(init_state_change)
+
+    return state_manager, events
+
+
+def secret_request(part, identifier=1):
+    return ReceiveSecretRequest(
+        identifier,
+        part.transfer.amount,
+        part.transfer.hashlock,
+        part.transfer.target,
+    )
+
+
+def test_split_amount():
+    routes = [
+        factories.make_route(factories.HOP1, available_balance=10),
+        factories.make_route(factories.HOP2, available_balance=30),
+        factories.make_route(factories.HOP3, available_balance=20),
+    ]
+
+    parts = multipath.split_amount(routes, 45)
+    assert [(route.node_address, amount) for route, amount in parts] == [
+        (factories.HOP2, 30),
+        (factories.HOP3, 15),
+    ]
+
+    assert multipath.split_amount(routes, 61) == list()
+    assert len(multipath.split_amount(routes, 60, max_parts=2)) == 0
+
+
+def test_multipath_reveals_after_all_requests():
+    target = factories.HOP6
+    routes = [
+        factories.make_route(factories.HOP1, available_balance=10),
+        factories.make_route(factories.HOP2, available_balance=10),
+    ]
+
+    state_manager, events = make_multipath_manager(routes, 15, target)
+    state = state_manager.current_state
+
+    assert isinstance(state, MultipathInitiatorState)
+    sent = [event for event in events if isinstance(event, SendMediatedTransfer)]
+    assert sorted(event.amount for event in sent) == [5, 10]
+    assert sent[0].identifier == sent[1].identifier
+    assert sent[0].hashlock != sent[1].hashlock
+
+    first_part, second_part = state.parts
+
+    events = state_manager.dispatch(secret_request(first_part))
+    assert not any(isinstance(event, SendRevealSecret) for event in events)
+
+    # retransmissions of the same request must not reveal the secrets
+    events = state_manager.dispatch(secret_request(first_part))
+    assert not any(isinstance(event, SendRevealSecret) for event in events)
+
+    events = state_manager.dispatch(secret_request(second_part))
+    reveals = [event for event in events if isinstance(event, SendRevealSecret)]
+    assert sorted(reveal.secret for reveal in reveals) == sorted([
+        first_part.transfer.secret,
+        second_part.transfer.secret,
+    ])
+
+    events = state_manager.dispatch(
+        ReceiveSecretReveal(first_part.transfer.secret, first_part.route.node_address),
+    )
+    assert not any(isinstance(event, EventTransferSentSuccess) for event in events)
+    assert state_manager.current_state is not None
+
+    events = state_manager.dispatch(
+        ReceiveSecretReveal(second_part.transfer.secret, second_part.route.node_address),
+    )
+    assert any(isinstance(event, EventTransferSentSuccess) for event in events)
+    assert state_manager.current_state is None
+
+
+def test_multipath_part_failure_fails_payment():
+    target = factories.HOP6
+    routes = [
+        factories.make_route(factories.HOP1, available_balance=10),
+        factories.make_route(factories.HOP2, available_balance=10),
+    ]
+
+    state_manager, _ = make_multipath_manager(routes, 15, target)
+    first_part, second_part = state_manager.current_state.parts
+
+    state_manager.dispatch(secret_request(first_part))
+
+    # the second part has no other route
+    refund = ReceiveTransferRefund(
+        second_part.route.node_address,
+        second_part.transfer,
+    )
+    events = state_manager.dispatch(refund)
+
+    assert state_manager.current_state is None
+    assert not any(isinstance(event, SendRevealSecret) for event in events)
+
+    failed = [event for event in events if isinstance(event, EventTransferSentFailed)]
+    assert len(failed) == 1
+
+    unlock_failed = [event for event in events if isinstance(event, EventUnlockFailed)]
+    assert first_part.transfer.hashlock in [event.hashlock for event in unlock_failed]
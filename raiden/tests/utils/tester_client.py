@@ -13,6 +13,7 @@ from raiden import messages
 from raiden.exceptions import UnknownAddress
 from raiden.constants import NETTINGCHANNEL_SETTLE_TIMEOUT_MIN, DISCOVERY_REGISTRATION_GAS
 from raiden.utils import (
+    decode_endpoints,
     get_contract_path,
     isaddress,
     pex,
@@ -30,6 +31,7 @@ from raiden.blockchain.abi import (
     EVENT_TOKEN_ADDED,
 )
 from raiden.exceptions import SamePeerAddress
+from raiden.network.rpc.client import ContractCallCache, GasEstimateCache
 
 log = slogging.getLogger(__name__)  # pylint: disable=invalid-name
 FILTER_ID_GENERATOR = count()
@@ -176,13 +178,29 @@ class FilterTesterMock(object):
         events = self.events
         return events
 
+    def match_topics(self, topics):
+        if self.topics is None:
+            return True
+
+        if len(topics) < len(self.topics):
+            return False
+
+        for expected, topic in zip(self.topics, topics):
+            if isinstance(expected, list):
+                if topic not in expected:
+                    return False
+
+            elif expected is not None and expected != topic:
+                return False
+
+        return True
+
     def event(self, event):
-        # TODO: implement OR
-        valid_address = event.address == self.contract_address
-        valid_topics = (
-            self.topics is None or
-            event.topics == self.topics
+        valid_address = (
+            self.contract_address is None or
+            event.address == self.contract_address
         )
+        valid_topics = self.match_topics(event.topics)
 
         if valid_topics and valid_address:
             self.events.append({
@@ -214,6 +232,10 @@ class BlockChainServiceTesterMock(object):
         self.address_to_registry = dict()
         self.token_to_channelmanager = dict()
 
+        # the tester proxies read the state directly
+        self.cache = ContractCallCache()
+        self.gas_estimates = GasEstimateCache(None)
+
     def set_verbosity(self, level):
         pass
 
@@ -228,6 +250,14 @@ class BlockChainServiceTesterMock(object):
         """dummy"""
         return 1
 
+    def new_block_filter(self):  # pylint: disable=no-self-use
+        """ The tester blocks are polled. """
+        return None
+
+    def new_heads_subscription(self):  # pylint: disable=no-self-use
+        """ The tester blocks are polled. """
+        return None
+
     def token(self, token_address):
         """ Return a proxy to interact with an token. """
         if token_address not in self.address_to_token:
@@ -307,9 +337,44 @@ class BlockChainServiceTesterMock(object):
 
         return self.address_to_registry[registry_address]
 
+    def events_filter(self, topics, **kwargs):
+        """May also receive from_block, to_block but they are not used here"""
+        filter_ = FilterTesterMock(None, topics, next(FILTER_ID_GENERATOR))
+        self.tester_state.block.log_listeners.append(filter_.event)
+        return filter_
+
     def uninstall_filter(self, filter_id_raw):
         pass
 
+    def get_logs(self, contract_address, topics, from_block, to_block):
+        filter_ = FilterTesterMock(None, topics, None)
+
+        if isinstance(contract_address, list):
+            addresses = contract_address
+        elif contract_address is not None:
+            addresses = [contract_address]
+        else:
+            addresses = None
+
+        result = list()
+        for block in self.tester_state.blocks:
+            if not from_block <= block.number <= to_block:
+                continue
+
+            for receipt in block.get_receipts():
+                for log_event in receipt.logs:
+                    valid_address = addresses is None or log_event.address in addresses
+
+                    if valid_address and filter_.match_topics(log_event.topics):
+                        result.append({
+                            'topics': log_event.topics,
+                            'data': log_event.data,
+                            'address': log_event.address,
+                            'block_number': block.number,
+                        })
+
+        return result
+
     def deploy_contract(self, contract_name, contract_file, constructor_parameters=None):
         return tester_deploy_contract(
             self.tester_state,
@@ -367,6 +432,36 @@ class DiscoveryTesterMock(object):
 
         return endpoint
 
+    def endpoints_by_addresses(self, node_addresses_bin):
+        """ Returns a dictionary address: endpoint for the registered
+        addresses in `node_addresses_bin`.
+
+        Raises:
+            ValueError: If the registry didn't return one entry per address,
+                e.g. because it was deployed without findEndpointsByAddresses.
+        """
+        node_addresses_hex = [
+            node_address_bin.encode('hex')
+            for node_address_bin in node_addresses_bin
+        ]
+        data = self.proxy.findEndpointsByAddresses(node_addresses_hex)
+        endpoints = decode_endpoints(data)
+
+        if len(endpoints) != len(node_addresses_bin):
+            raise ValueError(
+                'findEndpointsByAddresses returned {} endpoints for {} addresses'.format(
+                    len(endpoints),
+                    len(node_addresses_bin),
+                )
+            )
+
+        result = dict()
+        for node_address_bin, endpoint in zip(node_addresses_bin, endpoints):
+            if endpoint != '':
+                result[node_address_bin] = endpoint
+
+        return result
+
     def address_by_endpoint(self, endpoint):
         address = self.proxy.findAddressByEndpoint(endpoint)
 
@@ -375,6 +470,14 @@ class DiscoveryTesterMock(object):
 
         return address.decode('hex')
 
+    def addressregistered_filter(self, **kwargs):
+        """May also receive from_block, to_block but they are not used here"""
+        # The event has the address as an indexed topic and the mock filter
+        # matches the full topics list, the registry has no other events.
+        filter_ = FilterTesterMock(self.address, None, next(FILTER_ID_GENERATOR))
+        self.tester_state.block.log_listeners.append(filter_.event)
+        return filter_
+
 
 class TokenTesterMock(object):
     def __init__(self, tester_state, private_key, address):
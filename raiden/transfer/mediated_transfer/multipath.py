@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Initiator of a payment that is split in several mediated transfers.
+
+Each part is a regular initiator task with its own secret, the secrets are
+only revealed after the target requested all of them. If a part fails before
+that the whole payment fails, none of the secrets were released so the locks
+of the other parts cannot be claimed and just expire.
+"""
+from raiden.transfer.architecture import TransitionResult
+from raiden.transfer.mediated_transfer import initiator
+from raiden.transfer.mediated_transfer.state import (
+    LockedTransferState,
+    MultipathInitiatorState,
+)
+from raiden.transfer.mediated_transfer.state_change import (
+    ActionInitInitiator,
+    ActionInitMultipathInitiator,
+)
+from raiden.transfer.state_change import ActionCancelTransfer
+from raiden.transfer.events import (
+    EventTransferSentFailed,
+    EventTransferSentSuccess,
+)
+from raiden.transfer.mediated_transfer.events import (
+    EventUnlockFailed,
+    SendRevealSecret,
+)
+
+# Every part locks funds of a different channel until the payment is finished
+MAX_PARTS = 4
+
+
+def split_amount(routes, amount, max_parts=MAX_PARTS):
+    """ Return a list of (route, amount) tuples that add up to `amount` using
+    the routes with the largest available balances, or an empty list if the
+    routes cannot carry it.
+    """
+    by_balance = sorted(
+        routes,
+        key=lambda route: route.available_balance,
+        reverse=True,
+    )
+
+    parts = list()
+    remaining = amount
+    for route in by_balance[:max_parts]:
+        if remaining == 0 or route.available_balance <= 0:
+            break
+
+        part_amount = min(route.available_balance, remaining)
+        parts.append((route, part_amount))
+        remaining -= part_amount
+
+    if remaining:
+        return list()
+
+    return parts
+
+
+def fail_payment(state, reason, events):
+    """ Abandon all the parts, this is only safe while the secrets were not
+    revealed.
+    """
+    assert not state.revealed, 'cannot fail a payment with the secrets revealed'
+
+    identifier = state.transfer.identifier
+    for part in state.parts:
+        if part is not None and part.message is not None:
+            events.append(EventUnlockFailed(
+                identifier=identifier,
+                hashlock=part.transfer.hashlock,
+                reason='payment failed',
+            ))
+
+    events.append(EventTransferSentFailed(
+        identifier=identifier,
+        reason=reason,
+    ))
+
+    return TransitionResult(None, events)
+
+
+def update_parts(state, part_iterations):
+    """ Apply the iterations of the parts and aggregate their events into the
+    events of the payment.
+    """
+    events = list()
+    failed = None
+
+    for position, iteration in part_iterations:
+        state.parts[position] = iteration.new_state
+
+        for event in iteration.events:
+            if isinstance(event, EventTransferSentFailed):
+                failed = event
+
+            # the secrets are revealed together and the payment only succeeds
+            # once all the parts are unlocked
+            elif not isinstance(event, (SendRevealSecret, EventTransferSentSuccess)):
+                events.append(event)
+
+    if failed is not None:
+        return fail_payment(state, failed.reason, events)
+
+    all_requested = all(
+        part is not None and part.revealsecret is not None
+        for part in state.parts
+    )
+    if not state.revealed and all_requested:
+        state.revealed = True
+        events.extend(part.revealsecret for part in state.parts)
+
+    if all(part is None for part in state.parts):
+        events.append(EventTransferSentSuccess(state.transfer.identifier))
+        return TransitionResult(None, events)
+
+    return TransitionResult(state, events)
+
+
+def handle_init(state_change):
+    payment = state_change.transfer
+    state = MultipathInitiatorState(
+        state_change.our_address,
+        payment,
+        [None] * len(state_change.parts),
+    )
+
+    part_iterations = list()
+    for position, (amount, routes) in enumerate(state_change.parts):
+        transfer = LockedTransferState(
+            identifier=payment.identifier,
+            amount=amount,
+            token=payment.token,
+            initiator=payment.initiator,
+            target=payment.target,
+            expiration=None,
+            hashlock=None,
+            secret=None,
+        )
+
+        init_initiator = ActionInitInitiator(
+            state_change.our_address,
+            transfer,
+            routes,
+            state_change.random_generator,
+            state_change.block_number,
+        )
+
+        iteration = initiator.state_transition(None, init_initiator)
+        part_iterations.append((position, iteration))
+
+    return update_parts(state, part_iterations)
+
+
+def handle_parts(state, state_change):
+    part_iterations = [
+        (position, initiator.state_transition(part, state_change))
+        for position, part in enumerate(state.parts)
+        if part is not None
+    ]
+    return update_parts(state, part_iterations)
+
+
+def state_transition(state, state_change):
+    """ State machine for a node starting a payment split in several
+    mediated transfers.
+
+    The state changes are given to all the parts, each part only reacts to
+    the messages for its own route and hashlock.
+    """
+    iteration = TransitionResult(state, list())
+
+    if state is None:
+        if isinstance(state_change, ActionInitMultipathInitiator):
+            iteration = handle_init(state_change)
+
+    elif isinstance(state_change, ActionCancelTransfer):
+        if not state.revealed:
+            iteration = fail_payment(state, 'user canceled transfer', list())
+
+    else:
+        iteration = handle_parts(state, state_change)
+
+    return iteration
@@ -75,6 +75,43 @@ class InitiatorState(State):
         return not self.__eq__(other)
 
 
+class MultipathInitiatorState(State):
+    """ State of a node initiating a payment split in several mediated
+    transfers.
+
+    Args:
+        our_address (address): This node address.
+        transfer (LockedTransferState): The description of the whole payment.
+        parts (list): The InitiatorState of each part, None once the part is
+            finished.
+    """
+    __slots__ = (
+        'our_address',
+        'transfer',
+        'parts',
+        'revealed',
+    )
+
+    def __init__(self, our_address, transfer, parts):
+        self.our_address = our_address
+        self.transfer = transfer
+        self.parts = parts
+        self.revealed = False  #: True once the secrets of all parts were sent
+
+    def __eq__(self, other):
+        if isinstance(other, MultipathInitiatorState):
+            return (
+                self.our_address == other.our_address and
+                self.transfer == other.transfer and
+                self.parts == other.parts and
+                self.revealed == other.revealed
+            )
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
 class MediatorState(State):
     """ State of a node mediating a transfer.
 
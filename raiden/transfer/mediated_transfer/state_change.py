@@ -36,6 +36,32 @@ class ActionInitInitiator(StateChange):
         self.block_number = block_number
 
 
+class ActionInitMultipathInitiator(StateChange):
+    """ Initial state of a payment split in several mediated transfers.
+
+    Args:
+        our_address (address): This node address.
+        transfer (LockedTransferState): A state object containing the payment details.
+        parts (list): A list of (amount, RoutesState) tuples, one for each part.
+        random_generator (generator): A generator for secrets.
+        block_number (int): The current block number.
+    """
+
+    def __init__(
+            self,
+            our_address,
+            transfer,
+            parts,
+            random_generator,
+            block_number):
+
+        self.our_address = our_address
+        self.transfer = transfer
+        self.parts = parts
+        self.random_generator = random_generator
+        self.block_number = block_number
+
+
 class ActionInitMediator(StateChange):
     """ Initial state for a new mediator.
 
@@ -73,6 +73,13 @@ OPTIONS = [
         default='127.0.0.1:8545',  # geth default jsonrpc port
         type=str,
     ),
+    click.option(
+        '--eth-ws-endpoint',
+        help='Websocket address of the ethereum node, e.g. ws://127.0.0.1:8546.\n'
+        'When given the node pushes the new blocks instead of being polled',
+        default=None,
+        type=str,
+    ),
     click.option(
         '--registry-contract-address',
         help='hex encoded address of the registry contract.',
@@ -194,6 +201,7 @@ def options(func):
 def app(address,
         keystore_path,
         eth_rpc_endpoint,
+        eth_ws_endpoint,
         registry_contract_address,
         discovery_contract_address,
         listen_address,
@@ -267,6 +275,7 @@ def app(address,
             registry_contract_address,
             host=rpc_host,
             port=rpc_port,
+            ws_endpoint=eth_ws_endpoint,
         )
     except ValueError as e:
         # ValueError exception raised if:
@@ -292,11 +301,6 @@ def app(address,
         if not click.confirm('Try again?'):
             sys.exit(1)
 
-    discovery = ContractDiscovery(
-        blockchain_service.node_address,
-        blockchain_service.discovery(discovery_contract_address)
-    )
-
     if datadir is None:
         # default database directory
         raiden_directory = os.path.join(os.path.expanduser('~'), '.raiden')
@@ -311,6 +315,12 @@ def app(address,
     database_path = os.path.join(user_db_dir, 'log.db')
     config['database_path'] = database_path
 
+    discovery = ContractDiscovery(
+        blockchain_service.node_address,
+        blockchain_service.discovery(discovery_contract_address),
+        cache_path=os.path.join(user_db_dir, 'discovery.pickle'),
+    )
+
     return App(config, blockchain_service, discovery)
 
 
@@ -113,6 +113,22 @@ def split_endpoint(endpoint):
     return (host, port)
 
 
+def decode_endpoints(data):
+    """ Splits the length-prefixed endpoints returned by the EndpointRegistry's
+    findEndpointsByAddresses.
+    """
+    endpoints = list()
+    position = 0
+
+    while position < len(data):
+        size = ord(data[position]) * 256 + ord(data[position + 1])
+        position += 2
+        endpoints.append(data[position:position + size])
+        position += size
+
+    return endpoints
+
+
 def publickey_to_address(publickey):
     return sha3(publickey[1:])[12:]
 
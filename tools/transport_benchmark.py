@@ -0,0 +1,93 @@
+"""  # noqa
+Usage:
+    transport_benchmark.py [--packets=<packets>] [--size=<size>] [--ip=<ip>]
+                           [--port=<port>] [--window=<window>]
+
+Options:
+    -n --packets=<packets>              Number of packets to send [default: 100000].
+    -s --size=<size>                    Size of each packet in bytes [default: 300].
+    -i --ip=<ip>                        IP to use [default: 127.0.0.1].
+    -p --port=<port>                    First port to use [default: 8885].
+    -w --window=<window>                Maximum number of packets in flight [default: 500].
+"""
+from gevent import monkey
+monkey.patch_all()  # noqa
+import time
+
+import gevent
+from docopt import docopt
+
+from raiden.network.transport import BatchedUDPTransport, TCPTransport, UDPTransport
+
+
+class CountingProtocol(object):
+
+    def __init__(self):
+        self.raiden = None
+        self.received = 0
+        self.last_received_time = None
+
+    def receive(self, data, host_port=None):  # pylint: disable=unused-argument
+        self.received += 1
+        self.last_received_time = time.time()
+
+
+def benchmark(transport_class, ip, port, packets, size, window):
+    protocol = CountingProtocol()
+    receiver = transport_class(ip, port, protocol=protocol)
+    sender = transport_class(ip, port + 1, protocol=CountingProtocol())
+
+    data = b'x' * size
+    start = time.time()
+
+    for number in range(packets):
+        sender.send(None, (ip, port), data)
+
+        # limit the packets in flight, otherwise they are dropped by the
+        # kernel, lost packets are accounted for after the timeout
+        window_timeout = time.time() + 1
+        while number - protocol.received > window and time.time() < window_timeout:
+            gevent.sleep(0)
+
+    # wait for the in-flight packets
+    last_received = -1
+    while last_received != protocol.received:
+        last_received = protocol.received
+        gevent.sleep(0.1)
+
+    if protocol.last_received_time is None:
+        elapsed = 0
+    else:
+        elapsed = protocol.last_received_time - start
+
+    sender.stop()
+    receiver.stop()
+
+    return protocol.received, elapsed
+
+
+if __name__ == "__main__":
+    options = docopt(__doc__)
+    packets = int(options['--packets'])
+    size = int(options['--size'])
+    ip = options['--ip']
+    port = int(options['--port'])
+    window = int(options['--window'])
+
+    for offset, transport_class in enumerate((UDPTransport, BatchedUDPTransport, TCPTransport)):
+        received, elapsed = benchmark(
+            transport_class,
+            ip,
+            port + offset * 2,
+            packets,
+            size,
+            window,
+        )
+        rate = received / elapsed if elapsed else 0
+
+        print '{}: {:.0f} packets/s, {} of {} packets received'.format(
+            transport_class.__name__,
+            rate,
+            received,
+            packets,
+        )
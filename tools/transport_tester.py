@@ -23,7 +23,7 @@ class DummyProtocol(object):
     def __init__(self):
         self.raiden = None
 
-    def receive(self, data):
+    def receive(self, data, host_port=None):  # pylint: disable=unused-argument
         print data
 
 